@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_account_company'),
+        ('common', '0016_keyset_pagination_index'),
+        ('companies', '0016_companyprofile_account'),
+        ('contacts', '0010_alter_contact_language'),
+        ('leads', '0009_lead_converted_at'),
+        ('teams', '0003_alter_teams_created_by'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(fields=['org', 'created_at', 'id'], name='accounts_org_id_6d0a0c_idx'),
+        ),
+    ]
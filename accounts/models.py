@@ -112,6 +112,10 @@ class Account(BaseModel):
         verbose_name_plural = "Accounts"
         db_table = "accounts"
         ordering = ("-created_at",)
+        indexes = [
+            # keyset pagination (common.pagination.KeysetPagination)
+            models.Index(fields=["org", "created_at", "id"]),
+        ]
 
     def __str__(self):
         return f"{self.name}"
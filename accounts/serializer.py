@@ -7,6 +7,7 @@ from common.serializer import (
     ProfileSerializer,
     UserSerializer
 )
+from common.sparse_fields import SparseFieldsMixin
 from contacts.serializer import ContactSerializer
 from leads.serializer import LeadSerializer
 from teams.serializer import TeamsSerializer
@@ -18,7 +19,7 @@ class TagsSerailizer(serializers.ModelSerializer):
         fields = ("id", "name", "slug")
 
 
-class AccountSerializer(serializers.ModelSerializer):
+class AccountSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     created_by = UserSerializer()
     lead = LeadSerializer()
     org = OrganizationSerializer()
@@ -60,6 +61,31 @@ class AccountSerializer(serializers.ModelSerializer):
         )
 
 
+class AccountListSerializer(serializers.ModelSerializer):
+    """Account in feeds and summaries, expects company to be loaded"""
+
+    company_name = serializers.CharField(
+        source="company.name", read_only=True, default=None
+    )
+
+    class Meta:
+        model = Account
+        fields = (
+            "id",
+            "name",
+            "email",
+            "phone",
+            "industry",
+            "billing_city",
+            "billing_country",
+            "website",
+            "status",
+            "contact_name",
+            "company_name",
+            "created_at",
+        )
+
+
 class EmailSerializer(serializers.ModelSerializer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -0,0 +1,97 @@
+from accounts.models import Account
+from common.testing import OrgAPITestCase
+from contacts.models import Contact
+
+
+class AccountListTestCase(OrgAPITestCase):
+    org_name = "Account Org"
+    email = "accounts@example.com"
+
+    def setUp(self):
+        super().setUp()
+        self.contacts = []
+        for i, status in enumerate(("open", "open", "close")):
+            contact = Contact.objects.create(
+                first_name="Contact",
+                last_name=str(i),
+                primary_email=f"contact{i}@example.com",
+                org=self.org,
+            )
+            account = Account.objects.create(
+                name=f"Account {i}",
+                email=f"account{i}@example.com",
+                status=status,
+                org=self.org,
+            )
+            account.contacts.add(contact)
+            self.contacts.append(contact)
+        # a second contact, listed first, on the first account
+        Account.objects.get(name="Account 0").contacts.add(self.contacts[1])
+
+    def list_accounts(self, **params):
+        response = self.client.get("/api/accounts/", params)
+        self.assertEqual(response.status_code, 200)
+        return (
+            response.data["active_accounts"]["open_accounts"],
+            response.data["closed_accounts"]["close_accounts"],
+        )
+
+    def test_filter_by_contact(self):
+        contact = self.contacts[1]
+        open_accounts, closed = self.list_accounts(contact_id=contact.id)
+        self.assertEqual(
+            sorted(account["name"] for account in open_accounts),
+            ["Account 0", "Account 1"],
+        )
+        self.assertEqual(closed, [])
+
+        open_accounts, _ = self.list_accounts(
+            contact_id=contact.id, fields="id,name,contacts"
+        )
+        self.assertEqual(len(open_accounts), 2)
+        self.assertIn(contact.id, open_accounts[0]["contacts"])
+
+        # without the contacts in the response
+        open_accounts, _ = self.list_accounts(contact_id=contact.id, fields="id,name")
+        self.assertEqual(len(open_accounts), 2)
+
+        _, closed = self.list_accounts(contact_id=self.contacts[2].id)
+        self.assertEqual([account["name"] for account in closed], ["Account 2"])
+
+        self.assertEqual(self.list_accounts(contact_id="unknown"), ([], []))
+
+    def test_sparse_fields(self):
+        account = Account.objects.get(name="Account 1")
+        for params in ({}, {"pagination": "cursor"}):
+            open_accounts, closed = self.list_accounts(fields="id,name", **params)
+            self.assertEqual(
+                sorted(open_accounts, key=lambda row: row["name"])[1],
+                {"id": str(account.id), "name": "Account 1"},
+            )
+            self.assertEqual([row["name"] for row in closed], ["Account 2"])
+
+        open_accounts, _ = self.list_accounts(fields="name,contacts")
+        rows = {row["name"]: row for row in open_accounts}
+        self.assertEqual(rows["Account 1"]["contacts"], [self.contacts[1].id])
+
+        open_accounts, _ = self.list_accounts(
+            fields="name,contacts", expand="contacts"
+        )
+        rows = {row["name"]: row for row in open_accounts}
+        self.assertEqual(
+            [contact["last_name"] for contact in rows["Account 1"]["contacts"]],
+            ["1"],
+        )
+
+        response = self.client.get(
+            f"/api/accounts/{account.id}/", {"fields": "id,name,contacts"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["account_obj"],
+            {
+                "id": str(account.id),
+                "name": "Account 1",
+                "contacts": [self.contacts[1].id],
+            },
+        )
@@ -1,4 +1,5 @@
 import json
+import uuid
 
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
@@ -26,7 +27,17 @@ from accounts.serializer import (
 from teams.serializer import TeamsSerializer
 from accounts.tasks import send_email, send_email_to_assigned_user
 from cases.serializer import CaseSerializer
+from common import export
+from common.conditional_get import ConditionalGetMixin
+from common.export import CsvExportMixin
 from common.models import Attachments, Comment, Profile
+from common.pagination import KeysetPagination
+from common.reference_data import ReferenceDataView, lookups_requested
+from common.swagger_params1 import (
+    cursor_pagination_params,
+    export_params,
+    include_lookups_params,
+)
 from leads.models import Lead
 from leads.serializer import LeadSerializer
 
@@ -48,18 +59,83 @@ from contacts.models import Contact
 from contacts.serializer import ContactSerializer
 from invoices.serializer import InvoiceSerailizer
 from opportunity.models import SOURCES, STAGES, Opportunity
-from opportunity.serializer import OpportunitySerializer
+from opportunity.serializer import OpportunityListSerializer, OpportunitySerializer
 from tasks.serializer import TaskSerializer
 from teams.models import Teams
 
 
-class AccountsListView(APIView, LimitOffsetPagination):
+class AccountMetaView(ReferenceDataView):
+    """Lookups used by the account list and forms, see common.reference_data"""
+
+    authentication_classes = (CustomDualAuthentication,)
+    entity = "accounts"
+    dependencies = (
+        "accounts.Tags",
+        "common.Address",
+        "common.Attachments",
+        "common.Org",
+        "common.Profile",
+        "common.User",
+        "companies.CompanyProfile",
+        "contacts.Contact",
+        "leads.Lead",
+        "teams.Teams",
+    )
+
+    @classmethod
+    def build(cls, request):
+        org = request.profile.org
+        leads = Lead.objects.filter(organization=org).exclude(
+            Q(status="converted") | Q(status="closed")
+        )
+        return {
+            "contacts": list(
+                Contact.objects.filter(org=org).values("id", "first_name", "last_name")
+            ),
+            "teams": TeamsSerializer(
+                TeamsSerializer.prefetch_plan(Teams.objects.filter(org=org)), many=True
+            ).data,
+            "countries": COUNTRIES,
+            "industries": INDCHOICES,
+            "tags": TagsSerailizer(Tags.objects.all(), many=True).data,
+            "users": list(
+                Profile.objects.filter(is_active=True, org=org).values(
+                    "id", "user__email"
+                )
+            ),
+            "leads": LeadSerializer(leads, many=True).data,
+            "status": ["open", "close"],
+        }
+
+    @extend_schema(tags=["Accounts"], parameters=swagger_params1.organization_params)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class AccountsListView(CsvExportMixin, APIView, LimitOffsetPagination):
     authentication_classes = (CustomDualAuthentication,)
     permission_classes = (IsAuthenticated,)
     model = Account
     serializer_class = AccountReadSerializer
+    export_filename = "accounts_export.csv"
+    export_columns = (
+        ("Name", "name"),
+        ("Status", "status"),
+        ("Email", "email"),
+        ("Phone", "phone"),
+        ("Industry", "industry"),
+        ("Website", "website"),
+        ("City", "billing_city"),
+        ("Country", "billing_country"),
+        ("Contacts", export.full_names("contacts")),
+        ("Tags", export.related_names("tags")),
+        ("Assigned To", export.profile_names("assigned_to")),
+        ("Created At", "created_at"),
+    )
+    export_prefetch_related = ("contacts", "tags", "assigned_to__user")
 
-    def get_context_data(self, **kwargs):
+    def get_queryset(self):
+        """The accounts the filters of the request select"""
         params = self.request.query_params
         queryset = self.model.objects.filter(org=self.request.profile.org).order_by(
             "-id"
@@ -82,84 +158,93 @@ class AccountsListView(APIView, LimitOffsetPagination):
                 queryset = queryset.filter(industry__icontains=params.get("industry"))
             if params.get("tags"):
                 queryset = queryset.filter(tags__in=params.get("tags")).distinct()
+        return queryset
+
+    def get_filtered_queryset(self):
+        queryset = self.get_queryset()
+        contact_id = self.request.query_params.get("contact_id")
+        if contact_id:
+            try:
+                queryset = queryset.filter(contacts__id=uuid.UUID(contact_id))
+            except ValueError:
+                # not the id of any contact
+                queryset = queryset.none()
+        return queryset.distinct()
 
+    def get_context_data(self, **kwargs):
         context = {}
-        queryset_open = queryset.filter(status="open")
-        results_accounts_open = self.paginate_queryset(
-            queryset_open.distinct(), self.request, view=self
+        # ?fields=/?expand= (common.sparse_fields)
+        queryset = AccountSerializer.prune_queryset(
+            self.get_filtered_queryset(), self.request
         )
-        if results_accounts_open:
-            offset = queryset_open.filter(id__gte=results_accounts_open[-1].id).count()
-            if offset == queryset_open.count():
-                offset = None
+        queryset_open = queryset.filter(status="open")
+        queryset_close = queryset.filter(status="close")
+        if KeysetPagination.is_requested(self.request):
+            paginator = KeysetPagination(self.request)
+            page_open = paginator.paginate(queryset_open.distinct(), bucket="open")
+            page_close = paginator.paginate(queryset_close.distinct(), bucket="close")
+            accounts_open = AccountSerializer(
+                page_open.results, many=True, context={"request": self.request}
+            ).data
+            accounts_close = AccountSerializer(
+                page_close.results, many=True, context={"request": self.request}
+            ).data
+            context["per_page"] = paginator.limit
+            open_links = {"accounts_count": page_open.count, **page_open.links()}
+            close_links = {"accounts_count": page_close.count, **page_close.links()}
         else:
-            offset = 0
-        accounts_open = AccountSerializer(results_accounts_open, many=True).data
-
-        # filter by contact id (post-serialization filtering needed for complex nested data)
-        if params.get("contact_id"):
-            accounts_open = [
-                account
-                for account in accounts_open
-                if account.get("contacts")
-                and len(account["contacts"]) > 0
-                and params.get("contact_id") == account["contacts"][0].get("id")
-            ]
-
-        context["per_page"] = 10
-        page_number = (int(self.offset / 10) + 1,)
-        context["page_number"] = page_number
+            results_accounts_open = self.paginate_queryset(
+                queryset_open.distinct(), self.request, view=self
+            )
+            if results_accounts_open:
+                offset = queryset_open.filter(
+                    id__gte=results_accounts_open[-1].id
+                ).count()
+                if offset == queryset_open.count():
+                    offset = None
+            else:
+                offset = 0
+            accounts_open = AccountSerializer(
+                results_accounts_open, many=True, context={"request": self.request}
+            ).data
+            open_links = {"offset": offset}
+            context["per_page"] = 10
+            page_number = (int(self.offset / 10) + 1,)
+            context["page_number"] = page_number
+
+            results_accounts_close = self.paginate_queryset(
+                queryset_close.distinct(), self.request, view=self
+            )
+            if results_accounts_close:
+                offset = queryset_close.filter(
+                    id__gte=results_accounts_close[-1].id
+                ).count()
+                if offset == queryset_close.count():
+                    offset = None
+            else:
+                offset = 0
+            accounts_close = AccountSerializer(
+                results_accounts_close, many=True, context={"request": self.request}
+            ).data
+            close_links = {"offset": offset}
+
         context["active_accounts"] = {
-            "offset": offset,
+            **open_links,
             "open_accounts": accounts_open,
         }
 
-        queryset_close = queryset.filter(status="close")
-        results_accounts_close = self.paginate_queryset(
-            queryset_close.distinct(), self.request, view=self
-        )
-        if results_accounts_close:
-            offset = queryset_close.filter(
-                id__gte=results_accounts_close[-1].id
-            ).count()
-            if offset == queryset_close.count():
-                offset = None
-        else:
-            offset = 0
-        accounts_close = AccountSerializer(results_accounts_close, many=True).data
-
-        contacts = Contact.objects.filter(org=self.request.profile.org).values(
-            "id", "first_name", "last_name"
-        )
-        context["contacts"] = contacts
         context["closed_accounts"] = {
-            "offset": offset,
+            **close_links,
             "close_accounts": accounts_close,
         }
-        context["teams"] = TeamsSerializer(
-            Teams.objects.filter(org=self.request.profile.org), many=True
-        ).data
-        context["countries"] = COUNTRIES
-        context["industries"] = INDCHOICES
-
-        tags = Tags.objects.all()
-        tags = TagsSerailizer(tags, many=True).data
-
-        context["tags"] = tags
-        users = Profile.objects.filter(
-            is_active=True, org=self.request.profile.org
-        ).values("id", "user__email")
-        context["users"] = users
-        leads = Lead.objects.filter(organization=self.request.profile.org).exclude(
-            Q(status="converted") | Q(status="closed")
-        )
-        context["users"] = users
-        context["leads"] = LeadSerializer(leads, many=True).data
-        context["status"] = ["open", "close"]
+        if lookups_requested(self.request):
+            context.update(AccountMetaView.get_payload(self.request))
         return context
 
-    @extend_schema(tags=["Accounts"], parameters=swagger_params1.account_get_params)
+    @extend_schema(tags=["Accounts"], parameters=swagger_params1.account_get_params + cursor_pagination_params + include_lookups_params + export_params)
     def get(self, request, *args, **kwargs):
+        if export.is_requested(request):
+            return self.export_csv()
         context = self.get_context_data(**kwargs)
         return Response(context)
 
@@ -233,10 +318,37 @@ class AccountsListView(APIView, LimitOffsetPagination):
         )
 
 
-class AccountDetailView(APIView):
+class AccountDetailView(ConditionalGetMixin, APIView):
     authentication_classes = (CustomDualAuthentication,)
     permission_classes = (IsAuthenticated,)
     serializer_class = AccountReadSerializer
+    conditional_related = (
+        "company",
+        "lead",
+        "contacts",
+        "assigned_to",
+        "teams",
+        "tags",
+        "accounts_comments",
+        "account_attachment",
+        "opportunities",
+        "accounts_cases",
+        "accounts_tasks",
+        "accounts_invoices",
+        "sent_email",
+    )
+    # the opportunities and leads of the org are shown with their contacts,
+    # assignees and comments
+    conditional_dependencies = (
+        "common.Comment",
+        "common.Profile",
+        "common.User",
+        "companies.CompanyProfile",
+        "contacts.Contact",
+        "leads.Lead",
+        "opportunity.Opportunity",
+        "teams.Teams",
+    )
 
     def get_object(self, pk):
         return get_object_or_404(Account, id=pk)
@@ -395,10 +507,16 @@ class AccountDetailView(APIView):
                     status=status.HTTP_403_FORBIDDEN,
                 )
 
+        headers = self.get_conditional_headers(request, self.account)
+        if self.is_not_modified(request, headers):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
         # Build context data
         context = {}
         context["error"] = False
-        context["account_obj"] = AccountSerializer(self.account).data
+        context["account_obj"] = AccountSerializer(
+            self.account, context={"request": self.request}
+        ).data
         # Add company logo URL for quick access
         context["company_logo_url"] = (
             self.account.company.logo_url if self.account.company else None
@@ -541,8 +659,9 @@ class AccountDetailView(APIView):
                 # CLOSED WON opportunities with detailed lead information
                 "closed_won_opportunities": opportunities_data,
                 # All opportunities for this account (for completeness)
-                "opportunity_list": OpportunitySerializer(
-                    all_opportunities, many=True
+                "opportunity_list": OpportunityListSerializer(
+                    OpportunityListSerializer.prefetch_plan(all_opportunities),
+                    many=True,
                 ).data,
                 # Existing data
                 "attachments": AttachmentsSerializer(
@@ -564,7 +683,10 @@ class AccountDetailView(APIView):
                     self.account.accounts_cases.all(), many=True
                 ).data,
                 "teams": TeamsSerializer(
-                    Teams.objects.filter(org=self.request.profile.org), many=True
+                    TeamsSerializer.prefetch_plan(
+                        Teams.objects.filter(org=self.request.profile.org)
+                    ),
+                    many=True,
                 ).data,
                 "stages": STAGES,
                 "sources": SOURCES,
@@ -588,7 +710,7 @@ class AccountDetailView(APIView):
                 "status": ["open", "close"],
             }
         )
-        return Response(context)
+        return Response(context, headers=headers)
 
     @extend_schema(
         tags=["Accounts"],
@@ -646,7 +768,9 @@ class AccountDetailView(APIView):
         ).order_by("-id")
         context.update(
             {
-                "account_obj": AccountSerializer(self.account_obj).data,
+                "account_obj": AccountSerializer(
+                    self.account_obj, context={"request": self.request}
+                ).data,
                 "attachments": AttachmentsSerializer(attachments, many=True).data,
                 "comments": CommentSerializer(comments, many=True).data,
             }
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from cases.models import Case
 from common.serializer import OrganizationSerializer, ProfileSerializer, UserSerializer
+from common.sparse_fields import SparseFieldsMixin
 from contacts.serializer import ContactSerializer
 from teams.serializer import TeamsSerializer
 from opportunity.serializer import OpportunitySerializer
@@ -9,7 +10,7 @@ from django.contrib.auth import get_user_model
 User = get_user_model()
 
 
-class CaseSerializer(serializers.ModelSerializer):
+class CaseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     account = serializers.SerializerMethodField()
     contacts = ContactSerializer(many=True, read_only=True)
     assigned_to = ProfileSerializer(many=True, read_only=True)
@@ -19,6 +20,8 @@ class CaseSerializer(serializers.ModelSerializer):
     opportunity = OpportunitySerializer(read_only=True)
     created_on_arrow = serializers.SerializerMethodField()
 
+    method_field_relations = {"account": ("account",)}
+
     class Meta:
         model = Case
         fields = (
@@ -55,7 +58,7 @@ class CaseSerializer(serializers.ModelSerializer):
         return None
 
 
-class CaseListSerializer(serializers.ModelSerializer):
+class CaseListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     priority = serializers.CharField()
     account_name = serializers.CharField(source="account.name", read_only=True)
     opportunity_name = serializers.CharField(source="opportunity.name", read_only=True)
@@ -69,6 +72,8 @@ class CaseListSerializer(serializers.ModelSerializer):
         read_only=True,
     )
 
+    method_field_relations = {"opportunity_data": ("opportunity",)}
+
     class Meta:
         model = Case
         fields = "__all__"
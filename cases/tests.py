@@ -0,0 +1,54 @@
+from accounts.models import Account
+from cases.models import Case
+from common.testing import OrgAPITestCase
+
+
+class CaseSparseFieldsTestCase(OrgAPITestCase):
+    org_name = "Sparse Case Org"
+    email = "sparse-cases@example.com"
+
+    def setUp(self):
+        super().setUp()
+        self.account = Account.objects.create(
+            name="Initech", email="info@initech.com", org=self.org
+        )
+        self.case = Case.objects.create(
+            name="Broken printer",
+            priority="High",
+            closed_on="2026-01-31",
+            account=self.account,
+            org=self.org,
+        )
+        self.case.assigned_to.add(self.profile)
+
+    def test_list_fields(self):
+        response = self.client.get(
+            "/api/cases/", {"fields": "id,name,account_name,assigned_to"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["results"],
+            [
+                {
+                    "id": str(self.case.id),
+                    "name": "Broken printer",
+                    "account_name": "Initech",
+                    "assigned_to": [self.profile.id],
+                }
+            ],
+        )
+
+        response = self.client.get(
+            "/api/cases/", {"fields": "id,assigned_to", "expand": "assigned_to"}
+        )
+        profile = response.data["results"][0]["assigned_to"][0]
+        self.assertEqual(profile["user_details"]["email"], self.email)
+
+    def test_detail_fields(self):
+        response = self.client.get(
+            f"/api/cases/{self.case.id}/", {"fields": "id,priority,account"}
+        )
+        self.assertEqual(response.status_code, 200)
+        case = response.data["cases_obj"]
+        self.assertEqual(set(case), {"id", "priority", "account"})
+        self.assertEqual(case["account"]["name"], "Initech")
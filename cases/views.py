@@ -3,8 +3,6 @@ import uuid
 
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
-import csv
 
 from rest_framework.views import APIView
 from rest_framework import (
@@ -26,6 +24,8 @@ from drf_spectacular.utils import (
 
 from accounts.models import Account
 from cases.models import Case
+from common import export
+from common.export import CsvExportMixin
 from common.models import Attachments, Comment, Profile
 from contacts.models import Contact
 from teams.models import Teams
@@ -41,6 +41,7 @@ from cases.serializer import (
 )
 
 from common.serializer import AttachmentsSerializer, CommentSerializer
+from common.swagger_params1 import export_params
 from contacts.serializer import ContactSerializer
 from cases import swagger_params1
 from cases.tasks import send_email_to_assigned_user
@@ -174,70 +175,38 @@ from .swagger_params1 import cases_list_get_params
 #         )
 
 
-class CaseListView(generics.ListAPIView):
+class CaseListView(CsvExportMixin, generics.ListAPIView):
     serializer_class = CaseListSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["status", "priority", "case_type"]
+    export_filename = "cases_export.csv"
+    export_columns = (
+        ("Case Name", "name"),
+        ("Industry", "opportunity.lead.company.industry"),
+        ("Contact", export.full_name("opportunity.lead.contact")),
+        ("Result", "opportunity.expected_revenue"),
+        ("Close Date", "closed_on"),
+        ("Assigned To", export.profile_names("assigned_to")),
+    )
+    export_select_related = (
+        "opportunity__lead__company",
+        "opportunity__lead__contact",
+    )
+    export_prefetch_related = ("assigned_to__user",)
 
     @extend_schema(
-        parameters=cases_list_get_params, responses=CaseListSerializer(many=True)
+        parameters=cases_list_get_params + export_params,
+        responses=CaseListSerializer(many=True),
     )
     def get(self, request, *args, **kwargs):
-        export = request.query_params.get("export", "").lower() == "true"
-        if export:
-            print("Export flag detected. Generating CSV...")
-            queryset = self.filter_queryset(
-                self.get_queryset()
-            )  # Confirm this line executes without error
-            print("Queryset count:", queryset.count())
-            response = HttpResponse(content_type="text/csv")
-            response["Content-Disposition"] = 'attachment; filename="cases_export.csv"'
-
-            # Force the response to be treated as CSV
-            response["Content-Type"] = "text/csv"
-
-            writer = csv.writer(response)
-            writer.writerow(
-                [
-                    "Case Name",
-                    "Industry",
-                    "Contact",
-                    "Result",
-                    "Close Date",
-                    "Assigned To",
-                ]
-            )
-
-            queryset = self.filter_queryset(self.get_queryset())
-            for case in queryset:
-                writer.writerow(
-                    [
-                        case.name,
-                        case.opportunity.lead.company.industry
-                        if case.opportunity
-                        and case.opportunity.lead
-                        and case.opportunity.lead.company
-                        else "",
-                        f"{case.opportunity.lead.contact.first_name} {case.opportunity.lead.contact.last_name}"
-                        if case.opportunity
-                        and case.opportunity.lead
-                        and case.opportunity.lead.contact
-                        else "",
-                        str(case.expected_revenue) if case.expected_revenue else "",
-                        case.closed_on.strftime("%Y-%m-%d") if case.closed_on else "",
-                        ", ".join(
-                            [
-                                f"{user.first_name} {user.last_name}"
-                                for user in case.assigned_to.all()
-                            ]
-                        ),
-                    ]
-                )
-
-            return response
+        if export.is_requested(request):
+            return self.export_csv()
         return super().get(request, *args, **kwargs)
 
+    def get_filtered_queryset(self):
+        return self.filter_queryset(self.get_queryset())
+
     def get_profile(self):
         """Safely get user profile with proper error handling"""
         try:
@@ -335,17 +304,20 @@ class CaseListView(generics.ListAPIView):
                 Q(created_by=self.request.user) | Q(assigned_to=self.request.profile)
             ).distinct()
 
-        return (
+        queryset = (
             queryset.select_related(
                 "opportunity",
                 "opportunity__lead",
                 "opportunity__lead__company",
                 "opportunity__lead__contact",
                 "account",
+                "created_by",
             )
-            .prefetch_related("contacts", "assigned_to", "assigned_to__user")
+            .prefetch_related("contacts", "assigned_to", "assigned_to__user", "teams")
             .order_by("-created_at")
         )
+        # ?fields=/?expand= (common.sparse_fields)
+        return CaseListSerializer.prune_queryset(queryset, self.request)
 
     def handle_exception(self, exc):
         """Custom exception handling for consistent error responses"""
@@ -489,7 +461,9 @@ class CaseDetailView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
         context = {}
-        context["cases_obj"] = CaseSerializer(self.cases).data
+        context["cases_obj"] = CaseSerializer(
+            self.cases, context={"request": self.request}
+        ).data
         if (
             self.request.profile.role not in ["ADMIN", "MANAGER"]
             and not self.request.user.is_superuser
@@ -601,7 +575,9 @@ class CaseDetailView(APIView):
 
         context.update(
             {
-                "cases_obj": CaseSerializer(self.cases_obj).data,
+                "cases_obj": CaseSerializer(
+                    self.cases_obj, context={"request": self.request}
+                ).data,
                 "attachments": AttachmentsSerializer(attachments, many=True).data,
                 "comments": CommentSerializer(comments, many=True).data,
             }
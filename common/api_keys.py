@@ -0,0 +1,125 @@
+"""
+Resolution of machine-to-machine api keys.
+
+Two kinds of keys exist: ``Org.api_key`` (``Token`` header, acts as the first
+ADMIN profile of the org) and ``APISettings.apikey`` (website lead forms).
+Both are looked up through the indexed sha256 digest columns and the result
+is cached in ``CACHES["default"]`` under the digest, so the plain key never
+ends up in a cache key. Unknown keys are cached too, for a shorter time.
+
+Cached entries are revoked from ``common.signals`` when the org, its profiles
+or the api setting change, or explicitly with ``revoke_api_key``.
+"""
+import logging
+import pickle
+
+from django.conf import settings
+from django.core.cache import cache
+
+from common.models import APISettings, Org, Profile, api_key_digest
+
+logger = logging.getLogger(__name__)
+
+ORG_KEY_PREFIX = "api_key:org"
+SITE_KEY_PREFIX = "api_key:site"
+# stored for keys that don't match anything
+MISSING = b"missing"
+
+
+def _timeout():
+    return getattr(settings, "API_KEY_CACHE_TIMEOUT", 600)
+
+
+def _missing_timeout():
+    return getattr(settings, "API_KEY_CACHE_MISSING_TIMEOUT", 60)
+
+
+def _cache_get(key):
+    try:
+        return cache.get(key)
+    except Exception as e:
+        logger.warning(f"Api key cache read failed: {str(e)}")
+        return None
+
+
+def _cache_set(key, value, timeout):
+    try:
+        cache.set(key, value, timeout)
+    except Exception as e:
+        logger.warning(f"Api key cache write failed: {str(e)}")
+
+
+def _resolve(cache_key, load):
+    payload = _cache_get(cache_key)
+    if payload == MISSING:
+        return None
+    if payload is not None:
+        return pickle.loads(payload)
+
+    value = load()
+    if value is None:
+        _cache_set(cache_key, MISSING, _missing_timeout())
+        return None
+    _cache_set(cache_key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), _timeout())
+    return value
+
+
+def resolve_org_api_key(key):
+    """
+    Return ``(org, acting_profile)`` for an ``Org.api_key`` or ``None``.
+    ``acting_profile`` is the first ADMIN profile of the org and may be None.
+    """
+    digest = api_key_digest(key)
+    if not digest:
+        return None
+
+    def load():
+        org = Org.objects.filter(api_key_digest=digest).first()
+        if org is None:
+            return None
+        profile = (
+            Profile.objects.select_related("user", "org")
+            .filter(org=org, role="ADMIN")
+            .first()
+        )
+        return org, profile
+
+    return _resolve(f"{ORG_KEY_PREFIX}:{digest}", load)
+
+
+def resolve_site_api_key(key):
+    """Return the ``APISettings`` of a website api key or ``None``"""
+    digest = api_key_digest(key)
+    if not digest:
+        return None
+
+    def load():
+        return (
+            APISettings.objects.select_related("org", "created_by")
+            .filter(apikey_digest=digest)
+            .first()
+        )
+
+    return _resolve(f"{SITE_KEY_PREFIX}:{digest}", load)
+
+
+def revoke_digests(org_digests=(), site_digests=()):
+    keys = [f"{ORG_KEY_PREFIX}:{digest}" for digest in org_digests if digest]
+    keys += [f"{SITE_KEY_PREFIX}:{digest}" for digest in site_digests if digest]
+    if not keys:
+        return
+    try:
+        cache.delete_many(keys)
+    except Exception as e:
+        logger.warning(f"Api key cache revocation failed: {str(e)}")
+
+
+def revoke_api_key(key):
+    """Drop whatever is cached for a plain key, org or website one"""
+    digest = api_key_digest(key)
+    revoke_digests(org_digests=[digest], site_digests=[digest])
+
+
+def revoke_org(org_id):
+    digests = Org.objects.filter(id=org_id).values_list("api_key_digest", flat=True)
+    revoke_digests(org_digests=digests)
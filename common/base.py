@@ -2,6 +2,7 @@ import uuid
 
 # Django imports
 from django.db import models
+from django.utils import timezone
 
 # Third party imports
 from crum import get_current_user
@@ -10,11 +11,79 @@ from crum import get_current_user
 from common.mixins import AuditModel
 
 
+class AuditedQuerySet(models.QuerySet):
+    """
+    ``bulk_create``, ``bulk_update`` and ``update`` stamping the audit fields
+    as ``BaseModel.save`` does, for the batched writes (``Model.audited``).
+
+    The user stamped is the one of the request, or the one given with
+    ``as_user`` (Celery tasks, which run out of requests). Without either,
+    ``created_by``/``updated_by`` are left as the caller set them;
+    ``updated_at`` is always stamped.
+    """
+
+    _audit_user = None
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._audit_user = self._audit_user
+        return clone
+
+    def as_user(self, user):
+        """The rows written are stamped with ``user`` (a user or its id)"""
+        clone = self._chain()
+        clone._audit_user = user
+        return clone
+
+    def _audit_user_id(self):
+        user = self._audit_user
+        if user is None:
+            user = get_current_user()
+            if user is None or user.is_anonymous:
+                return None
+        return getattr(user, "pk", user)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        user_id = self._audit_user_id()
+        if user_id is not None:
+            for obj in objs:
+                obj.created_by_id = obj.updated_by_id = user_id
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        user_id = self._audit_user_id()
+        now = timezone.now()
+        fields = set(fields) | {"updated_at"}
+        if user_id is not None:
+            fields.add("updated_by")
+        for obj in objs:
+            obj.updated_at = now
+            if user_id is not None:
+                obj.updated_by_id = user_id
+        return super().bulk_update(objs, sorted(fields), *args, **kwargs)
+
+    def update(self, **kwargs):
+        kwargs.setdefault("updated_at", timezone.now())
+        user_id = self._audit_user_id()
+        if user_id is not None:
+            kwargs.setdefault("updated_by", user_id)
+        return super().update(**kwargs)
+
+
+AuditedManager = models.Manager.from_queryset(AuditedQuerySet)
+
+
 class BaseModel(AuditModel):
     id = models.UUIDField(
         default=uuid.uuid4, unique=True, editable=False, db_index=True, primary_key=True
     )
 
+    objects = models.Manager()
+    # batched writes stamping the audit fields, see AuditedQuerySet
+    audited = AuditedManager()
+
     class Meta:
         abstract = True
 
@@ -35,4 +104,4 @@ class BaseModel(AuditModel):
             super(BaseModel, self).save(*args, **kwargs)
 
     def __str__(self):
-        return str(self.id)
\ No newline at end of file
+        return str(self.id)
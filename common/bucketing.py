@@ -0,0 +1,142 @@
+"""
+Bucketed listing engine.
+
+Several list views split one queryset into buckets (open/closed leads,
+active/won/lost opportunities, one column per pipeline stage) and page each
+bucket separately. Done naively that is a page query plus two or three
+counts per bucket. ``BucketedListing`` needs two queries whatever the number
+of buckets:
+
+* ``counts()``: one aggregate with a ``COUNT(... FILTER (WHERE ...))`` per
+  bucket;
+* ``pages()``: one query numbering the rows of every bucket with
+  ``ROW_NUMBER() OVER (PARTITION BY <bucket> ORDER BY created_at DESC, id DESC)``
+  and keeping the requested window of each one.
+
+Rows are ordered newest first, (created_at, id) descending, the same order as
+``KeysetPagination``. The list views used to order by ``-id`` alone, which on
+random UUID keys is no meaningful order.
+"""
+from django.db.models import Case, CharField, Count, F, Q, Value, When, Window
+from django.db.models.functions import RowNumber
+
+
+def related_lookups(select_related, prefix=""):
+    """``query.select_related`` ({"lead": {"company": {}}}) as lookups"""
+    lookups = []
+    for field, nested in select_related.items():
+        lookup = f"{prefix}{field}"
+        lookups += related_lookups(nested, f"{lookup}__") if nested else [lookup]
+    return lookups
+
+
+class BucketedListing:
+    ordering = ("-created_at", "-id")
+
+    def __init__(self, queryset, buckets, ordering=None, annotations=None):
+        """
+        ``buckets`` maps a bucket name to the ``Q`` selecting its rows, the
+        first matching bucket wins for rows matched by several of them.
+        ``annotations`` are added to the rows, ``ordering`` may refer to them.
+        """
+        self.queryset = queryset
+        self.buckets = dict(buckets)
+        self.annotations = annotations or {}
+        if ordering:
+            self.ordering = ordering
+
+    @classmethod
+    def by_field(cls, queryset, field, values, ordering=None):
+        """One bucket per value of ``field``, named after the value"""
+        return cls(
+            queryset, {value: Q(**{field: value}) for value in values}, ordering
+        )
+
+    def _deduplicated(self):
+        # permission filters join m2m tables and may repeat rows, number the
+        # rows on a clean queryset instead
+        model = self.queryset.model
+        return model._default_manager.filter(
+            pk__in=self.queryset.order_by().values("pk")
+        )
+
+    def counts(self):
+        """Row count of every bucket, in a single query"""
+        if not self.buckets:
+            return {}
+        aggregates = {
+            f"bucket_{index}": Count("pk", filter=condition, distinct=True)
+            for index, condition in enumerate(self.buckets.values())
+        }
+        result = self._deduplicated().aggregate(**aggregates)
+        return {
+            name: result[f"bucket_{index}"]
+            for index, name in enumerate(self.buckets)
+        }
+
+    def pages(self, limit, offsets=None):
+        """
+        Rows ``offset + 1 .. offset + limit`` of every bucket in one query.
+        ``offsets`` maps bucket names to their offset (0 when missing).
+        Returns a dict of lists, rows keep the related lookups
+        (select_related/prefetch_related) of the original queryset.
+        """
+        offsets = offsets or {}
+        if not self.buckets or limit <= 0:
+            return {name: [] for name in self.buckets}
+
+        bucket = Case(
+            *[
+                When(condition, then=Value(name))
+                for name, condition in self.buckets.items()
+            ],
+            default=Value(None),
+            output_field=CharField(),
+        )
+        order_by = [
+            F(field[1:]).desc() if field.startswith("-") else F(field).asc()
+            for field in self.ordering
+        ]
+        window = Q()
+        for name in self.buckets:
+            offset = max(int(offsets.get(name) or 0), 0)
+            window |= Q(
+                _bucket=name, _bucket_row__gt=offset, _bucket_row__lte=offset + limit
+            )
+
+        rows = (
+            self._deduplicated()
+            .annotate(**self.annotations)
+            .annotate(_bucket=bucket)
+            .filter(_bucket__isnull=False)
+            .annotate(
+                _bucket_row=Window(
+                    RowNumber(), partition_by=[F("_bucket")], order_by=order_by
+                )
+            )
+            .filter(window)
+            .order_by("_bucket", "_bucket_row")
+        )
+        # keep select_related/prefetch_related of the caller's queryset
+        select_related = self.queryset.query.select_related
+        if select_related is True:
+            rows = rows.select_related()
+        elif select_related:
+            rows = rows.select_related(*related_lookups(select_related))
+        rows = rows.prefetch_related(*self.queryset._prefetch_related_lookups)
+
+        pages = {name: [] for name in self.buckets}
+        for row in rows:
+            pages[row._bucket].append(row)
+        return pages
+
+    @staticmethod
+    def next_offset(offset, page, count):
+        """
+        The "offset" the list views return: how many rows of the bucket have
+        been sent so far, None once the bucket is exhausted.
+        """
+        if not page:
+            return 0
+        sent = offset + len(page)
+        return None if sent >= count else sent
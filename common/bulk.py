@@ -0,0 +1,326 @@
+"""
+Batch create, update and delete of the rows of an org.
+
+``BulkWriteView`` takes up to ``BULK_WRITE_MAX_ITEMS`` (default 1000) rows
+per request:
+
+* ``POST {"items": [{...}, ...]}`` creates rows;
+* ``PATCH {"items": [{"id": ..., ...}, ...]}`` updates the given fields;
+* ``DELETE {"ids": [...]}`` deletes rows.
+
+Every item goes through the serializer of the view for its own fields, with
+the per row database validators (``UniqueValidator``, related rows) left out.
+These are checked for the whole batch instead: one query per foreign key
+(``relations``) for the ids that aren't rows of the org, one per unique
+field (``unique_fields``) for the values already taken, plus duplicates
+within the batch. The valid items are then written with ``bulk_create`` /
+``bulk_update`` of ``BaseModel.audited`` in one transaction, which stamps
+the audit fields as ``BaseModel.save`` would. Invalid items are left out
+and reported: the response has one result per item, in order.
+
+``bulk_create`` and ``bulk_update`` skip the model signals, so the rows
+written are passed to ``rows_written`` once the transaction commits to
+refresh what the signals maintain (lookups stamps, search entries,
+dashboard rollups) with ``refresh_written_rows``, which the lead import
+uses too. Deletes go through ``QuerySet.delete`` and its signals.
+Side effects of the single row endpoints (notification emails, lead
+conversion) are not run for batches.
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.validators import UniqueValidator
+from rest_framework.views import APIView
+
+from common import dashboard_rollups, global_search, reference_data
+
+
+def max_items():
+    return getattr(settings, "BULK_WRITE_MAX_ITEMS", 1000)
+
+
+def refresh_written_rows(model, org_id, pks, search_entity=None, batch_size=500):
+    """
+    Refresh what the signals of ``model`` maintain for the rows ``pks`` of
+    the org written by ``bulk_create``/``bulk_update``.
+    """
+    reference_data.bump(model._meta.label, org_id)
+    dashboard_rollups.mark_stale(org_id)
+    if search_entity:
+        global_search.index_objects(search_entity, org_id, pks, batch_size)
+
+
+def _error(errors):
+    return Response(
+        {"error": True, "errors": errors}, status=status.HTTP_400_BAD_REQUEST
+    )
+
+
+class BulkWriteView(APIView):
+    """
+    Subclasses set ``model``, ``serializer_class``, ``relations`` (field ->
+    model of the foreign keys given as ids) and ``unique_fields`` (field ->
+    True when unique in the whole table, False when unique in the org,
+    compared case-insensitively), and restrict ``get_queryset`` to the rows
+    the user may change.
+    """
+
+    permission_classes = (IsAuthenticated,)
+    model = None
+    serializer_class = None
+    relations = {}
+    unique_fields = {}
+    # global_search.SOURCES entity of the rows
+    search_entity = None
+    batch_size = 500
+
+    @property
+    def org_field(self):
+        return reference_data.org_field(self.model)
+
+    def get_queryset(self, request):
+        """Rows the user can update or delete"""
+        return self.model._default_manager.filter(
+            **{self.org_field: request.profile.org}
+        )
+
+    def get_serializer_kwargs(self, request):
+        return {"context": {"request": request}}
+
+    def get_serializer(self, request, instance=None, data=None):
+        serializer = self.serializer_class(
+            instance,
+            data=data,
+            partial=instance is not None,
+            **self.get_serializer_kwargs(request),
+        )
+        # checked for the whole batch in check_unique
+        serializer.validators = []
+        for field in serializer.fields.values():
+            field.validators = [
+                validator
+                for validator in field.validators
+                if not isinstance(validator, UniqueValidator)
+            ]
+        return serializer
+
+    def clean_pk(self, value):
+        """``value`` as the string of a primary key, None when it isn't one"""
+        try:
+            pk = self.model._meta.pk.to_python(value)
+        except ValidationError:
+            return None
+        return str(pk) if pk is not None else None
+
+    def get_items(self, request, key):
+        items = request.data.get(key) if hasattr(request.data, "get") else None
+        if not isinstance(items, list) or not items:
+            return None, _error(f"'{key}' must be a non empty list")
+        if len(items) > max_items():
+            return None, _error(f"At most {max_items()} items per request")
+        return items, None
+
+    def validate(self, request, items, instances=None):
+        """
+        ``(results, valid)``: one result per item, with the errors of the
+        invalid ones, and the validated data of the valid ones by index.
+        ``instances`` (pk -> row) are the rows updated by the items.
+        """
+        results = [{"index": index} for index in range(len(items))]
+        valid = {}
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[index]["errors"] = {"non_field_errors": ["Expected an object"]}
+                continue
+            instance = None
+            if instances is not None:
+                pk = self.clean_pk(item.get("id"))
+                instance = instances.get(pk)
+                if instance is None:
+                    results[index]["errors"] = {"id": ["Not found"]}
+                    continue
+                results[index]["id"] = pk
+            serializer = self.get_serializer(request, instance, item)
+            if serializer.is_valid():
+                valid[index] = serializer.validated_data
+            else:
+                results[index]["errors"] = serializer.errors
+
+        for check in (self.check_relations, self.check_unique):
+            for index, errors in check(request, valid, results).items():
+                results[index].setdefault("errors", {}).update(errors)
+                valid.pop(index, None)
+        return results, valid
+
+    def check_relations(self, request, valid, results):
+        errors = {}
+        for field, model in self.relations.items():
+            ids = {str(data[field]) for data in valid.values() if data.get(field)}
+            if not ids:
+                continue
+            found = {
+                str(pk)
+                for pk in model._default_manager.filter(
+                    **{reference_data.org_field(model): request.profile.org},
+                    pk__in=ids,
+                ).values_list("pk", flat=True)
+            }
+            for index, data in valid.items():
+                if data.get(field) and str(data[field]) not in found:
+                    errors.setdefault(index, {})[field] = [f"Invalid {field} ID"]
+        return errors
+
+    def check_unique(self, request, valid, results):
+        errors = {}
+        for field, table_wide in self.unique_fields.items():
+            values = {}
+            for index, data in valid.items():
+                if data.get(field):
+                    values.setdefault(str(data[field]).lower(), []).append(index)
+            if not values:
+                continue
+            queryset = self.model._default_manager.all()
+            if not table_wide:
+                queryset = queryset.filter(**{self.org_field: request.profile.org})
+            taken = dict(
+                queryset.annotate(value=Lower(field))
+                .filter(value__in=list(values))
+                .values_list("value", "pk")
+            )
+            for value, indexes in values.items():
+                for index in indexes:
+                    if len(indexes) > 1:
+                        message = f"Duplicate {field} in this batch"
+                    elif value in taken and str(taken[value]) != results[index].get(
+                        "id"
+                    ):
+                        message = f"{field} already exists"
+                    else:
+                        continue
+                    errors.setdefault(index, {})[field] = [message]
+        return errors
+
+    def to_fields(self, data):
+        """Model field values of validated ``data``"""
+        fields = dict(data)
+        for field in self.relations:
+            if field in fields:
+                fields[f"{field}_id"] = fields.pop(field)
+        return fields
+
+    def rows_written(self, request, pks, created):
+        """Refresh what the signals of the model maintain, after commit"""
+        refresh_written_rows(
+            self.model,
+            request.profile.org_id,
+            pks,
+            self.search_entity,
+            self.batch_size,
+        )
+
+    def write(self, request, objects, fields=None):
+        """
+        ``bulk_create`` (or ``bulk_update`` of ``fields``) of ``objects``, a
+        409 response when the database rejects them.
+        """
+        manager = self.model.audited.as_user(request.user)
+        try:
+            with transaction.atomic():
+                if fields is None:
+                    manager.bulk_create(objects, batch_size=self.batch_size)
+                else:
+                    manager.bulk_update(objects, fields, batch_size=self.batch_size)
+        except IntegrityError as e:
+            # rows written by someone else since the checks
+            return Response(
+                {"error": True, "errors": f"Batch not saved: {str(e)}"},
+                status=status.HTTP_409_CONFLICT,
+            )
+        pks = [obj.pk for obj in objects]
+        if pks:
+            transaction.on_commit(
+                lambda: self.rows_written(request, pks, fields is None)
+            )
+        return None
+
+    def respond(self, results, action, status_code=status.HTTP_200_OK):
+        failed = 0
+        for result in results:
+            result["status"] = "error" if "errors" in result else action
+            failed += "errors" in result
+        if failed == len(results):
+            status_code = status.HTTP_400_BAD_REQUEST
+        return Response(
+            {
+                "error": bool(failed),
+                "processed": len(results) - failed,
+                "failed": failed,
+                "results": results,
+            },
+            status=status_code,
+        )
+
+    def post(self, request, *args, **kwargs):
+        items, error = self.get_items(request, "items")
+        if error:
+            return error
+        results, valid = self.validate(request, items)
+
+        objects = []
+        for index, data in valid.items():
+            obj = self.model(**self.to_fields(data))
+            setattr(obj, f"{self.org_field}_id", request.profile.org_id)
+            objects.append(obj)
+            results[index]["id"] = str(obj.pk)
+        error = self.write(request, objects)
+        return error or self.respond(results, "created", status.HTTP_201_CREATED)
+
+    def patch(self, request, *args, **kwargs):
+        items, error = self.get_items(request, "items")
+        if error:
+            return error
+        pks = {
+            self.clean_pk(item.get("id")) for item in items if isinstance(item, dict)
+        } - {None}
+        instances = {
+            str(pk): obj
+            for pk, obj in self.get_queryset(request).in_bulk(list(pks)).items()
+        }
+        results, valid = self.validate(request, items, instances)
+
+        objects, fields = {}, set()
+        for index, data in valid.items():
+            obj = instances[results[index]["id"]]
+            for name, value in self.to_fields(data).items():
+                setattr(obj, name, value)
+                fields.add(name)
+            objects[obj.pk] = obj
+        error = self.write(request, list(objects.values()), sorted(fields))
+        return error or self.respond(results, "updated")
+
+    def delete(self, request, *args, **kwargs):
+        ids, error = self.get_items(request, "ids")
+        if error:
+            return error
+        pks = [
+            self.clean_pk(value) if isinstance(value, str) else None for value in ids
+        ]
+        found = {
+            str(pk)
+            for pk in self.get_queryset(request)
+            .filter(pk__in=[pk for pk in pks if pk])
+            .values_list("pk", flat=True)
+        }
+        results = []
+        for index, (value, pk) in enumerate(zip(ids, pks)):
+            result = {"index": index, "id": pk or value}
+            if pk not in found:
+                result["errors"] = {"id": ["Not found"]}
+            results.append(result)
+        with transaction.atomic():
+            self.model._default_manager.filter(pk__in=found).delete()
+        return self.respond(results, "deleted")
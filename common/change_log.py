@@ -0,0 +1,209 @@
+"""
+Change log of the core entities.
+
+Every save of a row of ``SOURCES`` adds a ``ChangeLogEntry`` with the fields
+it changed, ``{field: [old, new]}`` (foreign keys by id, dates in ISO
+format), the user of the request and the time; creates and deletes add an
+entry without changes. The values a row was loaded with are kept on the
+instance (``post_init``), so the diff costs no query.
+
+Entries aren't written by the saves: they are buffered until the
+transaction commits and written then with one ``bulk_create``
+(``transaction.on_commit``), so a request saving many rows writes its log
+once, and a rolled back transaction (or savepoint) logs nothing. Saves out
+of transactions write their entry at once.
+
+Many to many fields aren't logged, nor the writes that skip the model
+signals (``bulk_create``, ``QuerySet.update``). ``GET
+/api/history/<entity>/<id>/`` serves the entries of a row, newest first.
+"""
+import datetime
+import threading
+import uuid
+from decimal import Decimal
+
+from crum import get_current_user
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils import timezone
+
+from common import reference_data
+from common.models import ChangeLogEntry
+
+# entity -> model and whether its assignees are profiles or users
+SOURCES = {
+    "lead": {"model": "leads.Lead", "assigned_to": "profile"},
+    "opportunity": {"model": "opportunity.Opportunity", "assigned_to": "profile"},
+    "account": {"model": "accounts.Account", "assigned_to": "profile"},
+    "contact": {"model": "contacts.Contact", "assigned_to": "profile"},
+    "case": {"model": "cases.Case", "assigned_to": "profile"},
+    "invoice": {"model": "invoices.Invoice", "assigned_to": "user"},
+}
+
+# maintained by BaseModel.save or derived from the other fields
+EXCLUDED_FIELDS = {
+    "created_at",
+    "updated_at",
+    "created_by",
+    "updated_by",
+    "search_vector",
+}
+
+_local = threading.local()
+
+
+def json_value(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, uuid.UUID)):
+        return str(value)
+    if isinstance(value, (list, dict)):
+        return value
+    # phone numbers...
+    return str(value)
+
+
+def tracked_fields(model):
+    """attname -> name of the fields of ``model`` logged"""
+    return {
+        field.attname: field.name
+        for field in model._meta.concrete_fields
+        if not field.primary_key and field.name not in EXCLUDED_FIELDS
+    }
+
+
+def _state(instance, fields):
+    # deferred fields aren't in __dict__
+    return {
+        attname: instance.__dict__[attname]
+        for attname in fields
+        if attname in instance.__dict__
+    }
+
+
+def diff(old, new, fields):
+    """``{field: [old, new]}`` of the values of ``new`` changed since ``old``"""
+    changes = {}
+    for attname, value in new.items():
+        if attname not in old:
+            continue
+        before, after = json_value(old[attname]), json_value(value)
+        if before != after:
+            changes[fields[attname]] = [before, after]
+    return changes
+
+
+class _Buffer:
+    """Entries of a transaction (or savepoint), written once it commits"""
+
+    def __init__(self, key):
+        self.key = key
+        self.entries = []
+
+    def flush(self):
+        buffers = getattr(_local, "buffers", {})
+        if buffers.get(self.key) is self:
+            del buffers[self.key]
+        ChangeLogEntry.objects.bulk_create(self.entries, batch_size=500)
+
+
+def _is_pending(connection, buffer):
+    return any(callback == buffer.flush for _, callback, _ in connection.run_on_commit)
+
+
+def record(entry):
+    """Write ``entry`` once the current transaction commits"""
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        ChangeLogEntry.objects.bulk_create([entry])
+        return
+    if not hasattr(_local, "buffers"):
+        _local.buffers = {}
+    # the callbacks of a rolled back savepoint are dropped with its buffer
+    key = (connection.alias, tuple(connection.savepoint_ids))
+    buffer = _local.buffers.get(key)
+    if buffer is None or not _is_pending(connection, buffer):
+        buffer = _local.buffers[key] = _Buffer(key)
+        transaction.on_commit(buffer.flush, robust=True)
+    buffer.entries.append(entry)
+
+
+def _user_id():
+    user = get_current_user()
+    if user is None or user.is_anonymous:
+        return None
+    return user.pk
+
+
+def _entry(entity, instance, action, changes=None):
+    org_field = reference_data.org_field(type(instance))
+    return ChangeLogEntry(
+        org_id=getattr(instance, f"{org_field}_id") if org_field else None,
+        entity=entity,
+        object_id=instance.pk,
+        action=action,
+        changes=changes or {},
+        user_id=_user_id(),
+        created_at=timezone.now(),
+    )
+
+
+def connect_signals():
+    for entity, source in SOURCES.items():
+        model = apps.get_model(source["model"])
+        fields = tracked_fields(model)
+
+        def row_loaded(sender, instance, fields=fields, **kwargs):
+            instance._change_log_state = _state(instance, fields)
+
+        def row_saved(
+            sender, instance, created, entity=entity, fields=fields, **kwargs
+        ):
+            if kwargs.get("raw"):
+                # fixtures
+                return
+            state = _state(instance, fields)
+            if created:
+                record(_entry(entity, instance, "create"))
+            else:
+                old = getattr(instance, "_change_log_state", {})
+                changes = diff(old, state, fields)
+                if changes:
+                    record(_entry(entity, instance, "update", changes))
+            instance._change_log_state = state
+
+        def row_deleted(sender, instance, entity=entity, **kwargs):
+            record(_entry(entity, instance, "delete"))
+
+        uid = f"change_log_{entity}"
+        post_init.connect(row_loaded, sender=model, weak=False, dispatch_uid=uid)
+        post_save.connect(
+            row_saved, sender=model, weak=False, dispatch_uid=f"{uid}_save"
+        )
+        post_delete.connect(
+            row_deleted, sender=model, weak=False, dispatch_uid=f"{uid}_delete"
+        )
+
+
+def can_view(request, entity, object_id):
+    """Whether the user of ``request`` may read the log of the row"""
+    if request.profile.role in ["ADMIN", "MANAGER"] or request.user.is_superuser:
+        return True
+    model = apps.get_model(SOURCES[entity]["model"])
+    if SOURCES[entity]["assigned_to"] == "profile":
+        assignee = request.profile
+    else:
+        assignee = request.user
+    return (
+        model._default_manager.filter(
+            Q(created_by=request.user) | Q(assigned_to=assignee),
+            pk=object_id,
+            **{reference_data.org_field(model): request.profile.org},
+        )
+        .distinct()
+        .exists()
+    )
@@ -0,0 +1,155 @@
+"""
+Conditional GET (``ETag`` / ``Last-Modified``) of the detail endpoints.
+
+The ETag of a detail payload is derived from:
+
+* the ``updated_at`` of the row and of the rows it embeds, read with one
+  aggregate query (``get_state``). Foreign keys (``contact``,
+  ``lead__company``) are joined, reverse and many to many relations
+  (``leads_comments``, ``lead__lead_attachment``) add the latest
+  ``updated_at`` and the number of their rows, so removing one changes the
+  ETag too;
+* the version stamps of ``common.reference_data`` for the org wide lists the
+  payload embeds (users of the org, teams...), read from the cache;
+* the user and the query parameters, as the payloads depend on both.
+
+Views check ``If-None-Match`` (or ``If-Modified-Since`` without it) after
+their permission checks and answer 304 before serializing anything.
+"""
+import hashlib
+from calendar import timegm
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import DateTimeField, F, Func, IntegerField, OuterRef, Subquery
+from django.db.models.constants import LOOKUP_SEP
+from django.utils.http import http_date, parse_http_date_safe
+
+from common.reference_data import SCHEMA_VERSION, get_versions
+
+
+def _has_updated_at(model):
+    try:
+        model._meta.get_field("updated_at")
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+def _aggregate(queryset, function, field, output_field):
+    return Subquery(
+        queryset.order_by()
+        .annotate(value=Func(F(field), function=function))
+        .values("value"),
+        output_field=output_field,
+    )
+
+
+def _expressions(model, path):
+    """name -> expression of the state of the rows behind ``path``"""
+    fields = []
+    current = model
+    for name in path.split(LOOKUP_SEP):
+        field = current._meta.get_field(name)
+        if not field.is_relation:
+            raise ImproperlyConfigured(f"{path} is not a relation of {model}")
+        fields.append(field)
+        current = field.related_model
+
+    *joined, last = fields
+    if any(field.many_to_many or field.one_to_many for field in joined):
+        raise ImproperlyConfigured(
+            f"{path}: reverse and many to many relations must come last"
+        )
+    if not (last.many_to_many or last.one_to_many):
+        if not _has_updated_at(current):
+            return {}
+        return {f"{path}:updated_at": F(f"{path}{LOOKUP_SEP}updated_at")}
+
+    owner = LOOKUP_SEP.join(field.name for field in joined) or "pk"
+    rows = current._default_manager.filter(**{last.remote_field.name: OuterRef(owner)})
+    expressions = {f"{path}:count": _aggregate(rows, "COUNT", "pk", IntegerField())}
+    if _has_updated_at(current):
+        expressions[f"{path}:updated_at"] = _aggregate(
+            rows, "MAX", "updated_at", DateTimeField()
+        )
+    return expressions
+
+
+def get_state(instance, related=()):
+    """``updated_at`` of ``instance`` and the state of its ``related`` rows"""
+    model = type(instance)
+    expressions = {}
+    for path in related:
+        expressions.update(_expressions(model, path))
+    # aliases can't clash with field names
+    aliases = {f"state_{index}": name for index, name in enumerate(expressions)}
+    row = (
+        model._default_manager.filter(pk=instance.pk)
+        .values(
+            "updated_at",
+            **{alias: expressions[name] for alias, name in aliases.items()},
+        )
+        .get()
+    )
+    state = {name: row[alias] for alias, name in aliases.items()}
+    state["updated_at"] = row["updated_at"]
+    return state
+
+
+class ConditionalGetMixin:
+    """
+    ``ETag``/``Last-Modified`` of a detail view. Views set
+    ``conditional_related`` (relations of the row embedded in the payload) and
+    ``conditional_dependencies`` (labels of ``reference_data.TRACKED_MODELS``)
+    and call, once the user is known to have access to ``instance``:
+
+        headers = self.get_conditional_headers(request, instance)
+        if self.is_not_modified(request, headers):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    """
+
+    conditional_related = ()
+    conditional_dependencies = ()
+
+    def get_conditional_headers(self, request, instance):
+        state = get_state(instance, self.conditional_related)
+        versions = get_versions(self.conditional_dependencies, request.profile.org_id)
+        params = sorted(
+            (key, value)
+            for key in request.query_params
+            for value in request.query_params.getlist(key)
+        )
+        raw = (
+            f"{SCHEMA_VERSION}:{type(self).__name__}:{instance.pk}:"
+            f"{request.profile.id}:{params}:{sorted(state.items())}:{versions}"
+        )
+
+        # stamps are time_ns() of the last change
+        timestamps = [
+            timegm(value.utctimetuple())
+            for value in state.values()
+            if hasattr(value, "utctimetuple")
+        ]
+        timestamps += [int(version.split("=")[1]) // 10**9 for version in versions]
+        headers = {
+            "ETag": f'"{hashlib.md5(raw.encode()).hexdigest()}"',
+            "Cache-Control": "private, no-cache",
+            "Vary": "Authorization, Org",
+        }
+        if timestamps:
+            headers["Last-Modified"] = http_date(max(timestamps))
+        return headers
+
+    def is_not_modified(self, request, headers):
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or headers["ETag"] in [
+                tag.removeprefix("W/") for tag in tags
+            ]
+
+        since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+        last_modified = parse_http_date_safe(headers.get("Last-Modified", ""))
+        if since is None or last_modified is None:
+            return False
+        return last_modified <= since
@@ -0,0 +1,287 @@
+"""
+Materialized counters of the dashboard summary.
+
+``DashboardSummaryView`` used to run a dozen aggregates over the companies,
+contacts, accounts, leads and opportunities of the org on every load. The
+counts now live in ``DashboardRollup``: one row per (org, profile, entity,
+status, day) with the number of rows and the sum of their value, ``profile``
+being None for the org wide counters. The summary is one aggregate over the
+rollup rows of the org (or of the profile for non admin users), whatever the
+size of the tables.
+
+Rollups are maintained incrementally: saving or deleting a row (or changing
+its assignees) schedules ``common.tasks.refresh_dashboard_rollup`` which
+recomputes the counters of that (org, entity, day) only. The first dashboard
+load of an org, or of an org marked stale, queues
+``common.tasks.rebuild_dashboard_rollups`` for it and is answered from the
+tables until the rollups are built. Writes that skip the signals
+(``QuerySet.update``, ``bulk_create``, raw SQL) are picked up by the same
+task, meant to be run periodically.
+
+Custom ``days=`` windows don't line up with daily counters and are still
+computed from the tables.
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils import timezone
+
+from common import reference_data
+from common.models import DashboardRollup, DashboardRollupState, Profile
+
+logger = logging.getLogger(__name__)
+
+# entity -> source model and the fields the counters are built from. Rows
+# visible to a non admin profile are the ones it created and, when
+# "assigned_to" is set, the ones assigned to it (same rules as the view).
+SOURCES = {
+    "company": {"model": "companies.CompanyProfile", "org": "org"},
+    "contact": {"model": "contacts.Contact", "org": "org"},
+    "account": {
+        "model": "accounts.Account",
+        "org": "org",
+        "assigned_to": "assigned_to",
+    },
+    "lead": {
+        "model": "leads.Lead",
+        "org": "organization",
+        "status": "status",
+        "assigned_to": "assigned_to",
+    },
+    "opportunity": {
+        "model": "opportunity.Opportunity",
+        "org": "org",
+        "status": "stage",
+        "value": "expected_revenue",
+        "assigned_to": "assigned_to",
+    },
+}
+
+# stamp of common.reference_data bumped whenever counters of the org change,
+# cached dashboard responses depend on it
+VERSION_LABEL = "common.DashboardRollup"
+
+# stages left out of the opportunity counts when no stage is asked for
+CLOSED_OPPORTUNITY_STAGES = ["CLOSE", "CLOSED LOST", "CLOSED WON"]
+
+
+def _local_day(value):
+    return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+def compute(org_id, entity, day=None):
+    """Unsaved rollup rows of an entity of the org, for one day or all of them"""
+    source = SOURCES[entity]
+    model = apps.get_model(source["model"])
+    queryset = model._default_manager.filter(**{source["org"]: org_id})
+    if day:
+        queryset = queryset.filter(created_at__date=day)
+
+    status_field = source.get("status")
+    value_field = source.get("value")
+    fields = ["id", "created_by_id", "_day"]
+    fields += [field for field in (status_field, value_field) if field]
+    rows = queryset.annotate(_day=TruncDate("created_at")).values_list(*fields)
+
+    assignees = defaultdict(set)
+    if source.get("assigned_to"):
+        assigned = queryset.filter(
+            **{f"{source['assigned_to']}__isnull": False}
+        ).values_list("id", source["assigned_to"])
+        for pk, profile_id in assigned:
+            assignees[pk].add(profile_id)
+    profiles = dict(
+        Profile.objects.filter(org_id=org_id).values_list("user_id", "id")
+    )
+
+    totals = defaultdict(lambda: [0, Decimal(0)])
+    for row in rows.iterator():
+        pk, created_by_id, row_day = row[:3]
+        status = row[3] if status_field else None
+        value = (row[-1] or 0) if value_field else 0
+        viewers = {None} | assignees.get(pk, set())
+        if created_by_id in profiles:
+            viewers.add(profiles[created_by_id])
+        for profile_id in viewers:
+            total = totals[(profile_id, status, row_day)]
+            total[0] += 1
+            total[1] += value
+
+    return [
+        DashboardRollup(
+            org_id=org_id,
+            profile_id=profile_id,
+            entity=entity,
+            status=status,
+            day=row_day,
+            count=count,
+            value=value,
+        )
+        for (profile_id, status, row_day), (count, value) in totals.items()
+    ]
+
+
+def _lock_state(org_id):
+    DashboardRollupState.objects.get_or_create(org_id=org_id)
+    return DashboardRollupState.objects.select_for_update().get(org_id=org_id)
+
+
+def _rebuild_lock_key(org_id):
+    return f"dashboard_rollup:rebuild:{org_id}"
+
+
+def rebuild(org_id):
+    """Recompute every counter of the org"""
+    with transaction.atomic():
+        state = _lock_state(org_id)
+        was_built = state.built_at is not None
+        DashboardRollup.objects.filter(org_id=org_id).delete()
+        for entity in SOURCES:
+            DashboardRollup.objects.bulk_create(compute(org_id, entity), batch_size=1000)
+        state.built_at = timezone.now()
+        state.save(update_fields=["built_at"])
+    cache.delete(_rebuild_lock_key(org_id))
+    if was_built:
+        # mark_stale already bumped the stamp of orgs that weren't built
+        reference_data.bump(VERSION_LABEL, org_id)
+
+
+def refresh(org_id, entity, day):
+    """Recompute the counters of one (org, entity, day), once the org is built"""
+    with transaction.atomic():
+        state = _lock_state(org_id)
+        if state.built_at is None:
+            # rebuilt in full by the task the next dashboard load queues
+            return
+        DashboardRollup.objects.filter(org_id=org_id, entity=entity, day=day).delete()
+        DashboardRollup.objects.bulk_create(compute(org_id, entity, day))
+    reference_data.bump(VERSION_LABEL, org_id)
+
+
+def mark_stale(org_id):
+    DashboardRollupState.objects.filter(org_id=org_id).update(built_at=None)
+    reference_data.bump(VERSION_LABEL, org_id)
+
+
+def schedule_rebuild(org_id):
+    """Queue a rebuild of the org unless one is already queued"""
+    from common.tasks import rebuild_dashboard_rollups
+
+    lock_key = _rebuild_lock_key(org_id)
+    timeout = getattr(settings, "DASHBOARD_ROLLUP_REBUILD_LOCK", 300)
+    if not cache.add(lock_key, 1, timeout):
+        return
+    try:
+        rebuild_dashboard_rollups.delay(str(org_id))
+    except Exception as e:
+        logger.warning(f"Dashboard rollup rebuild could not be queued: {str(e)}")
+        cache.delete(lock_key)
+
+
+def get_summary(org, profile=None, lead_status=None, opportunity_stage=None):
+    """
+    Counters of the dashboard summary for the org, restricted to what
+    ``profile`` can see when given. Returns None and queues a rebuild when
+    the org isn't built, callers compute the summary from the tables then.
+    """
+    if not DashboardRollupState.objects.filter(
+        org=org, built_at__isnull=False
+    ).exists():
+        schedule_rebuild(org.id)
+        return None
+
+    rows = (
+        DashboardRollup.objects.filter(org=org, profile=profile)
+        .values("entity", "status")
+        .annotate(count=Sum("count"), value=Sum("value"))
+    )
+    counts = defaultdict(int)
+    leads_by_status = {}
+    opportunities_by_stage = {}
+    pipeline_value = 0
+    for row in rows:
+        entity, status = row["entity"], row["status"]
+        if entity == "lead":
+            if lead_status and status != lead_status:
+                continue
+            leads_by_status[status] = row["count"]
+        elif entity == "opportunity":
+            if opportunity_stage:
+                if status != opportunity_stage:
+                    continue
+            elif status in CLOSED_OPPORTUNITY_STAGES:
+                continue
+            opportunities_by_stage[status] = row["count"]
+            pipeline_value += row["value"] or 0
+        counts[entity] += row["count"]
+
+    return {
+        "companies_count": counts["company"],
+        "contacts_count": counts["contact"],
+        "accounts_count": counts["account"],
+        "leads_count": counts["lead"],
+        "opportunities_count": counts["opportunity"],
+        "total_pipeline_value": round(pipeline_value, 3),
+        "leads_by_status": leads_by_status,
+        "opportunities_by_stage": opportunities_by_stage,
+    }
+
+
+def schedule_refresh(org_id, entity, day):
+    from common.tasks import refresh_dashboard_rollup
+
+    try:
+        refresh_dashboard_rollup.delay(str(org_id), entity, day.isoformat())
+    except Exception as e:
+        # answered from the tables and rebuilt rather than left wrong
+        logger.warning(f"Dashboard rollup refresh could not be queued: {str(e)}")
+        mark_stale(org_id)
+
+
+def _row_changed(sender, instance, entity, **kwargs):
+    org_id = getattr(instance, f"{SOURCES[entity]['org']}_id", None)
+    if org_id is None or instance.created_at is None:
+        return
+    day = _local_day(instance.created_at)
+    transaction.on_commit(lambda: schedule_refresh(org_id, entity, day))
+
+
+def connect_signals():
+    for entity, source in SOURCES.items():
+        model = apps.get_model(source["model"])
+
+        def row_changed(
+            sender, instance, entity=entity, model=model, action=None, **kwargs
+        ):
+            if action and not action.startswith("post_"):
+                return
+            if not kwargs.get("reverse"):
+                _row_changed(sender, instance, entity)
+            elif kwargs.get("pk_set"):
+                # profile.<entity>_assigned_to.add(...): instance is the profile
+                for row in model._default_manager.filter(pk__in=kwargs["pk_set"]):
+                    _row_changed(sender, row, entity)
+            elif instance.org_id:
+                mark_stale(instance.org_id)
+
+        uid = f"dashboard_rollup_{entity}"
+        post_save.connect(row_changed, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(
+            row_changed, sender=model, weak=False, dispatch_uid=f"{uid}_delete"
+        )
+        assigned_to = model._meta.get_field(source.get("assigned_to") or "id")
+        if assigned_to.many_to_many:
+            m2m_changed.connect(
+                row_changed,
+                sender=assigned_to.remote_field.through,
+                weak=False,
+                dispatch_uid=f"{uid}_assigned",
+            )
@@ -9,9 +9,11 @@ from opportunity.serializer import OpportunitySerializer
 from leads.serializer import LeadSerializer, LeadDashboardSerializer
 from opportunity.serializer import OpportunityDashboardSerializer
 from common.swagger_params1 import organization_params
-from django.db.models import Count, Sum, Q, Max
+from django.db.models import Count, Sum, Q, Max, Prefetch
 from drf_spectacular.utils import OpenApiParameter, OpenApiTypes, extend_schema
+from common import dashboard_rollups
 from common.models import Org
+from common.response_cache import CachedResponseMixin
 from datetime import datetime, timedelta
 from common.utils import LEAD_STATUS
 from common.utils import LEAD_STATUS
@@ -30,10 +32,23 @@ OPPORTUNITY_STAGES = [
     parameters=organization_params,
     responses={200: "Dashboard summary data"},
 )
-class DashboardSummaryView(APIView):
+class DashboardSummaryView(CachedResponseMixin, APIView):
     permission_classes = [IsAuthenticated]
+    response_cache_name = "dashboard_summary"
+    response_cache_dependencies = (
+        "accounts.Account",
+        "common.Profile",
+        "companies.CompanyProfile",
+        "contacts.Contact",
+        "leads.Lead",
+        "opportunity.Opportunity",
+        dashboard_rollups.VERSION_LABEL,
+    )
 
     def get(self, request):
+        return self.cached_response(request, self.get_summary)
+
+    def get_summary(self, request):
         if not hasattr(request, "profile") or request.profile is None:
             return Response(
                 {
@@ -74,39 +89,18 @@ class DashboardSummaryView(APIView):
                 pass
 
         if is_admin:
-            company_filter = {}
-            contact_filter = {}
             lead_filter = {}
             opportunity_filter = {}
         else:
-            company_filter = {"created_by": user}
-            contact_filter = {"created_by": user}
             lead_filter = Q(created_by=user) | Q(assigned_to=profile)
             opportunity_filter = Q(created_by=user) | Q(assigned_to=profile)
 
-        # --- Companies ---
-        companies_count = CompanyProfile.objects.filter(
-            org=org, **company_filter, **date_filter
-        ).count()
-        # --- Contacts ---
-        contacts_count = Contact.objects.filter(
-            org=org, **contact_filter, **date_filter
-        ).count()
-        # --- Accounts ---
-        accounts_qs = Account.objects.filter(org=org, **date_filter)
-        if not is_admin:
-            accounts_qs = accounts_qs.filter(
-                Q(created_by=user) | Q(assigned_to=profile)
-            ).distinct()
-        accounts_count = accounts_qs.count()
         # --- Leads ---
         leads_qs = Lead.objects.filter(organization=org, **date_filter)
         if not is_admin:
             leads_qs = leads_qs.filter(lead_filter).distinct()
         if lead_status:
             leads_qs = leads_qs.filter(status=lead_status)
-        leads_count = leads_qs.count()
-        # --- Opportunities ---
         # --- Opportunities ---
         opps_qs = Opportunity.objects.filter(org=org, **date_filter)
         if not is_admin:
@@ -116,15 +110,81 @@ class DashboardSummaryView(APIView):
         else:
             #  if no stage is provided, exclude closed stages
             opps_qs = opps_qs.exclude(stage__in=["CLOSE", "CLOSED LOST", "CLOSED WON"])
-        opportunities_count = opps_qs.count()
+
+        summary = None
+        if not date_filter:
+            summary = dashboard_rollups.get_summary(
+                org,
+                profile=None if is_admin else profile,
+                lead_status=lead_status,
+                opportunity_stage=opportunity_stage,
+            )
+        if summary is None:
+            # custom windows don't line up with the daily rollups, orgs whose
+            # rollups aren't built yet are counted from the tables
+            summary = self.get_exact_summary(
+                org, user, profile, is_admin, date_filter, leads_qs, opps_qs
+            )
 
         # Recent Leads
-        recent_leads_qs = leads_qs.order_by("-updated_at")[:5]
+        recent_leads_qs = leads_qs.select_related("contact", "company").order_by(
+            "-updated_at"
+        )[:5]
         recent_leads = LeadDashboardSerializer(recent_leads_qs, many=True).data
         # Recent Opportunities
-        recent_opps_qs = opps_qs.order_by("-updated_at")[:5]
+        recent_opps_qs = (
+            opps_qs.select_related("lead__company")
+            .prefetch_related(
+                Prefetch(
+                    "contacts",
+                    queryset=Contact.objects.select_related("company").order_by("pk"),
+                )
+            )
+            .order_by("-updated_at")[:5]
+        )
         recent_opps = OpportunityDashboardSerializer(recent_opps_qs, many=True).data
 
+        return Response(
+            {
+                **summary,
+                "recent_leads": recent_leads,
+                "recent_opportunities": recent_opps,
+                "lead_status_choices": [
+                    {"value": choice[0], "label": choice[1]} for choice in LEAD_STATUS
+                ],
+                "opportunity_stage_choices": [
+                    {"value": choice[0], "label": choice[1]}
+                    for choice in OPPORTUNITY_STAGES
+                ],
+            }
+        )
+
+    def get_exact_summary(
+        self, org, user, profile, is_admin, date_filter, leads_qs, opps_qs
+    ):
+        if is_admin:
+            company_filter = {}
+            contact_filter = {}
+        else:
+            company_filter = {"created_by": user}
+            contact_filter = {"created_by": user}
+
+        # --- Companies ---
+        companies_count = CompanyProfile.objects.filter(
+            org=org, **company_filter, **date_filter
+        ).count()
+        # --- Contacts ---
+        contacts_count = Contact.objects.filter(
+            org=org, **contact_filter, **date_filter
+        ).count()
+        # --- Accounts ---
+        accounts_qs = Account.objects.filter(org=org, **date_filter)
+        if not is_admin:
+            accounts_qs = accounts_qs.filter(
+                Q(created_by=user) | Q(assigned_to=profile)
+            ).distinct()
+        accounts_count = accounts_qs.count()
+
         # Pipeline Value (total)
         total_pipeline_value = (
             opps_qs.aggregate(total=Sum("expected_revenue"))["total"] or 0
@@ -139,24 +199,13 @@ class DashboardSummaryView(APIView):
         opps_by_stage = opps_qs.values("stage").annotate(count=Count("id"))
         opps_stage = {item["stage"]: item["count"] for item in opps_by_stage}
 
-        return Response(
-            {
-                "companies_count": companies_count,
-                "contacts_count": contacts_count,
-                "accounts_count": accounts_count,
-                "leads_count": leads_count,
-                "opportunities_count": opportunities_count,
-                "total_pipeline_value": total_pipeline_value,
-                "leads_by_status": leads_status,
-                "opportunities_by_stage": opps_stage,
-                "recent_leads": recent_leads,
-                "recent_opportunities": recent_opps,
-                "lead_status_choices": [
-                    {"value": choice[0], "label": choice[1]} for choice in LEAD_STATUS
-                ],
-                "opportunity_stage_choices": [
-                    {"value": choice[0], "label": choice[1]}
-                    for choice in OPPORTUNITY_STAGES
-                ],
-            }
-        )
+        return {
+            "companies_count": companies_count,
+            "contacts_count": contacts_count,
+            "accounts_count": accounts_count,
+            "leads_count": leads_qs.count(),
+            "opportunities_count": opps_qs.count(),
+            "total_pipeline_value": total_pipeline_value,
+            "leads_by_status": leads_status,
+            "opportunities_by_stage": opps_stage,
+        }
@@ -0,0 +1,182 @@
+"""
+Streaming CSV export of the list endpoints.
+
+List views using ``CsvExportMixin`` answer ``?export=true`` with their
+filtered rows as a CSV file, built from ``export_columns``: ``(header,
+value)`` pairs where value is a dotted attribute path of the row
+(``"contact.company.name"``, empty when a step is None) or a function of
+the row.
+
+The file is written through a ``StreamingHttpResponse`` as the rows are
+read with ``QuerySet.iterator(chunk_size=EXPORT_CHUNK_SIZE)`` (a server
+side cursor on PostgreSQL), so the memory used doesn't grow with the number
+of rows. The select_related/prefetch_related lookups of the list are
+replaced by the fixed plan of the export (``export_select_related``,
+``export_prefetch_related``), which covers every relation the columns
+read: a chunk costs one query plus one per prefetched relation.
+
+``common.export_jobs`` writes the same rows (or NDJSON records of them,
+``stream_records``) to a file of the storage in the background.
+"""
+import csv
+import datetime
+import json
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+# cells starting with these are formulas for spreadsheets
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def chunk_size():
+    return getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+
+
+def is_requested(request):
+    return request.query_params.get("export", "").lower() == "true"
+
+
+def profile_names(field):
+    """Value of the names of the profiles of the many to many ``field``"""
+
+    def value(row):
+        names = []
+        for profile in getattr(row, field).all():
+            user = profile.user
+            names.append(f"{user.first_name} {user.last_name}".strip() or user.email)
+        return ", ".join(names)
+
+    return value
+
+
+def related_names(field, attribute="name"):
+    """Value of the ``attribute`` of the rows of the many to many ``field``"""
+
+    def value(row):
+        return ", ".join(
+            str(getattr(related, attribute)) for related in getattr(row, field).all()
+        )
+
+    return value
+
+
+def full_name(path):
+    """Value of the name of the contact or user at ``path``"""
+
+    def value(row):
+        person = _resolve(row, path)
+        if person is None:
+            return ""
+        return f"{person.first_name} {person.last_name}".strip()
+
+    return value
+
+
+def full_names(field):
+    """Value of the names of the contacts of the many to many ``field``"""
+
+    def value(row):
+        return ", ".join(
+            f"{contact.first_name} {contact.last_name}".strip()
+            for contact in getattr(row, field).all()
+        )
+
+    return value
+
+
+def _resolve(row, path):
+    value = row
+    for name in path.split("."):
+        value = getattr(value, name, None)
+        if value is None:
+            return None
+    return value
+
+
+def format_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, datetime.date):
+        return value.strftime("%Y-%m-%d")
+    if not isinstance(value, str):
+        # numbers, phone numbers...
+        return str(value)
+    if value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def json_value(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    # decimals, phone numbers...
+    return str(value)
+
+
+def _values(row, columns):
+    return [
+        value(row) if callable(value) else _resolve(row, value)
+        for _, value in columns
+    ]
+
+
+class _Echo:
+    """File-like object returning what is written, for ``csv.writer``"""
+
+    def write(self, value):
+        return value
+
+
+def stream_rows(queryset, columns, size=None):
+    """Lines of the CSV of the rows of ``queryset``, header first"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow([header for header, _ in columns])
+    for row in queryset.iterator(chunk_size=size or chunk_size()):
+        yield writer.writerow([format_value(value) for value in _values(row, columns)])
+
+
+def stream_records(queryset, columns, size=None):
+    """Lines of the NDJSON of the rows of ``queryset``, keyed by header"""
+    headers = [header for header, _ in columns]
+    for row in queryset.iterator(chunk_size=size or chunk_size()):
+        values = [json_value(value) for value in _values(row, columns)]
+        yield json.dumps(dict(zip(headers, values))) + "\n"
+
+
+def export_response(queryset, columns, filename):
+    response = StreamingHttpResponse(
+        stream_rows(queryset, columns), content_type="text/csv"
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+class CsvExportMixin:
+    export_columns = ()
+    export_filename = "export.csv"
+    export_select_related = ()
+    export_prefetch_related = ()
+
+    def get_filtered_queryset(self):
+        """The rows the filters of ``self.request`` select"""
+        return self.get_queryset().distinct()
+
+    def get_export_queryset(self):
+        """The filtered rows with the lookups of the export only"""
+        queryset = self.get_filtered_queryset()
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if self.export_select_related:
+            queryset = queryset.select_related(*self.export_select_related)
+        return queryset.prefetch_related(*self.export_prefetch_related)
+
+    def export_csv(self):
+        return export_response(
+            self.get_export_queryset(), self.export_columns, self.export_filename
+        )
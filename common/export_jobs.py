@@ -0,0 +1,156 @@
+"""
+Background export of the rows of an entity to a file of the default storage.
+
+``POST /api/exports/`` queues an ``ExportJob`` for an entity of ``SOURCES``
+with the query parameters of its list endpoint (``params``), and the
+``run_export_job`` task writes the rows to ``exports/%Y/%m/`` as a gzip
+compressed CSV (the columns of ``?export=true``) or NDJSON file. The rows are
+selected by the export view of the entity (``CsvExportMixin``) as the profile
+who queued the job sees them, and read in chunks of ``EXPORT_CHUNK_SIZE``
+with the fixed lookups of the export, so a job costs the same queries per
+chunk whatever the size of the org.
+
+The file is compressed into a temporary file and then saved through
+``default_storage`` (S3 in production), so the worker never holds more than
+a chunk of rows. The job records the number of rows, the size of the file
+and when it started and finished; clients poll ``GET /api/exports/<id>/``
+for the download link, or ask to be emailed it (``notify``).
+"""
+import gzip
+import io
+import logging
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.mail import EmailMessage
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.request import Request
+
+from common import export
+from common.models import ExportJob
+
+logger = logging.getLogger(__name__)
+
+# entity -> export view of its rows
+SOURCES = {
+    "leads": "leads.views.LeadListView",
+    "contacts": "contacts.views.ContactsListView",
+    "companies": "companies.views.CompanyListView",
+    "accounts": "accounts.views.AccountsListView",
+    "opportunities": "opportunity.views.OpportunityListView",
+    "cases": "cases.views.CaseListView",
+    "invoices": "invoices.exports.InvoiceExport",
+}
+
+
+def export_view(entity, profile, params):
+    """The export view of ``entity`` for a GET of ``profile`` with ``params``"""
+    http_request = HttpRequest()
+    http_request.method = "GET"
+    http_request.GET = QueryDict(mutable=True)
+    for key, value in params.items():
+        if isinstance(value, list):
+            http_request.GET.setlist(key, [str(item) for item in value])
+        else:
+            http_request.GET[key] = str(value)
+    http_request.META["HTTP_ORG"] = str(profile.org_id)
+
+    request = Request(http_request)
+    request.user = profile.user
+    request.profile = profile
+
+    view = import_string(SOURCES[entity])()
+    view.request = request
+    view.args = ()
+    view.kwargs = {}
+    view.format_kwarg = None
+    return view
+
+
+def download_url(job):
+    url = job.file.url
+    if url.startswith("/"):
+        # storages without their own domain
+        url = f"{settings.DOMAIN_NAME.rstrip('/')}{url}"
+    return url
+
+
+def write_file(job, output):
+    """Write the rows of ``job`` to the binary file ``output``, their count"""
+    view = export_view(job.entity, job.profile, job.params)
+    queryset = view.get_export_queryset()
+    columns = view.export_columns
+    if job.format == "ndjson":
+        lines = export.stream_records(queryset, columns)
+        count = 0
+    else:
+        lines = export.stream_rows(queryset, columns)
+        # the header
+        count = -1
+
+    with gzip.GzipFile(fileobj=output, mode="wb") as compressed:
+        text = io.TextIOWrapper(compressed, encoding="utf-8", newline="")
+        for line in lines:
+            text.write(line)
+            count += 1
+        text.flush()
+        text.detach()
+    return count
+
+
+def _update_job(job, **fields):
+    # .update() keeps the created_by of the job, save() clears it out of
+    # requests
+    ExportJob.objects.filter(pk=job.pk).update(**fields)
+
+
+def notify(job):
+    job.refresh_from_db()
+    EmailMessage(
+        f"Your export of {job.entity} is ready",
+        f"The export of {job.row_count} {job.entity} you requested is ready:\n\n"
+        f"{download_url(job)}\n",
+        settings.DEFAULT_FROM_EMAIL,
+        [job.profile.user.email],
+    ).send()
+
+
+def run(job_id):
+    """Write the file of the queued ``ExportJob`` ``job_id``"""
+    claimed = ExportJob.objects.filter(pk=job_id, status="queued").update(
+        status="running", started_at=timezone.now()
+    )
+    if not claimed:
+        # unknown, or already run by another worker
+        return
+    job = ExportJob.objects.select_related("profile__user", "profile__org").get(
+        pk=job_id
+    )
+    try:
+        with tempfile.TemporaryFile() as output:
+            count = write_file(job, output)
+            file_size = output.tell()
+            output.seek(0)
+            job.file.save(
+                f"{job.entity}-{job.pk}.{job.format}.gz", File(output), save=False
+            )
+    except Exception as e:
+        logger.exception("Export %s failed", job_id)
+        _update_job(job, status="failed", error=str(e), finished_at=timezone.now())
+        return
+    _update_job(
+        job,
+        status="completed",
+        file=job.file.name,
+        file_size=file_size,
+        row_count=count,
+        finished_at=timezone.now(),
+    )
+    if job.notify:
+        try:
+            notify(job)
+        except Exception:
+            logger.exception("Export %s: notification failed", job_id)
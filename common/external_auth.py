@@ -1,9 +1,13 @@
 import jwt
+from rest_framework import status
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.request import Request
-from common.models import Org,Profile,User
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from common import api_keys, profile_cache
+from common.models import Profile,User
 from django.conf import settings
+from django.core.exceptions import ValidationError
 
 def verify_jwt_token(token):
     secret_key = (settings.SECRET_KEY) # Replace with your secret key used for token encoding/decoding
@@ -15,39 +19,143 @@ def verify_jwt_token(token):
     except jwt.InvalidTokenError:
         return False, "Invalid token"
 
+
+class BearerAuthError(Exception):
+    def __init__(self, message, status_code=status.HTTP_401_UNAUTHORIZED):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class BearerAuth:
+    """Result of verifying the bearer token of one request"""
+
+    def __init__(self, token, claims):
+        self.token = token
+        self.claims = claims
+        self.user_id = claims.get(jwt_settings.USER_ID_CLAIM)
+
+
+def _http_request(request):
+    # DRF wraps the django request, the result is always kept on the django one
+    return request._request if isinstance(request, Request) else request
+
+
+def _verify_bearer(header):
+    if not header.startswith("Bearer "):
+        raise BearerAuthError("Invalid token format")
+    token = header.split(" ")[1]
+    if len(token.split(".")) != 3:
+        raise BearerAuthError("Invalid token structure")
+    try:
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGO])
+    except jwt.ExpiredSignatureError:
+        raise BearerAuthError("Token expired")
+    except jwt.InvalidTokenError:
+        raise BearerAuthError("Invalid token")
+    except Exception:
+        raise BearerAuthError(
+            "Token decode error", status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    # same rule as simplejwt: refresh tokens can't be used to call the API
+    if claims.get(jwt_settings.TOKEN_TYPE_CLAIM) != "access":
+        raise BearerAuthError("Invalid token")
+    return BearerAuth(token, claims)
+
+
+def get_bearer_auth(request):
+    """
+    Verify the bearer token of the request once and return a BearerAuth
+    (None when there is no Authorization header). The result, or the error,
+    is kept on the request so GetProfileAndOrg and the DRF authentication
+    class share the same decode.
+    """
+    http_request = _http_request(request)
+    if not hasattr(http_request, "_bearer_auth"):
+        header = http_request.headers.get("Authorization")
+        try:
+            http_request._bearer_auth = _verify_bearer(header) if header else None
+        except BearerAuthError as e:
+            http_request._bearer_auth = e
+        auth = http_request._bearer_auth
+        http_request.jwt_claims = auth.claims if isinstance(auth, BearerAuth) else None
+    if isinstance(http_request._bearer_auth, BearerAuthError):
+        raise http_request._bearer_auth
+    return http_request._bearer_auth
+
+
+def get_bearer_user(request, auth):
+    """User of the token, taken from the already resolved profile when possible"""
+    http_request = _http_request(request)
+    user = getattr(http_request, "_bearer_user", None)
+    if user is not None:
+        return user
+    profile = getattr(request, "profile", None)
+    if profile is not None and str(profile.user_id) == str(auth.user_id):
+        user = profile.user
+    else:
+        user = User.objects.filter(id=auth.user_id).first()
+    http_request._bearer_user = user
+    return user
+
+
+def get_api_key_auth(request):
+    """
+    Resolve the org api key sent in the ``Token`` header to (org, acting
+    profile), once per request. Returns None for unknown keys.
+    """
+    http_request = _http_request(request)
+    if not hasattr(http_request, "_api_key_auth"):
+        api_key = http_request.headers.get("Token")
+        http_request._api_key_auth = (
+            api_keys.resolve_org_api_key(api_key) if api_key else None
+        )
+    return http_request._api_key_auth
+
+
 class CustomDualAuthentication(BaseAuthentication):
 
     def authenticate(self, request):
-        jwt_user = None
-        profile = None
+        try:
+            bearer = get_bearer_auth(request)
+        except BearerAuthError as e:
+            raise AuthenticationFailed(e.message)
 
         # Check JWT authentication
-        jwt_token = request.headers.get('Authorization', '').split(' ')[1] if 'Authorization' in request.headers else None
-        if jwt_token:
-            is_valid, jwt_payload = verify_jwt_token(jwt_token)
-            if is_valid:
-                jwt_user = (User.objects.get(id=jwt_payload['user_id']), True)
-                if jwt_payload['user_id'] is not None:
-                    if request.headers.get("org"):
-                        profile = Profile.objects.get(
-                            user_id=jwt_payload['user_id'], org=request.headers.get("org"), is_active=True
-                        )
-                        if profile:
-                            request.profile = profile
+        if bearer is not None:
+            user = get_bearer_user(request, bearer)
+            if user is None:
+                raise AuthenticationFailed("User not found")
+            if not user.is_active:
+                raise AuthenticationFailed("User is inactive")
+            # GetProfileAndOrg skips some urls, resolve the profile here for them
+            if getattr(request, "profile", None) is None and request.headers.get("org"):
+                try:
+                    request.profile = profile_cache.get_profile(
+                        bearer.user_id, request.headers.get("org")
+                    )
+                except (Profile.DoesNotExist, ValidationError):
+                    raise AuthenticationFailed(
+                        "Profile not found or user not in organization"
+                    )
+            return (user, bearer.token)
 
         # Check API key authentication
         api_key = request.headers.get('Token')  # Get API key from request query params
         if api_key:
-            try:
-                organization = Org.objects.get(api_key=api_key)
-                api_key_user = organization
-                request.META['org'] = api_key_user.id
-                profile = Profile.objects.filter(org=api_key_user, role="ADMIN").first()
-                request.profile = profile
-                profile = (profile.user, True)
-            except Org.DoesNotExist:
+            resolved = get_api_key_auth(request)
+            if resolved is None:
                 raise AuthenticationFailed('Invalid API Key')
+            organization, profile = resolved
+            if profile is None:
+                raise AuthenticationFailed('No admin profile for this API Key')
+            if not profile.user.is_active:
+                raise AuthenticationFailed('User is inactive')
+            request.META['org'] = organization.id
+            request.profile = profile
+            return (profile.user, True)
+        return None
 
-        # Select the appropriate user based on authentication method
-        # Return the user if any authentication method succeeded
-        return jwt_user or profile
+    def authenticate_header(self, request):
+        # makes DRF answer 401 instead of 403 for unauthenticated requests
+        return 'Bearer realm="api"'
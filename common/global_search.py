@@ -0,0 +1,407 @@
+"""
+Cross-entity search behind ``/api/search/``.
+
+Leads, contacts, companies, opportunities and cases of an org are copied to
+``SearchEntry`` rows: a title, a short secondary text and a ``document``
+(both of them) trigram indexed on PostgreSQL. Rows of leads, opportunities
+and cases are ``restricted``: besides admins, only their creator and
+assignees (``owners``) see them, as in the list views.
+
+Entries are written from ``common.signals`` (``connect_signals``) whenever a
+row or its assignees are saved, and removed when it is deleted. Renaming a
+contact or a company changes the text of every lead, case, contact or
+opportunity showing it. That can be thousands of rows, so it is left to
+``common.tasks.refresh_related_search_entries``, which rewrites their text in
+batches. Batch writes (``common.bulk``) index their rows with
+``index_objects``. ``rebuild`` (``common.tasks.rebuild_search_index``)
+recreates the entries of an org, run it once after deploying and to pick up
+writes that skip the signals.
+"""
+import logging
+from itertools import islice
+
+from django.apps import apps
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections, transaction
+from django.db.models import Q
+from django.db.models.functions import Upper
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from common.models import Profile, SearchEntry
+
+logger = logging.getLogger(__name__)
+
+
+def _join(*parts):
+    return " · ".join(str(part) for part in parts if part)
+
+
+def _full_name(contact):
+    if contact is None:
+        return ""
+    return " ".join(part for part in (contact.first_name, contact.last_name) if part)
+
+
+def _describe_lead(lead):
+    company = lead.company.name if lead.company else ""
+    title = lead.lead_title or company or _full_name(lead.contact) or "Lead"
+    return title, _join(
+        _full_name(lead.contact),
+        lead.contact.primary_email if lead.contact else "",
+        company,
+        lead.status,
+    )
+
+
+def _describe_contact(contact):
+    return _full_name(contact), _join(
+        contact.primary_email,
+        contact.mobile_number,
+        contact.title,
+        contact.company.name if contact.company else "",
+    )
+
+
+def _describe_company(company):
+    return company.name, _join(company.email, company.website, company.industry)
+
+
+def _describe_opportunity(opportunity):
+    lead = opportunity.lead
+    return opportunity.name, _join(
+        lead.company.name if lead and lead.company else "", opportunity.stage
+    )
+
+
+def _describe_case(case):
+    lead = case.opportunity.lead if case.opportunity else None
+    contacts = [_full_name(contact) for contact in case.contacts.all()]
+    if lead and lead.contact:
+        contacts.append(_full_name(lead.contact))
+    return case.name, _join(
+        lead.company.name if lead and lead.company else "",
+        *dict.fromkeys(contacts),
+    )
+
+
+# entity -> source model, how to describe its rows and who can see them.
+# "assigned_to" is set for restricted entities.
+SOURCES = {
+    "lead": {
+        "model": "leads.Lead",
+        "org": "organization",
+        "select_related": ("contact", "company"),
+        "describe": _describe_lead,
+        "assigned_to": "assigned_to",
+    },
+    "contact": {
+        "model": "contacts.Contact",
+        "org": "org",
+        "select_related": ("company",),
+        "describe": _describe_contact,
+    },
+    "company": {
+        "model": "companies.CompanyProfile",
+        "org": "org",
+        "describe": _describe_company,
+    },
+    "opportunity": {
+        "model": "opportunity.Opportunity",
+        "org": "org",
+        "select_related": ("lead__company",),
+        "describe": _describe_opportunity,
+        "assigned_to": "assigned_to",
+    },
+    "case": {
+        "model": "cases.Case",
+        "org": "org",
+        "select_related": (
+            "opportunity__lead__company",
+            "opportunity__lead__contact",
+        ),
+        "prefetch_related": ("contacts",),
+        "describe": _describe_case,
+        "assigned_to": "assigned_to",
+    },
+}
+
+
+def _source_queryset(entity):
+    source = SOURCES[entity]
+    model = apps.get_model(source["model"])
+    return model._default_manager.select_related(
+        *source.get("select_related", ())
+    ).prefetch_related(*source.get("prefetch_related", ()))
+
+
+def _assigned_ids(entity, instance):
+    field = SOURCES[entity].get("assigned_to")
+    if instance._meta.get_field(field).many_to_many:
+        return set(getattr(instance, field).values_list("id", flat=True))
+    assigned_id = getattr(instance, f"{field}_id")
+    return {assigned_id} if assigned_id else set()
+
+
+def _entry(entity, instance, org_id):
+    title, secondary = SOURCES[entity]["describe"](instance)
+    title = (title or "")[:255]
+    return SearchEntry(
+        org_id=org_id,
+        entity=entity,
+        object_id=instance.pk,
+        title=title,
+        secondary=secondary,
+        document=_join(title, secondary),
+        restricted=bool(SOURCES[entity].get("assigned_to")),
+    )
+
+
+def index_object(entity, pk):
+    """Create, update or remove the entry of one row"""
+    instance = _source_queryset(entity).filter(pk=pk).first()
+    org_id = (
+        getattr(instance, f"{SOURCES[entity]['org']}_id") if instance else None
+    )
+    if org_id is None:
+        SearchEntry.objects.filter(entity=entity, object_id=pk).delete()
+        return
+
+    entry = _entry(entity, instance, org_id)
+    with transaction.atomic():
+        entry, _ = SearchEntry.objects.update_or_create(
+            entity=entity,
+            object_id=pk,
+            defaults={
+                field: getattr(entry, field)
+                for field in ("org_id", "title", "secondary", "document", "restricted")
+            },
+        )
+        if entry.restricted:
+            owners = _assigned_ids(entity, instance)
+            owners.update(
+                Profile.objects.filter(
+                    org_id=org_id, user_id=instance.created_by_id
+                ).values_list("id", flat=True)
+            )
+            entry.owners.set(owners)
+
+
+def _create_entries(entity, queryset, org_id, profiles, batch_size):
+    """Entries (and owners) of the rows of ``queryset``, a batch at a time"""
+    Owner = SearchEntry.owners.through
+    field = SOURCES[entity].get("assigned_to")
+    many_to_many = field and queryset.model._meta.get_field(field).many_to_many
+    if many_to_many:
+        queryset = queryset.prefetch_related(field)
+    for batch in _batches(queryset.iterator(chunk_size=batch_size), batch_size):
+        entries = SearchEntry.objects.bulk_create(
+            [_entry(entity, row, org_id) for row in batch]
+        )
+        if not field:
+            continue
+        owners = []
+        for row, entry in zip(batch, entries):
+            if many_to_many:
+                ids = {profile.id for profile in getattr(row, field).all()}
+            else:
+                ids = {getattr(row, f"{field}_id")} - {None}
+            if row.created_by_id in profiles:
+                ids.add(profiles[row.created_by_id])
+            owners += [
+                Owner(searchentry_id=entry.id, profile_id=profile_id)
+                for profile_id in ids
+            ]
+        Owner.objects.bulk_create(owners)
+
+
+def _profiles(org_id):
+    return dict(Profile.objects.filter(org_id=org_id).values_list("user_id", "id"))
+
+
+def rebuild(org_id, batch_size=500):
+    """Recreate every entry of the org"""
+    profiles = _profiles(org_id)
+    with transaction.atomic():
+        SearchEntry.objects.filter(org_id=org_id).delete()
+        for entity, source in SOURCES.items():
+            queryset = _source_queryset(entity).filter(**{source["org"]: org_id})
+            _create_entries(entity, queryset, org_id, profiles, batch_size)
+
+
+def index_objects(entity, org_id, pks, batch_size=500):
+    """
+    ``index_object`` of many rows of the org in a few queries per batch, for
+    the writes that skip the signals (``common.bulk``).
+    """
+    queryset = _source_queryset(entity).filter(
+        **{SOURCES[entity]["org"]: org_id, "pk__in": pks}
+    )
+    with transaction.atomic():
+        SearchEntry.objects.filter(entity=entity, object_id__in=pks).delete()
+        _create_entries(entity, queryset, org_id, _profiles(org_id), batch_size)
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def refresh_text(entity, pks, batch_size=500):
+    """
+    Rewrite the title and text of the entries of ``pks``, a few queries per
+    batch of rows. Owners are left alone, use ``index_object`` for them.
+    """
+    for batch in _batches(pks, batch_size):
+        rows = _source_queryset(entity).filter(pk__in=batch)
+        entries = {
+            entry.object_id: entry
+            for entry in SearchEntry.objects.filter(entity=entity, object_id__in=batch)
+        }
+        changed = []
+        for row in rows:
+            entry = entries.get(row.pk)
+            if entry is None:
+                continue
+            fresh = _entry(entity, row, entry.org_id)
+            entry.title = fresh.title
+            entry.secondary = fresh.secondary
+            entry.document = fresh.document
+            changed.append(entry)
+        SearchEntry.objects.bulk_update(changed, ["title", "secondary", "document"])
+
+
+def related_querysets(entity, pks):
+    """(entity, rows) whose entry shows one of the contacts or companies ``pks``"""
+    Lead = apps.get_model("leads.Lead")
+    if entity == "contact":
+        return [
+            ("lead", Lead.objects.filter(contact__in=pks)),
+            (
+                "case",
+                apps.get_model("cases.Case").objects.filter(
+                    Q(contacts__in=pks) | Q(opportunity__lead__contact__in=pks)
+                ),
+            ),
+        ]
+    if entity == "company":
+        return [
+            ("lead", Lead.objects.filter(company__in=pks)),
+            (
+                "contact",
+                apps.get_model("contacts.Contact").objects.filter(company__in=pks),
+            ),
+            (
+                "opportunity",
+                apps.get_model("opportunity.Opportunity").objects.filter(
+                    lead__company__in=pks
+                ),
+            ),
+        ]
+    return []
+
+
+def refresh_related(entity, pks, batch_size=500):
+    """``pks``: a contact or company pk, or a list of them"""
+    if not isinstance(pks, (list, tuple)):
+        pks = [pks]
+    for related_entity, queryset in related_querysets(entity, pks):
+        related = queryset.order_by().values_list("pk", flat=True).distinct()
+        refresh_text(related_entity, list(related), batch_size)
+
+
+def search(profile, term, entities=None, limit=20, is_admin=False):
+    """Entries of the profile's org matching ``term``, best matches first"""
+    queryset = SearchEntry.objects.filter(org_id=profile.org_id)
+    if not is_admin:
+        owned = SearchEntry.owners.through.objects.filter(profile=profile)
+        queryset = queryset.filter(
+            Q(restricted=False) | Q(pk__in=owned.values("searchentry_id"))
+        )
+    if entities:
+        queryset = queryset.filter(entity__in=entities)
+
+    contains = Q(document__icontains=term)
+    if connections[queryset.db].vendor != "postgresql":
+        return list(queryset.filter(contains).order_by("-updated_at")[:limit])
+
+    queryset = (
+        queryset.alias(_document=Upper("document"))
+        .filter(contains | Q(_document__trigram_word_similar=term))
+        .annotate(
+            search_rank=TrigramWordSimilarity(term, Upper("title"))
+            + TrigramWordSimilarity(term, Upper("document"))
+        )
+        .order_by("-search_rank", "-updated_at")
+    )
+    return list(queryset[:limit])
+
+
+def _index_later(entity, pk):
+    transaction.on_commit(lambda: index_object(entity, pk))
+
+
+def schedule_related_refresh(entity, pks):
+    """``pks``: a contact or company pk, or a list of them"""
+    from common.tasks import refresh_related_search_entries
+
+    if isinstance(pks, (list, tuple)):
+        pks = [str(pk) for pk in pks]
+    else:
+        pks = str(pks)
+    try:
+        refresh_related_search_entries.delay(entity, pks)
+    except Exception as e:
+        # picked up by the next rebuild_search_index
+        logger.warning(f"Search entries refresh could not be queued: {str(e)}")
+
+
+def connect_signals():
+    for entity, source in SOURCES.items():
+        model = apps.get_model(source["model"])
+
+        def row_changed(sender, instance, entity=entity, **kwargs):
+            _index_later(entity, instance.pk)
+
+        def m2m_row_changed(
+            sender, instance, entity=entity, model=model, action=None, **kwargs
+        ):
+            if not action.startswith("post_"):
+                return
+            if not kwargs.get("reverse"):
+                _index_later(entity, instance.pk)
+            else:
+                # profile.<entity>_assigned_to / contact.case_set changes
+                pk_set = kwargs.get("pk_set") or []
+                for pk in pk_set:
+                    _index_later(entity, pk)
+
+        uid = f"global_search_{entity}"
+        post_save.connect(row_changed, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(
+            row_changed, sender=model, weak=False, dispatch_uid=f"{uid}_delete"
+        )
+        for field in model._meta.many_to_many:
+            if field.name in (source.get("assigned_to"), "contacts"):
+                m2m_changed.connect(
+                    m2m_row_changed,
+                    sender=field.remote_field.through,
+                    weak=False,
+                    dispatch_uid=f"{uid}_{field.name}",
+                )
+
+    for entity in ("contact", "company"):
+
+        def related_changed(sender, instance, created, entity=entity, **kwargs):
+            # leads, cases, contacts and opportunities show the name of their
+            # contact or company
+            if not created:
+                pk = instance.pk
+                transaction.on_commit(lambda: schedule_related_refresh(entity, pk))
+
+        post_save.connect(
+            related_changed,
+            sender=apps.get_model(SOURCES[entity]["model"]),
+            weak=False,
+            dispatch_uid=f"global_search_{entity}_related",
+        )
@@ -0,0 +1,74 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from common import query_budget
+
+
+def describe(failures):
+    return "; ".join(
+        f"{failure['endpoint']} ({failure['size']} rows): {failure['reason']}"
+        for failure in failures
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed orgs of the given sizes, check the query budgets of the API "
+        "endpoints against them and print the report as JSON. The seeded "
+        "rows are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="10,1000",
+            help="comma separated row counts per entity (default 10,1000)",
+        )
+        parser.add_argument(
+            "--endpoints",
+            default="",
+            help="comma separated names of common.query_budget.ENDPOINTS "
+            "(default all)",
+        )
+        parser.add_argument("--output", help="write the report to this file")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",") if size]
+        except ValueError:
+            raise CommandError("--sizes must be comma separated integers")
+        endpoints = None
+        if options["endpoints"]:
+            names = options["endpoints"].split(",")
+            unknown = set(names) - set(query_budget.ENDPOINTS)
+            if unknown:
+                raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+            endpoints = {name: query_budget.ENDPOINTS[name] for name in names}
+
+        # the requests are made with the test client, from "testserver"
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            report = query_budget.run(sizes, endpoints)
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as report_file:
+                report_file.write(output)
+        else:
+            self.stdout.write(output)
+        messages = []
+        if report["failures"]:
+            messages.append(
+                f"{len(report['failures'])} query budget failures: "
+                + describe(report["failures"])
+            )
+        if report["known_failures"]:
+            # common.query_budget.KNOWN_REGRESSIONS, failing until fixed
+            messages.append(
+                f"{len(report['known_failures'])} failures of known regressions: "
+                + describe(report["known_failures"])
+            )
+        if messages:
+            raise CommandError("\n".join(messages))
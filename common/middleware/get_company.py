@@ -74,13 +74,13 @@
 #         except :
 #              print('test1')
 #              raise PermissionDenied()
-import jwt
-from django.conf import settings
 from django.core.exceptions import PermissionDenied
 from django.http import JsonResponse
 from rest_framework import status
 from rest_framework.exceptions import AuthenticationFailed
-from common.models import Org, Profile
+from common import profile_cache
+from common.external_auth import BearerAuthError, get_api_key_auth, get_bearer_auth
+from common.models import Profile
 import logging
 
 logger = logging.getLogger(__name__)
@@ -116,65 +116,41 @@ class GetProfileAndOrg:
             user_id = None
 
             #JWT token from Authorization header
+            # The token is verified once per request, the DRF authentication
+            # class (common.external_auth) reuses the same result
             if request.headers.get("Authorization"):
-                token1 = request.headers.get("Authorization")
-                if not token1.startswith("Bearer "):
-                    logger.error("Invalid token format - missing Bearer prefix")
-                    return JsonResponse(
-                        {"error": True, "message": "Invalid token format"},
-                        status=status.HTTP_401_UNAUTHORIZED
-                    )
-
-                token = token1.split(" ")[1]
-
-                # Проверяем структуру токена
-                if len(token.split('.')) != 3:
-                    logger.error(f"Invalid token structure: {len(token.split('.'))} parts")
-                    return JsonResponse(
-                        {"error": True, "message": "Invalid token structure"},
-                        status=status.HTTP_401_UNAUTHORIZED
-                    )
-
                 try:
-                    # Use settings.JWT_ALGO (which is equal to "HS256")
-                    decoded = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGO])
-                    user_id = decoded.get('user_id')
-                    logger.info(f"✅ Token decoded successfully for user_id: {user_id}")
-                except jwt.ExpiredSignatureError:
-                    logger.error("❌ Token expired")
-                    return JsonResponse(
-                        {"error": True, "message": "Token expired"},
-                        status=status.HTTP_401_UNAUTHORIZED
-                    )
-                except jwt.InvalidTokenError as e:
-                    logger.error(f"❌ Invalid token: {str(e)}")
-                    return JsonResponse(
-                        {"error": True, "message": "Invalid token"},
-                        status=status.HTTP_401_UNAUTHORIZED
-                    )
-                except Exception as e:
-                    logger.error(f"❌ Token decode error: {str(e)}")
+                    bearer = get_bearer_auth(request)
+                except BearerAuthError as e:
+                    logger.error(f"❌ {e.message}")
                     return JsonResponse(
-                        {"error": True, "message": "Token decode error"},
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                        {"error": True, "message": e.message},
+                        status=e.status_code
                     )
+                user_id = bearer.user_id
+                logger.info(f"✅ Token decoded successfully for user_id: {user_id}")
 
           # API key alternative authentication
             api_key = request.headers.get('Token')
             if api_key:
-                try:
-                    organization = Org.objects.get(api_key=api_key)
-                    request.META['org'] = str(organization.id)
-                    profile = Profile.objects.filter(org=organization, role="ADMIN").first()
-                    if profile:
-                        user_id = profile.user.id
-                        logger.info(f"✅ API key auth successful for user: {profile.user.email}")
-                except Org.DoesNotExist:
-                    logger.error(f"❌ Invalid API key: {api_key}")
+                resolved = get_api_key_auth(request)
+                if resolved is None:
+                    logger.error("❌ Invalid API key")
                     return JsonResponse(
                         {"error": True, "message": "Invalid API Key"},
                         status=status.HTTP_401_UNAUTHORIZED
                     )
+                organization, profile = resolved
+                if profile and not profile.user.is_active:
+                    logger.error("❌ API key acting user is inactive")
+                    return JsonResponse(
+                        {"error": True, "message": "User is inactive"},
+                        status=status.HTTP_401_UNAUTHORIZED
+                    )
+                request.META['org'] = str(organization.id)
+                if profile:
+                    user_id = profile.user_id
+                    logger.info(f"✅ API key auth successful for user: {profile.user.email}")
 
 # Check that there is authentication
             if not request.headers.get("Authorization") and not api_key:
@@ -189,11 +165,7 @@ class GetProfileAndOrg:
                 logger.info(f"🔍 Looking for profile: user_id={user_id}, org={org_id}")
 
                 try:
-                    profile = Profile.objects.select_related('user', 'org').get(
-                        user_id=user_id,
-                        org=org_id,
-                        is_active=True
-                    )
+                    profile = profile_cache.get_profile(user_id, org_id)
                     request.profile = profile
                     logger.info(f"✅ Profile set: {profile.user.email} - {profile.org.name}")
 
@@ -220,10 +192,7 @@ class GetProfileAndOrg:
               # For /api/profile/ we allow working without org - we just take the first active profile
                 if is_profile_endpoint:
                     try:
-                        profile = Profile.objects.select_related('user', 'org').filter(
-                            user_id=user_id,
-                            is_active=True
-                        ).first()
+                        profile = profile_cache.get_profile(user_id)
                         if profile:
                             request.profile = profile
                             logger.info(f"✅ Profile set for profile endpoint: {profile.user.email} - {profile.org.name}")
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2025-08-04 10:12
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def api_key_digest(key):
+    if not key:
+        return None
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def set_api_key_digests(apps, schema_editor):
+    Org = apps.get_model('common', 'Org')
+    APISettings = apps.get_model('common', 'APISettings')
+    for org in Org.objects.only('id', 'api_key'):
+        Org.objects.filter(id=org.id).update(api_key_digest=api_key_digest(org.api_key))
+    for api_setting in APISettings.objects.only('id', 'apikey'):
+        APISettings.objects.filter(id=api_setting.id).update(
+            apikey_digest=api_key_digest(api_setting.apikey)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0014_alter_profile_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apisettings',
+            name='apikey_digest',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='org',
+            name='api_key_digest',
+            field=models.CharField(editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(set_api_key_digests, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0015_api_key_digest'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['org', 'created_at', 'id'], name='profile_org_id_f4ca46_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0016_keyset_pagination_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardRollupState',
+            fields=[
+                ('org', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='dashboard_rollup_state', serialize=False, to='common.org')),
+                ('built_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Dashboard Rollup State',
+                'verbose_name_plural': 'Dashboard Rollup States',
+                'db_table': 'dashboard_rollup_state',
+            },
+        ),
+        migrations.CreateModel(
+            name='DashboardRollup',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entity', models.CharField(max_length=32)),
+                ('status', models.CharField(blank=True, max_length=255, null=True)),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('org', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_rollups', to='common.org')),
+                ('profile', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_rollups', to='common.profile')),
+            ],
+            options={
+                'verbose_name': 'Dashboard Rollup',
+                'verbose_name_plural': 'Dashboard Rollups',
+                'db_table': 'dashboard_rollup',
+                'indexes': [models.Index(fields=['org', 'profile', 'entity'], name='dashboard_r_org_id_dfc967_idx'), models.Index(fields=['org', 'entity', 'day'], name='dashboard_r_org_id_7726ce_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:59
+
+import django.db.models.deletion
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+def create_trigram_index(apps, schema_editor):
+    # common/global_search.py filters on UPPER(document::text)
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS search_entry_document_trgm ON search_entry '
+            'USING gin (UPPER(document::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS search_entry_document_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0017_dashboard_rollup'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entity', models.CharField(max_length=32)),
+                ('object_id', models.UUIDField()),
+                ('title', models.CharField(max_length=255)),
+                ('secondary', models.TextField(blank=True, default='')),
+                ('document', models.TextField(blank=True, default='')),
+                ('restricted', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('org', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_entries', to='common.org')),
+                ('owners', models.ManyToManyField(blank=True, related_name='search_entries', to='common.profile')),
+            ],
+            options={
+                'verbose_name': 'Search Entry',
+                'verbose_name_plural': 'Search Entries',
+                'db_table': 'search_entry',
+                'indexes': [models.Index(fields=['org', 'entity'], name='search_entr_org_id_579d30_idx')],
+                'unique_together': {('entity', 'object_id')},
+            },
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -1,5 +1,6 @@
 import binascii
 import datetime
+import hashlib
 import os
 import time
 import uuid
@@ -122,9 +123,19 @@ def generate_unique_key():
     return str(uuid.uuid4())
 
 
+def api_key_digest(key):
+    """Fixed length digest of an api key, stored in an indexed column for lookups"""
+    if not key:
+        return None
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
 class Org(BaseModel):
     name = models.CharField(max_length=100, blank=True, null=True)
     api_key = models.TextField(default=generate_unique_key, unique=True, editable=False)
+    api_key_digest = models.CharField(
+        max_length=64, unique=True, null=True, editable=False
+    )
     is_active = models.BooleanField(default=True)
     # address = models.TextField(blank=True, null=True)
     # user_limit = models.IntegerField(default=5)
@@ -139,6 +150,10 @@ class Org(BaseModel):
     def __str__(self):
         return str(self.name)
 
+    def save(self, *args, **kwargs):
+        self.api_key_digest = api_key_digest(self.api_key)
+        super().save(*args, **kwargs)
+
 
 # class User(AbstractBaseUser, PermissionsMixin):
 #     email = models.EmailField(_("email address"), blank=True, unique=True)
@@ -212,6 +227,10 @@ class Profile(BaseModel):
         verbose_name_plural = "Profiles"
         db_table = "profile"
         ordering = ("-created_at",)
+        indexes = [
+            # keyset pagination (common.pagination.KeysetPagination)
+            models.Index(fields=["org", "created_at", "id"]),
+        ]
         unique_together = ["user", "org"]
 
     def __str__(self):
@@ -560,6 +579,9 @@ def generate_key():
 class APISettings(BaseModel):
     title = models.TextField()
     apikey = models.CharField(max_length=16, blank=True)
+    apikey_digest = models.CharField(
+        max_length=64, null=True, blank=True, db_index=True, editable=False
+    )
     website = models.URLField(max_length=255, null=True)
     lead_assigned_to = models.ManyToManyField(
         Profile, related_name="lead_assignee_users"
@@ -592,4 +614,190 @@ class APISettings(BaseModel):
     def save(self, *args, **kwargs):
         if not self.apikey or self.apikey is None or self.apikey == "":
             self.apikey = generate_key()
+        self.apikey_digest = api_key_digest(self.apikey)
         super().save(*args, **kwargs)
+
+
+class DashboardRollupState(models.Model):
+    """Marker of the orgs whose dashboard rollups have been built"""
+
+    org = models.OneToOneField(
+        Org,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="dashboard_rollup_state",
+    )
+    built_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Dashboard Rollup State"
+        verbose_name_plural = "Dashboard Rollup States"
+        db_table = "dashboard_rollup_state"
+
+    def __str__(self):
+        return f"{self.org_id} <{self.built_at}>"
+
+
+class DashboardRollup(models.Model):
+    """
+    Counters behind the dashboard summary, maintained by
+    ``common.dashboard_rollups``: number of rows (and sum of their value) of
+    an entity created on ``day`` with a given status or stage. ``profile`` is
+    None for the org wide counters, otherwise the counters only cover the
+    rows that profile can see (created by or assigned to it).
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    org = models.ForeignKey(
+        Org, on_delete=models.CASCADE, related_name="dashboard_rollups"
+    )
+    profile = models.ForeignKey(
+        Profile,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="dashboard_rollups",
+    )
+    entity = models.CharField(max_length=32)
+    status = models.CharField(max_length=255, null=True, blank=True)
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+    value = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Dashboard Rollup"
+        verbose_name_plural = "Dashboard Rollups"
+        db_table = "dashboard_rollup"
+        indexes = [
+            models.Index(fields=["org", "profile", "entity"]),
+            models.Index(fields=["org", "entity", "day"]),
+        ]
+
+    def __str__(self):
+        return f"{self.entity} {self.status} {self.day}: {self.count}"
+
+
+class SearchEntry(models.Model):
+    """
+    One searchable row of ``common.global_search``: a lead, contact, company,
+    opportunity or case of the org, denormalized for ``/api/search/``.
+    ``restricted`` entries are only visible to admins and to their
+    ``owners`` (creator and assignees).
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    org = models.ForeignKey(
+        Org, on_delete=models.CASCADE, related_name="search_entries"
+    )
+    entity = models.CharField(max_length=32)
+    object_id = models.UUIDField()
+    title = models.CharField(max_length=255)
+    secondary = models.TextField(blank=True, default="")
+    # title and secondary text, trigram indexed on PostgreSQL (migration 0018)
+    document = models.TextField(blank=True, default="")
+    restricted = models.BooleanField(default=False)
+    owners = models.ManyToManyField(
+        Profile, blank=True, related_name="search_entries"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Search Entry"
+        verbose_name_plural = "Search Entries"
+        db_table = "search_entry"
+        unique_together = [("entity", "object_id")]
+        indexes = [models.Index(fields=["org", "entity"])]
+
+    def __str__(self):
+        return f"{self.entity} {self.title}"
+
+
+class ExportJob(BaseModel):
+    """
+    Export of the rows of an entity of the org, as selected by the filters
+    of its list endpoint, to a gzip compressed file of the default storage.
+    Written by ``common.tasks.run_export_job`` (common/export_jobs.py).
+    """
+
+    STATUS_CHOICES = (
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    )
+    FORMAT_CHOICES = (("csv", "CSV"), ("ndjson", "NDJSON"))
+
+    org = models.ForeignKey(Org, on_delete=models.CASCADE, related_name="export_jobs")
+    # the rows exported are the ones this profile sees
+    profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="export_jobs"
+    )
+    entity = models.CharField(max_length=32)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default="csv")
+    # query parameters of the list endpoint
+    params = models.JSONField(default=dict, blank=True)
+    notify = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    file = models.FileField(upload_to="exports/%Y/%m/", max_length=1000, blank=True)
+    file_size = models.PositiveBigIntegerField(default=0)
+    row_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Export Job"
+        verbose_name_plural = "Export Jobs"
+        db_table = "export_job"
+        ordering = ("-created_at",)
+
+    def __str__(self):
+        return f"Export of {self.entity} {self.id}"
+
+
+class ChangeLogEntry(models.Model):
+    """
+    Change of a lead, opportunity, account, contact, case or invoice: the
+    fields changed by a save as ``{field: [old, new]}``. Append only, written
+    in batches by common/change_log.py.
+    """
+
+    ACTION_CHOICES = (
+        ("create", "Create"),
+        ("update", "Update"),
+        ("delete", "Delete"),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    org = models.ForeignKey(
+        Org,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="change_log_entries",
+    )
+    entity = models.CharField(max_length=32)
+    object_id = models.UUIDField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changes = models.JSONField(default=dict, blank=True)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="change_log_entries",
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Change Log Entry"
+        verbose_name_plural = "Change Log Entries"
+        db_table = "change_log_entry"
+        indexes = [
+            models.Index(
+                fields=["entity", "object_id", "-id"], name="change_log_object_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.entity} {self.object_id}"
@@ -0,0 +1,150 @@
+"""
+Keyset (cursor) pagination shared by the list views.
+
+The list views page with ``LimitOffsetPagination`` and compute an extra
+"offset" with two more counts per bucket. With ``?pagination=cursor`` they
+use ``KeysetPagination`` instead: rows are ordered by (created_at, id) and
+every page carries opaque ``next_cursor``/``previous_cursor`` values that
+are sent back as ``?cursor=`` (or ``?<bucket>_cursor=`` for views with
+several buckets). No OFFSET is used, so deep pages cost the same as the
+first one.
+
+Counts are skipped unless asked for: ``?count=exact`` runs ``count()``,
+``?count=estimate`` uses the planner row estimate on PostgreSQL (exact
+count elsewhere).
+"""
+import base64
+import binascii
+import json
+import uuid
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+
+
+def _encode_cursor(direction, created_at, pk):
+    data = json.dumps(
+        {"d": direction, "c": created_at.isoformat(), "i": str(pk)},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(value):
+    try:
+        padded = value + "=" * (-len(value) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        created_at = parse_datetime(data["c"])
+        if data["d"] not in ("n", "p") or created_at is None:
+            raise ValueError
+        return data["d"], created_at, uuid.UUID(str(data["i"]))
+    except (KeyError, TypeError, ValueError, binascii.Error, UnicodeDecodeError):
+        raise NotFound("Invalid cursor")
+
+
+def estimate_count(queryset):
+    """Planner row estimate on PostgreSQL, exact count on other databases"""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class KeysetPage:
+    def __init__(self, results, next_cursor, previous_cursor, count, count_is_estimate):
+        self.results = results
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+        self.count_is_estimate = count_is_estimate
+
+    def links(self):
+        return {
+            "next_cursor": self.next_cursor,
+            "previous_cursor": self.previous_cursor,
+            "count_is_estimate": self.count_is_estimate,
+        }
+
+
+class KeysetPagination:
+    mode_query_param = "pagination"
+    cursor_query_param = "cursor"
+    limit_query_param = "limit"
+    count_query_param = "count"
+    max_limit = 100
+
+    def __init__(self, request):
+        self.request = request
+        self.limit = self.get_limit()
+        self.count_mode = request.query_params.get(self.count_query_param, "")
+
+    @classmethod
+    def is_requested(cls, request):
+        return request.query_params.get(cls.mode_query_param) == "cursor"
+
+    def get_limit(self):
+        default = settings.REST_FRAMEWORK.get("PAGE_SIZE") or 10
+        try:
+            limit = int(self.request.query_params.get(self.limit_query_param, default))
+        except (TypeError, ValueError):
+            return default
+        return max(1, min(limit, self.max_limit))
+
+    def get_cursor_param(self, bucket=None):
+        return f"{bucket}_{self.cursor_query_param}" if bucket else self.cursor_query_param
+
+    def get_count(self, queryset):
+        if self.count_mode == "exact":
+            return queryset.count(), False
+        if self.count_mode == "estimate":
+            return estimate_count(queryset), True
+        return None, False
+
+    def paginate(self, queryset, bucket=None):
+        """Return a KeysetPage of ``queryset`` for the cursor of ``bucket``"""
+        count, count_is_estimate = self.get_count(queryset)
+
+        cursor = self.request.query_params.get(self.get_cursor_param(bucket))
+        direction, created_at, pk = ("n", None, None)
+        if cursor:
+            direction, created_at, pk = _decode_cursor(cursor)
+
+        if direction == "p":
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+            ).order_by("created_at", "id")
+        else:
+            if cursor:
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+                )
+            queryset = queryset.order_by("-created_at", "-id")
+
+        rows = list(queryset[: self.limit + 1])
+        has_more = len(rows) > self.limit
+        rows = rows[: self.limit]
+        if direction == "p":
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            first, last = rows[0], rows[-1]
+            if direction == "p":
+                next_cursor = _encode_cursor("n", last.created_at, last.id)
+                if has_more:
+                    previous_cursor = _encode_cursor("p", first.created_at, first.id)
+            else:
+                if has_more:
+                    next_cursor = _encode_cursor("n", last.created_at, last.id)
+                if cursor:
+                    previous_cursor = _encode_cursor("p", first.created_at, first.id)
+        return KeysetPage(rows, next_cursor, previous_cursor, count, count_is_estimate)
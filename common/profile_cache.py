@@ -0,0 +1,230 @@
+"""
+Two-tier cache for the profile resolved by ``GetProfileAndOrg``.
+
+Every API request resolves ``(user_id, org_id) -> Profile``. The first tier is
+a small in-process LRU with a short TTL, the second one is the shared
+``CACHES["default"]`` backend (Redis). Entries are stored pickled so each
+request gets its own ``Profile`` instance and views can't leak changes into
+the cache.
+
+Entries are dropped explicitly from ``common.signals`` whenever a ``Profile``,
+``User`` or ``Org`` is saved or deleted. Invalidation also replaces a per-user
+version stamp kept in the shared backend. Local entries remember the stamp
+they were read under and are only served while it is unchanged, so workers
+that didn't handle the invalidation drop their copy on the next request too.
+The stamp is one small read per lookup. The local tier saves the transfer and
+unpickling of the profile, and the TTL (``PROFILE_CACHE_LOCAL_TTL``) bounds
+how long a copy can live.
+"""
+import logging
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from common.models import Profile
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "profile_cache"
+# org part of the key used by the /api/profile/ fallback (first active profile)
+ANY_ORG = "any"
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class LocalLRUCache:
+    """Thread safe LRU dict with a per-entry TTL."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_local = LocalLRUCache(
+    maxsize=_setting("PROFILE_CACHE_LOCAL_SIZE", 2048),
+    ttl=_setting("PROFILE_CACHE_LOCAL_TTL", 5),
+)
+
+_stats_lock = threading.Lock()
+_stats = {"local_hits": 0, "shared_hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _incr(counter, amount=1):
+    with _stats_lock:
+        _stats[counter] += amount
+
+
+def get_stats():
+    """Return hit/miss counters of this process."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["local_hits"] + stats["shared_hits"] + stats["misses"]
+    stats["lookups"] = lookups
+    stats["hit_ratio"] = (
+        round((stats["local_hits"] + stats["shared_hits"]) / lookups, 4)
+        if lookups
+        else 0.0
+    )
+    stats["local_size"] = len(_local)
+    return stats
+
+
+def reset_stats():
+    with _stats_lock:
+        for counter in _stats:
+            _stats[counter] = 0
+
+
+def make_key(user_id, org_id=None):
+    return f"{KEY_PREFIX}:{user_id}:{org_id or ANY_ORG}"
+
+
+def make_version_key(user_id):
+    return f"{KEY_PREFIX}:version:{user_id}"
+
+
+def _get_version(user_id):
+    """Current stamp of the user, None when the shared backend is unavailable"""
+    try:
+        return cache.get_or_set(make_version_key(user_id), uuid.uuid4().hex, None)
+    except Exception as e:
+        logger.warning(f"Profile cache version read failed for {user_id}: {str(e)}")
+        return None
+
+
+def _load_profile(user_id, org_id):
+    queryset = Profile.objects.select_related("user", "org").filter(
+        user_id=user_id, is_active=True
+    )
+    if org_id:
+        return queryset.get(org=org_id)
+    return queryset.first()
+
+
+def get_profile(user_id, org_id=None):
+    """
+    Return the active profile of ``user_id`` in ``org_id``.
+
+    When ``org_id`` is empty the first active profile of the user is returned
+    (or ``None``), otherwise ``Profile.DoesNotExist`` is raised the same way
+    ``Profile.objects.get`` does. Misses are not cached.
+    """
+    key = make_key(user_id, org_id)
+    version = _get_version(user_id)
+
+    local = _local.get(key)
+    if local is not None:
+        local_version, payload = local
+        if version is not None and local_version == version:
+            _incr("local_hits")
+            return pickle.loads(payload)
+        _local.delete(key)
+
+    try:
+        payload = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Profile cache read failed for {key}: {str(e)}")
+        payload = None
+    if payload is not None:
+        _incr("shared_hits")
+        if version is not None:
+            _local.set(key, (version, payload))
+        return pickle.loads(payload)
+
+    _incr("misses")
+    profile = _load_profile(user_id, org_id)
+    if profile is None:
+        return None
+
+    payload = pickle.dumps(profile, pickle.HIGHEST_PROTOCOL)
+    try:
+        cache.set(key, payload, _setting("PROFILE_CACHE_TIMEOUT", 300))
+    except Exception as e:
+        logger.warning(f"Profile cache write failed for {key}: {str(e)}")
+    if version is not None:
+        _local.set(key, (version, payload))
+    return profile
+
+
+def invalidate(pairs):
+    """Drop the cached entries for an iterable of ``(user_id, org_id)``."""
+    keys = set()
+    user_ids = set()
+    for user_id, org_id in pairs:
+        keys.add(make_key(user_id, org_id))
+        # the "first active profile" entry may point to any org of the user
+        keys.add(make_key(user_id))
+        user_ids.add(user_id)
+    if not keys:
+        return
+    for key in keys:
+        _local.delete(key)
+    try:
+        cache.delete_many(list(keys))
+        # local copies of the other workers are checked against it
+        cache.set_many(
+            {make_version_key(user_id): uuid.uuid4().hex for user_id in user_ids},
+            None,
+        )
+    except Exception as e:
+        logger.warning(f"Profile cache invalidation failed: {str(e)}")
+    _incr("invalidations", len(keys))
+
+
+def invalidate_profile(profile):
+    invalidate([(profile.user_id, profile.org_id)])
+
+
+def invalidate_user(user_id):
+    org_ids = Profile.objects.filter(user_id=user_id).values_list("org_id", flat=True)
+    invalidate([(user_id, org_id) for org_id in org_ids] or [(user_id, None)])
+
+
+def invalidate_org(org_id):
+    user_ids = Profile.objects.filter(org_id=org_id).values_list("user_id", flat=True)
+    invalidate([(user_id, org_id) for user_id in user_ids])
+
+
+def clear_local():
+    _local.clear()
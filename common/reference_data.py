@@ -0,0 +1,221 @@
+"""
+Reference data ("lookups") of the list views: contacts, companies, tags,
+users, choices... served by per-entity ``/meta/`` endpoints.
+
+Every lookup payload depends on a few models. Each (org, model) pair has a
+version stamp in ``CACHES["default"]`` that is replaced whenever a row of
+that model is saved, deleted or has its m2m changed. The ETag of a payload is
+derived from the stamps only, so a conditional request is answered with a
+304 without building anything, and the built payload is cached under the
+same stamps. Old entries are never invalidated, they just stop being read and
+expire after ``REFERENCE_DATA_CACHE_TIMEOUT``.
+
+List views keep embedding the lookups (from the same cache) unless they are
+called with ``?include_lookups=false``.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+VERSION_PREFIX = "reference_data:version"
+PAYLOAD_PREFIX = "reference_data:payload"
+# bump when the shape of the payloads changes
+SCHEMA_VERSION = 1
+
+
+def org_field(model):
+    for name in ("org", "organization"):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if field.many_to_one:
+            return name
+    return None
+
+
+def _own_org_ids(instance):
+    return [instance.pk]
+
+
+def _user_org_ids(instance):
+    from common.models import Profile
+
+    return Profile.objects.filter(user_id=instance.pk).values_list("org_id", flat=True)
+
+
+def _related_org_ids(instance):
+    """
+    Orgs of the rows an org-less row is attached to: the foreign keys of an
+    attachment, the rows pointing to an address.
+    """
+    org_ids = set()
+    for field in instance._meta.concrete_fields:
+        value = getattr(instance, field.attname)
+        related_org = field.many_to_one and org_field(field.related_model)
+        if value is not None and related_org:
+            org_ids.update(
+                field.related_model._default_manager.filter(pk=value).values_list(
+                    related_org, flat=True
+                )
+            )
+    for relation in instance._meta.related_objects:
+        related_org = relation.one_to_many and org_field(relation.related_model)
+        if related_org:
+            org_ids.update(
+                relation.related_model._default_manager.filter(
+                    **{relation.field.name: instance.pk}
+                ).values_list(related_org, flat=True)
+            )
+    return org_ids
+
+
+# "app_label.ModelName" -> name of the org foreign key (None for global
+# models) or a function returning the orgs a row change affects. Org-less
+# models nested in the payload serializers (users, attachments, addresses,
+# comments) are tracked under the orgs of the rows they belong to.
+TRACKED_MODELS = {
+    "accounts.Account": "org",
+    "accounts.Tags": None,
+    "common.Address": _related_org_ids,
+    "common.Attachments": _related_org_ids,
+    "common.Comment": _related_org_ids,
+    "common.Org": _own_org_ids,
+    "common.Profile": "org",
+    "common.User": _user_org_ids,
+    "companies.CompanyProfile": "org",
+    "contacts.Contact": "org",
+    "leads.Lead": "organization",
+    "opportunity.Opportunity": "org",
+    "teams.Teams": "org",
+}
+
+
+def _version_key(label, org_id):
+    return f"{VERSION_PREFIX}:{label}:{org_id or 'global'}"
+
+
+def _new_stamp():
+    return str(time.time_ns())
+
+
+def bump(label, org_id):
+    cache.set(_version_key(label, org_id), _new_stamp(), None)
+
+
+def get_versions(labels, org_id):
+    """
+    Current stamps of ``labels`` for the org, missing ones are created.
+    Labels that aren't in ``TRACKED_MODELS`` are org stamps bumped explicitly.
+    """
+    keys = {
+        label: _version_key(label, org_id if TRACKED_MODELS.get(label, True) else None)
+        for label in labels
+    }
+    found = cache.get_many(list(keys.values()))
+    versions = []
+    for label, key in sorted(keys.items()):
+        stamp = found.get(key)
+        if stamp is None:
+            cache.add(key, _new_stamp(), None)
+            stamp = cache.get(key)
+        versions.append(f"{label}={stamp}")
+    return versions
+
+
+def lookups_requested(request):
+    value = request.query_params.get("include_lookups", "true")
+    return value.lower() not in ("false", "0", "no")
+
+
+def _model_changed(sender, instance, action=None, **kwargs):
+    label = sender._meta.label
+    if label not in TRACKED_MODELS or (action and action.startswith("pre_")):
+        return
+    org_field = TRACKED_MODELS[label]
+    if callable(org_field):
+        org_ids = set(org_field(instance))
+    elif org_field:
+        org_ids = {getattr(instance, f"{org_field}_id", None)}
+    else:
+        org_ids = {None}
+    for org_id in org_ids:
+        bump(label, org_id)
+
+
+def connect_signals():
+    from django.apps import apps
+
+    for label in TRACKED_MODELS:
+        model = apps.get_model(label)
+        post_save.connect(_model_changed, sender=model, dispatch_uid=f"ref_data_{label}")
+        post_delete.connect(
+            _model_changed, sender=model, dispatch_uid=f"ref_data_del_{label}"
+        )
+
+    def m2m_model_changed(sender, instance, action=None, **kwargs):
+        _model_changed(type(instance), instance, action=action)
+
+    m2m_changed.connect(m2m_model_changed, weak=False, dispatch_uid="ref_data_m2m")
+
+
+class ReferenceDataView(APIView):
+    """
+    Base view of the ``/meta/`` endpoints. Subclasses set ``entity`` and
+    ``dependencies`` and implement ``build(request)``.
+    """
+
+    permission_classes = (IsAuthenticated,)
+    entity = None
+    dependencies = ()
+
+    @classmethod
+    def get_scope(cls, request):
+        """Part of the cache key for payloads that depend on the user's role"""
+        return "all"
+
+    @classmethod
+    def build(cls, request):
+        raise NotImplementedError
+
+    @classmethod
+    def get_etag(cls, request):
+        org_id = request.profile.org_id
+        versions = get_versions(cls.dependencies, org_id)
+        raw = f"{SCHEMA_VERSION}:{cls.entity}:{org_id}:{cls.get_scope(request)}:{versions}"
+        return f'"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+    @classmethod
+    def get_payload(cls, request, etag=None):
+        etag = etag or cls.get_etag(request)
+        key = "%s:%s:%s" % (PAYLOAD_PREFIX, cls.entity, etag.strip('"'))
+        payload = cache.get(key)
+        if payload is None:
+            payload = cls.build(request)
+            cache.set(
+                key,
+                payload,
+                getattr(settings, "REFERENCE_DATA_CACHE_TIMEOUT", 60 * 60),
+            )
+        return payload
+
+    def get(self, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        headers = {
+            "ETag": etag,
+            "Cache-Control": "private, max-age=%s"
+            % getattr(settings, "REFERENCE_DATA_MAX_AGE", 60),
+            "Vary": "Authorization, Org",
+        }
+        if_none_match = request.headers.get("If-None-Match", "")
+        if etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(self.get_payload(request, etag), headers=headers)
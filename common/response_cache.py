@@ -0,0 +1,131 @@
+"""
+Response cache of the dashboard endpoints.
+
+``DashboardSummaryView`` and ``JobTitlesDistributionView`` return the same
+payload to every admin of an org (and to the same non admin user) for the
+same query parameters. ``CachedResponseMixin`` caches their 200 responses in
+``CACHES["default"]`` under (view, org, scope, query params) and the
+version stamps of ``common.reference_data`` for the models they read, so any
+write to those models makes the next request recompute.
+
+* single flight: only the worker holding the lock of a key recomputes it,
+  the others serve the last payload computed for the same view, org, scope
+  and parameters ("stale") or wait up to ``RESPONSE_CACHE_LOCK_WAIT`` for the
+  fresh one;
+* stale while revalidate: stale payloads are also served when recomputing
+  fails with a database error (timeouts of an overloaded database).
+
+Cached responses carry an ``Age`` header (seconds since they were computed)
+and ``X-Cache: HIT|MISS|STALE``.
+"""
+import hashlib
+import logging
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from rest_framework import status
+from rest_framework.response import Response
+
+from common.reference_data import get_versions
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "response_cache"
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class CachedResponseMixin:
+    """
+    Cache the 200 responses of ``get``. Views set ``response_cache_name`` and
+    ``response_cache_dependencies`` (labels of ``reference_data.TRACKED_MODELS``)
+    and call ``self.cached_response(request, build)`` from ``get``.
+    """
+
+    response_cache_name = None
+    response_cache_dependencies = ()
+
+    def get_response_cache_scope(self, request):
+        profile = request.profile
+        if profile.role in ["ADMIN", "MANAGER"] or request.user.is_superuser:
+            return "all"
+        return f"profile:{profile.id}"
+
+    def get_response_cache_keys(self, request):
+        org_id = request.profile.org_id
+        params = sorted(
+            (key, value)
+            for key in request.query_params
+            for value in request.query_params.getlist(key)
+        )
+        base = hashlib.md5(
+            f"{org_id}:{self.get_response_cache_scope(request)}:{params}".encode()
+        ).hexdigest()
+        versions = hashlib.md5(
+            str(get_versions(self.response_cache_dependencies, org_id)).encode()
+        ).hexdigest()
+        base = f"{PREFIX}:{self.response_cache_name}:{base}"
+        return f"{base}:{versions}", f"{base}:stale"
+
+    def cached_response(self, request, build):
+        if getattr(request, "profile", None) is None:
+            return build(request)
+
+        key, stale_key = self.get_response_cache_keys(request)
+        entry = cache.get(key)
+        if entry is not None:
+            return self._respond(entry, "HIT")
+
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+        if not cache.add(lock_key, token, _setting("RESPONSE_CACHE_LOCK_TIMEOUT", 30)):
+            # someone else is recomputing this key
+            stale = cache.get(stale_key)
+            if stale is not None:
+                return self._respond(stale, "STALE")
+            entry = self._wait_for(key)
+            if entry is not None:
+                return self._respond(entry, "HIT")
+            return self._build(request, build, key, stale_key)
+
+        try:
+            return self._build(request, build, key, stale_key)
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    def _build(self, request, build, key, stale_key):
+        try:
+            response = build(request)
+        except DatabaseError as e:
+            stale = cache.get(stale_key)
+            if stale is None:
+                raise
+            logger.warning(f"Serving stale {self.response_cache_name}: {str(e)}")
+            return self._respond(stale, "STALE")
+
+        if response.status_code == status.HTTP_200_OK:
+            entry = {"data": response.data, "computed_at": time.time()}
+            cache.set(key, entry, _setting("RESPONSE_CACHE_TIMEOUT", 300))
+            cache.set(stale_key, entry, _setting("RESPONSE_CACHE_STALE_TIMEOUT", 86400))
+            response["Age"] = "0"
+            response["X-Cache"] = "MISS"
+        return response
+
+    def _wait_for(self, key):
+        deadline = time.monotonic() + _setting("RESPONSE_CACHE_LOCK_WAIT", 2)
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry
+        return None
+
+    def _respond(self, entry, cache_status):
+        age = max(int(time.time() - entry["computed_at"]), 0)
+        return Response(entry["data"], headers={"Age": str(age), "X-Cache": cache_status})
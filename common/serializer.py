@@ -18,10 +18,12 @@ from common.models import (
     Attachments,
     Comment,
     Document,
+    ExportJob,
     Org,
     Profile,
     User,
 )
+from common import export_jobs
 
 
 class OrganizationSerializer(serializers.ModelSerializer):
@@ -647,3 +649,62 @@ class ResetPasswordConfirmSerializer(serializers.Serializer):
                 {"confirm_password": "Passwords don't match"}
             )
         return attrs
+
+
+class BulkItemsSwaggerSerializer(serializers.Serializer):
+    """Body of the POST/PATCH batch endpoints (common.bulk)"""
+
+    items = serializers.ListField(
+        child=serializers.DictField(),
+        help_text="Rows to create, or to update (with their id)",
+    )
+
+
+class BulkIdsSwaggerSerializer(serializers.Serializer):
+    """Body of the DELETE batch endpoints (common.bulk)"""
+
+    ids = serializers.ListField(
+        child=serializers.UUIDField(), help_text="Ids of the rows to delete"
+    )
+
+
+class ExportJobCreateSerializer(serializers.Serializer):
+    """Body of POST /api/exports/ (common.export_jobs)"""
+
+    entity = serializers.ChoiceField(choices=sorted(export_jobs.SOURCES))
+    format = serializers.ChoiceField(choices=ExportJob.FORMAT_CHOICES, default="csv")
+    params = serializers.DictField(
+        required=False,
+        default=dict,
+        help_text="Query parameters of the list endpoint of the entity",
+    )
+    notify = serializers.BooleanField(
+        default=False, help_text="Email the download link once the file is ready"
+    )
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = (
+            "id",
+            "entity",
+            "format",
+            "params",
+            "notify",
+            "status",
+            "row_count",
+            "file_size",
+            "download_url",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        )
+
+    def get_download_url(self, obj):
+        if obj.status != "completed" or not obj.file:
+            return None
+        return export_jobs.download_url(obj)
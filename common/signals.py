@@ -0,0 +1,77 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from common import (
+    api_keys,
+    change_log,
+    dashboard_rollups,
+    global_search,
+    profile_cache,
+    reference_data,
+)
+from common.models import APISettings, Org, Profile, User
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    """Drop the cached profile so role changes and deactivations apply at once"""
+    profile_cache.invalidate_profile(instance)
+    # the acting profile of the org api key may have changed
+    api_keys.revoke_org(instance.org_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user_profiles(sender, instance, **kwargs):
+    profile_cache.invalidate_user(instance.pk)
+    # the user may be the acting profile of an org api key
+    for org_id in Profile.objects.filter(user_id=instance.pk).values_list(
+        "org_id", flat=True
+    ):
+        api_keys.revoke_org(org_id)
+
+
+@receiver(post_save, sender=Org)
+@receiver(post_delete, sender=Org)
+def invalidate_cached_org_profiles(sender, instance, **kwargs):
+    profile_cache.invalidate_org(instance.pk)
+    api_keys.revoke_digests(org_digests=[instance.api_key_digest])
+
+
+@receiver(pre_save, sender=Org)
+def revoke_replaced_org_api_key(sender, instance, **kwargs):
+    if instance._state.adding:
+        return
+    old_digest = (
+        Org.objects.filter(pk=instance.pk)
+        .values_list("api_key_digest", flat=True)
+        .first()
+    )
+    if old_digest and old_digest != instance.api_key_digest:
+        api_keys.revoke_digests(org_digests=[old_digest])
+
+
+@receiver(pre_save, sender=APISettings)
+def revoke_replaced_site_api_key(sender, instance, **kwargs):
+    if instance._state.adding:
+        return
+    old_digest = (
+        APISettings.objects.filter(pk=instance.pk)
+        .values_list("apikey_digest", flat=True)
+        .first()
+    )
+    if old_digest and old_digest != instance.apikey_digest:
+        api_keys.revoke_digests(site_digests=[old_digest])
+
+
+@receiver(post_save, sender=APISettings)
+@receiver(post_delete, sender=APISettings)
+def revoke_site_api_key(sender, instance, **kwargs):
+    api_keys.revoke_digests(site_digests=[instance.apikey_digest])
+
+
+reference_data.connect_signals()
+dashboard_rollups.connect_signals()
+global_search.connect_signals()
+change_log.connect_signals()
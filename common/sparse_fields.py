@@ -0,0 +1,126 @@
+"""
+Sparse fieldsets for the API serializers.
+
+Serializers using ``SparseFieldsMixin`` read two query parameters from the
+request of their context:
+
+* ``?fields=id,lead_title,contact`` keeps only these fields;
+* ``?expand=contact,assigned_to`` renders these relations in full.
+
+Once either parameter is given, the nested relations that are not expanded
+are rendered as their ids, or left out when they are not model relations
+(properties such as ``get_team_users``). Without them the output is
+unchanged. Only the top level serializer is pruned: an expanded relation is
+rendered with its usual nested serializer.
+
+``prune_queryset`` drops the select_related/prefetch_related lookups of a
+list queryset that only serve fields the response leaves out, so the
+relations that were not asked for are not loaded.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework import serializers
+
+from common.bucketing import related_lookups
+
+
+def _requested(request, param):
+    """Names listed in ``?<param>=``, None when the parameter is missing"""
+    value = request.query_params.get(param) if request is not None else None
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def _lookup_root(lookup):
+    path = lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup
+    return path.split(LOOKUP_SEP, 1)[0], path
+
+
+class SparseFieldsMixin:
+    # SerializerMethodField name -> the relations its method reads, so that
+    # prune_queryset keeps them loaded
+    method_field_relations = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        self.requested_fields = _requested(request, "fields")
+        self.expanded_fields = _requested(request, "expand")
+        if self.is_sparse:
+            self._prune_fields()
+
+    @property
+    def is_sparse(self):
+        return self.requested_fields is not None or self.expanded_fields is not None
+
+    def _prune_fields(self):
+        for name in list(self.fields):
+            if self.requested_fields is not None and name not in self.requested_fields:
+                self.fields.pop(name)
+            elif name not in (self.expanded_fields or ()):
+                field = self.fields[name]
+                if isinstance(field, serializers.BaseSerializer):
+                    collapsed = self._collapse(name, field)
+                    if collapsed is None:
+                        self.fields.pop(name)
+                    else:
+                        self.fields[name] = collapsed
+
+    def _collapse(self, name, field):
+        """The ids field replacing the nested serializer ``field``"""
+        try:
+            model_field = self.Meta.model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.is_relation:
+            return None
+        kwargs = {"read_only": True}
+        if field.source != name:
+            kwargs["source"] = field.source
+        if model_field.many_to_many or model_field.one_to_many:
+            kwargs["many"] = True
+        return serializers.PrimaryKeyRelatedField(**kwargs)
+
+    @classmethod
+    def prune_queryset(cls, queryset, request):
+        """
+        ``queryset`` without the select_related/prefetch_related lookups of
+        the relations the request leaves out, or renders as ids.
+        """
+        serializer = cls(context={"request": request})
+        if not serializer.is_sparse:
+            return queryset
+
+        expanded, collapsed = set(), set()
+        for name, field in serializer.fields.items():
+            if isinstance(field, serializers.SerializerMethodField):
+                expanded.update(cls.method_field_relations.get(name, ()))
+                continue
+            root = field.source.split(".", 1)[0]
+            if isinstance(field, serializers.BaseSerializer) or "." in field.source:
+                expanded.add(root)
+            elif isinstance(
+                field, (serializers.RelatedField, serializers.ManyRelatedField)
+            ):
+                collapsed.add(root)
+
+        select_related = queryset.query.select_related
+        if isinstance(select_related, dict):
+            kept = {
+                field: nested
+                for field, nested in select_related.items()
+                if field in expanded
+            }
+            queryset = queryset.select_related(None)
+            if kept:
+                queryset = queryset.select_related(*related_lookups(kept))
+
+        prefetches = []
+        for lookup in queryset._prefetch_related_lookups:
+            root, path = _lookup_root(lookup)
+            # ids of a collapsed m2m only need the relation itself
+            if root in expanded or (root in collapsed and path == root):
+                prefetches.append(lookup)
+        return queryset.prefetch_related(None).prefetch_related(*prefetches)
@@ -45,3 +45,72 @@ document_get_params = [
     OpenApiParameter("shared_to", OpenApiTypes.STR,OpenApiParameter.QUERY),
 ]
 
+
+# opt-in keyset pagination of the list views (common.pagination)
+cursor_pagination_params = [
+    OpenApiParameter(
+        "pagination", OpenApiTypes.STR, OpenApiParameter.QUERY, enum=["cursor"],
+        description="Use cursor pages ordered by (created_at, id)",
+    ),
+    OpenApiParameter(
+        "cursor", OpenApiTypes.STR, OpenApiParameter.QUERY,
+        description="next_cursor/previous_cursor of a previous page. Views with "
+        "several buckets take <bucket>_cursor, e.g. open_cursor",
+    ),
+    OpenApiParameter(
+        "count", OpenApiTypes.STR, OpenApiParameter.QUERY, enum=["exact", "estimate"],
+        description="Include counts in cursor mode",
+    ),
+]
+
+include_lookups_params = [
+    OpenApiParameter(
+        "include_lookups", OpenApiTypes.BOOL, OpenApiParameter.QUERY,
+        description="Set to false to leave out the lookups served by the /meta/ endpoint",
+    ),
+]
+
+# streaming CSV export of the list views (common.export)
+export_params = [
+    OpenApiParameter(
+        "export", OpenApiTypes.BOOL, OpenApiParameter.QUERY,
+        description="Set to true to download the filtered rows as a CSV file",
+    ),
+]
+
+home_feed_params = [
+    organization_params_in_header,
+    OpenApiParameter(
+        "entity", OpenApiTypes.STR, OpenApiParameter.QUERY,
+        enum=["accounts", "contacts", "leads", "opportunities"],
+        description="Only return the rows of this entity (the counts are always returned)",
+    ),
+    OpenApiParameter(
+        "limit", OpenApiTypes.INT, OpenApiParameter.QUERY,
+        description="Rows per entity (10 by default, at most 100)",
+    ),
+    OpenApiParameter(
+        "<entity>_cursor", OpenApiTypes.STR, OpenApiParameter.QUERY,
+        description="<entity>_next_cursor/<entity>_previous_cursor of a previous "
+        "response, e.g. leads_cursor",
+    ),
+]
+
+global_search_params = [
+    organization_params_in_header,
+    OpenApiParameter(
+        "q", OpenApiTypes.STR, OpenApiParameter.QUERY, required=True,
+        description="Text to search (at least 2 characters)",
+    ),
+    OpenApiParameter(
+        "types", OpenApiTypes.STR, OpenApiParameter.QUERY,
+        description="Comma separated entities: lead, contact, company, opportunity, case",
+    ),
+    OpenApiParameter("limit", OpenApiTypes.INT, OpenApiParameter.QUERY),
+]
+
+change_log_params = [
+    organization_params_in_header,
+    OpenApiParameter("limit", OpenApiTypes.INT, OpenApiParameter.QUERY),
+    OpenApiParameter("offset", OpenApiTypes.INT, OpenApiParameter.QUERY),
+]
@@ -9,7 +9,8 @@ from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
 import logging
 
-from common.models import Comment, User
+from common import dashboard_rollups, export_jobs, global_search
+from common.models import Comment, DashboardRollupState, Org, User
 from common.token_generator import account_activation_token
 
 app = Celery("crm", broker=settings.CELERY_BROKER_URL)
@@ -289,3 +290,43 @@ def send_email_to_reset_password(user_email):
 
 
 
+
+
+@app.task
+def refresh_dashboard_rollup(org_id, entity, day):
+    """Recompute the dashboard counters of one (org, entity, day)"""
+    dashboard_rollups.refresh(org_id, entity, day)
+
+
+@app.task
+def rebuild_dashboard_rollups(org_id=None):
+    """
+    Recompute the dashboard counters of an org, or of every org already
+    built. Run it periodically to catch writes that skip the model signals.
+    """
+    if org_id:
+        org_ids = [org_id]
+    else:
+        org_ids = DashboardRollupState.objects.values_list("org_id", flat=True)
+    for org_id in list(org_ids):
+        dashboard_rollups.rebuild(org_id)
+
+
+@app.task
+def rebuild_search_index(org_id=None):
+    """Recreate the global search entries of an org, or of every org"""
+    org_ids = [org_id] if org_id else Org.objects.values_list("id", flat=True)
+    for org_id in list(org_ids):
+        global_search.rebuild(org_id)
+
+
+@app.task
+def refresh_related_search_entries(entity, pks):
+    """Rewrite the search entries showing renamed contacts or companies"""
+    global_search.refresh_related(entity, pks)
+
+
+@app.task
+def run_export_job(job_id):
+    """Write the file of a queued export job"""
+    export_jobs.run(job_id)
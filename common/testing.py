@@ -0,0 +1,61 @@
+"""
+Shared setup of the API test cases of the apps.
+"""
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from common import profile_cache
+from common.models import Org, Profile, User
+
+
+class OrgAPITestCase(TestCase):
+    """
+    An org, a user with a profile in it (``self.user``, ``self.profile``) and
+    ``self.client`` authenticated as that user. Caches are emptied first so
+    profiles and stamps don't leak between tests.
+    """
+
+    org_name = "Test Org"
+    email = "admin@example.com"
+    role = "ADMIN"
+    phone = "+15550000000"
+
+    def setUp(self):
+        cache.clear()
+        profile_cache.clear_local()
+        self.org = Org.objects.create(name=self.org_name)
+        self.user = User.objects.create(email=self.email)
+        self.profile = Profile.objects.create(
+            user=self.user, org=self.org, role=self.role, phone=self.phone
+        )
+        self.client = APIClient()
+        self.authenticate(self.user)
+
+    def create_member(self, email, phone, role="USER"):
+        """Another user of the org, returns its profile"""
+        user = User.objects.create(email=email)
+        return Profile.objects.create(user=user, org=self.org, role=role, phone=phone)
+
+    def authenticate(self, user):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}",
+            HTTP_ORG=str(self.org.id),
+        )
+
+    def run_tasks_eagerly(self, *tasks):
+        """
+        Run the celery ``tasks`` in process instead of sending them to the
+        broker, returns the ``delay`` mocks.
+        """
+        delays = []
+        for task in tasks:
+            patcher = mock.patch.object(task, "delay")
+            delay = patcher.start()
+            delay.side_effect = lambda *args, task=task: task.apply(args)
+            self.addCleanup(patcher.stop)
+            delays.append(delay)
+        return delays
@@ -0,0 +1,1191 @@
+import base64
+import csv
+import gzip
+import io
+import json
+import tempfile
+from unittest import mock
+
+import crum
+import jwt
+from django.core import mail
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from accounts.models import Account
+from cases.models import Case
+from common import api_keys, global_search, profile_cache, query_budget, tasks
+from common.bucketing import BucketedListing
+from common.dashboard_views import DashboardSummaryView
+from common.models import (
+    APISettings,
+    Attachments,
+    ChangeLogEntry,
+    Comment,
+    DashboardRollup,
+    ExportJob,
+    Org,
+    Profile,
+    SearchEntry,
+    api_key_digest,
+)
+from common.testing import OrgAPITestCase
+from companies.models import CompanyProfile
+from contacts.models import Contact
+from invoices.models import Invoice
+from leads.models import Lead
+from opportunity.models import Opportunity
+
+
+class ProfileCacheTestCase(OrgAPITestCase):
+    org_name = "Cache Org"
+    email = "cache@example.com"
+    role = "USER"
+
+    def setUp(self):
+        super().setUp()
+        profile_cache.reset_stats()
+
+    def test_repeat_lookup_hits_cache(self):
+        profile_cache.get_profile(self.user.id, self.org.id)
+        with self.assertNumQueries(0):
+            profile = profile_cache.get_profile(self.user.id, self.org.id)
+        self.assertEqual(profile.id, self.profile.id)
+        self.assertEqual(profile.org.name, "Cache Org")
+
+        stats = profile_cache.get_stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["local_hits"], 1)
+
+    def test_shared_tier_used_when_local_is_empty(self):
+        profile_cache.get_profile(self.user.id, self.org.id)
+        profile_cache.clear_local()
+        with self.assertNumQueries(0):
+            profile_cache.get_profile(self.user.id, self.org.id)
+        self.assertEqual(profile_cache.get_stats()["shared_hits"], 1)
+
+    def test_profile_save_invalidates(self):
+        profile_cache.get_profile(self.user.id, self.org.id)
+        profile_cache.get_profile(self.user.id)
+
+        self.profile.role = "ADMIN"
+        self.profile.save()
+        self.assertEqual(profile_cache.get_profile(self.user.id, self.org.id).role, "ADMIN")
+
+        self.profile.is_active = False
+        self.profile.save()
+        with self.assertRaises(Profile.DoesNotExist):
+            profile_cache.get_profile(self.user.id, self.org.id)
+        self.assertIsNone(profile_cache.get_profile(self.user.id))
+
+    def test_org_and_user_changes_invalidate(self):
+        profile_cache.get_profile(self.user.id, self.org.id)
+        self.org.name = "Renamed Org"
+        self.org.save()
+        self.assertEqual(
+            profile_cache.get_profile(self.user.id, self.org.id).org.name, "Renamed Org"
+        )
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertFalse(profile_cache.get_profile(self.user.id, self.org.id).user.is_active)
+
+    def test_invalidation_by_another_worker_drops_local_copy(self):
+        profile_cache.get_profile(self.user.id, self.org.id)
+        # what another process handling the save leaves in the shared backend
+        Profile.objects.filter(pk=self.profile.pk).update(role="ADMIN")
+        cache.delete(profile_cache.make_key(self.user.id, self.org.id))
+        cache.set(profile_cache.make_version_key(self.user.id), "bumped", None)
+
+        self.assertEqual(profile_cache.get_profile(self.user.id, self.org.id).role, "ADMIN")
+        self.assertEqual(profile_cache.get_stats()["local_hits"], 0)
+
+
+class SinglePassJWTAuthenticationTestCase(OrgAPITestCase):
+    org_name = "JWT Org"
+    email = "jwt@example.com"
+
+    def test_token_is_decoded_once_per_request(self):
+        token = str(AccessToken.for_user(self.user))
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {token}", HTTP_ORG=str(self.org.id)
+        )
+        with mock.patch(
+            "common.external_auth.jwt.decode", wraps=jwt.decode
+        ) as decode:
+            response = self.client.get("/api/profile/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(decode.call_count, 1)
+        self.assertEqual(response.data["user_obj"]["id"], str(self.profile.id))
+
+    def test_refresh_token_is_rejected(self):
+        token = str(RefreshToken.for_user(self.user))
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {token}", HTTP_ORG=str(self.org.id)
+        )
+        response = self.client.get("/api/profile/")
+        self.assertEqual(response.status_code, 401)
+
+
+class ApiKeyResolutionTestCase(OrgAPITestCase):
+    org_name = "Key Org"
+    email = "apikey@example.com"
+
+    def test_org_key_is_resolved_from_cache(self):
+        self.assertEqual(self.org.api_key_digest, api_key_digest(self.org.api_key))
+        org, profile = api_keys.resolve_org_api_key(self.org.api_key)
+        self.assertEqual((org.id, profile.id), (self.org.id, self.profile.id))
+        with self.assertNumQueries(0):
+            org, profile = api_keys.resolve_org_api_key(self.org.api_key)
+        self.assertEqual(profile.user.email, "apikey@example.com")
+
+    def test_unknown_key_and_revocation(self):
+        self.assertIsNone(api_keys.resolve_org_api_key("unknown"))
+        with self.assertNumQueries(0):
+            self.assertIsNone(api_keys.resolve_org_api_key("unknown"))
+
+        api_keys.resolve_org_api_key(self.org.api_key)
+        self.profile.role = "USER"
+        self.profile.save()
+        self.assertIsNone(api_keys.resolve_org_api_key(self.org.api_key)[1])
+
+    def test_deactivated_acting_user_is_rejected(self):
+        client = APIClient()
+        client.credentials(HTTP_TOKEN=self.org.api_key)
+        self.assertEqual(client.get("/api/leads/").status_code, 200)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertFalse(
+            api_keys.resolve_org_api_key(self.org.api_key)[1].user.is_active
+        )
+        self.assertEqual(client.get("/api/leads/").status_code, 401)
+
+    def test_site_key_change_revokes_old_key(self):
+        api_setting = APISettings.objects.create(
+            title="Site", website="https://example.com", org=self.org
+        )
+        old_key = api_setting.apikey
+        self.assertEqual(api_keys.resolve_site_api_key(old_key).id, api_setting.id)
+
+        api_setting.apikey = "0123456789abcdef"
+        api_setting.save()
+        self.assertIsNone(api_keys.resolve_site_api_key(old_key))
+        self.assertEqual(
+            api_keys.resolve_site_api_key("0123456789abcdef").id, api_setting.id
+        )
+
+
+class KeysetPaginationTestCase(OrgAPITestCase):
+    org_name = "Paging Org"
+    email = "admin@paging.com"
+
+    def setUp(self):
+        super().setUp()
+        for i in range(4):
+            self.create_member(f"user{i}@paging.com", f"+1555000100{i + 1}")
+
+    def get_page(self, **params):
+        response = self.client.get(
+            "/api/users/", {"pagination": "cursor", "limit": 2, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data["active_users"]
+
+    def test_walk_forward_and_back(self):
+        expected = [
+            str(pk)
+            for pk in Profile.objects.filter(org=self.org)
+            .order_by("-created_at", "-id")
+            .values_list("id", flat=True)
+        ]
+        seen = []
+        page = self.get_page(count="exact")
+        self.assertEqual(page["active_users_count"], 5)
+        self.assertIsNone(page["previous_cursor"])
+        pages = [page]
+        while page["next_cursor"]:
+            page = self.get_page(active_cursor=page["next_cursor"])
+            pages.append(page)
+        for page in pages:
+            seen += [item["id"] for item in page["active_users"]]
+        self.assertEqual(seen, expected)
+
+        back = self.get_page(active_cursor=pages[-1]["previous_cursor"])
+        self.assertEqual(
+            [item["id"] for item in back["active_users"]],
+            [item["id"] for item in pages[-2]["active_users"]],
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            "/api/users/", {"pagination": "cursor", "active_cursor": "bogus"}
+        )
+        self.assertEqual(response.status_code, 404)
+
+        bad_id = base64.urlsafe_b64encode(
+            json.dumps({"d": "n", "c": "2026-01-01T00:00:00+00:00", "i": "abc"}).encode()
+        ).decode()
+        response = self.client.get(
+            "/api/users/", {"pagination": "cursor", "active_cursor": bad_id}
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class ReferenceDataTestCase(OrgAPITestCase):
+    org_name = "Meta Org"
+    email = "meta@example.com"
+
+    def setUp(self):
+        super().setUp()
+        self.company = CompanyProfile.objects.create(name="Acme", org=self.org)
+
+    def test_etag_and_not_modified(self):
+        response = self.client.get("/api/contacts/meta/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["companies"][0]["name"], "Acme")
+        etag = response["ETag"]
+        self.assertIn("max-age", response["Cache-Control"])
+
+        response = self.client.get("/api/contacts/meta/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.company.name = "Acme Ltd"
+        self.company.save()
+        response = self.client.get("/api/contacts/meta/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["companies"][0]["name"], "Acme Ltd")
+
+    def test_nested_rows_change_etag(self):
+        lead = Lead.objects.create(
+            lead_title="Nested", organization=self.org, company=self.company
+        )
+        Account.objects.create(name="Nested Account", org=self.org, lead=lead)
+        other_org = Org.objects.create(name="Other Meta Org")
+        other_lead = Lead.objects.create(lead_title="Other", organization=other_org)
+
+        etag = self.client.get("/api/opportunities/meta/")["ETag"]
+        Attachments.objects.create(
+            file_name="elsewhere.pdf", attachment="elsewhere.pdf", lead=other_lead
+        )
+        response = self.client.get("/api/opportunities/meta/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Attachments.objects.create(file_name="quote.pdf", attachment="quote.pdf", lead=lead)
+        response = self.client.get("/api/opportunities/meta/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["accounts_list"][0]["lead"]["lead_attachment"][0]["file_name"],
+            "quote.pdf",
+        )
+
+        etag = response["ETag"]
+        self.user.first_name = "Renamed"
+        self.user.save()
+        response = self.client.get("/api/opportunities/meta/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_can_skip_lookups(self):
+        response = self.client.get("/api/contacts/")
+        self.assertIn("companies", response.data["data"])
+        response = self.client.get("/api/contacts/", {"include_lookups": "false"})
+        self.assertNotIn("companies", response.data["data"])
+        self.assertIn("contact_obj_list", response.data["data"])
+
+
+class BucketedListingTestCase(OrgAPITestCase):
+    org_name = "Bucket Org"
+
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            Opportunity.objects.create(
+                name=f"Deal {i}",
+                stage="PROPOSAL" if i < 3 else "CLOSED WON",
+                org=self.org,
+            )
+
+    def test_counts_and_pages_in_two_queries(self):
+        listing = BucketedListing.by_field(
+            Opportunity.objects.filter(org=self.org), "stage", ["PROPOSAL", "CLOSED WON"]
+        )
+        with self.assertNumQueries(2):
+            counts = listing.counts()
+            pages = listing.pages(2, {"PROPOSAL": 2})
+        self.assertEqual(counts, {"PROPOSAL": 3, "CLOSED WON": 2})
+        self.assertEqual([o.name for o in pages["PROPOSAL"]], ["Deal 0"])
+        self.assertEqual([o.name for o in pages["CLOSED WON"]], ["Deal 4", "Deal 3"])
+        self.assertIsNone(BucketedListing.next_offset(2, pages["PROPOSAL"], 3))
+
+    def test_pages_keep_select_related(self):
+        company = CompanyProfile.objects.create(name="Board Co", org=self.org)
+        lead = Lead.objects.create(
+            lead_title="Board lead", organization=self.org, company=company
+        )
+        Opportunity.objects.filter(org=self.org).update(lead=lead)
+        listing = BucketedListing.by_field(
+            Opportunity.objects.filter(org=self.org).select_related("lead__company"),
+            "stage",
+            ["PROPOSAL"],
+        )
+        with self.assertNumQueries(1):
+            page = listing.pages(3)["PROPOSAL"]
+            self.assertEqual({o.lead.company.name for o in page}, {"Board Co"})
+
+
+class DashboardRollupTestCase(OrgAPITestCase):
+    org_name = "Dashboard Org"
+    email = "admin@dashboard.com"
+
+    def setUp(self):
+        super().setUp()
+        self.member = self.create_member("user@dashboard.com", "+15550004001")
+        CompanyProfile.objects.create(name="Dash Co", org=self.org)
+        for status in ["new", "new", "qualified"]:
+            Lead.objects.create(status=status, organization=self.org)
+        Lead.objects.create(
+            status="recycled", organization=self.org, assigned_to=self.member
+        )
+        for stage, revenue in [("PROPOSAL", 100), ("CLOSED WON", 50)]:
+            opportunity = Opportunity.objects.create(
+                name=stage, stage=stage, org=self.org, expected_revenue=revenue
+            )
+            opportunity.assigned_to.add(self.member)
+        (self.rebuild_delay,) = self.run_tasks_eagerly(tasks.rebuild_dashboard_rollups)
+
+    def get_summary(self, user, **params):
+        self.authenticate(user)
+        response = self.client.get("/api/dashboard/summary/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def assertMatchesExact(self, user, **params):
+        summary = self.get_summary(user, **params)
+        exact = self.get_summary(user, days=3650, **params)
+        for key in ["recent_leads", "recent_opportunities"]:
+            summary.pop(key), exact.pop(key)
+        self.assertEqual(summary, exact)
+        return summary
+
+    def test_rollups_match_exact_counts(self):
+        summary = self.assertMatchesExact(self.user)
+        self.assertEqual(summary["leads_by_status"], {"new": 2, "qualified": 1, "recycled": 1})
+        self.assertEqual(summary["opportunities_count"], 1)
+        self.assertEqual(summary["total_pipeline_value"], 100)
+        self.assertMatchesExact(self.user, lead_status="new")
+        self.assertMatchesExact(self.user, opportunity_stage="CLOSED WON")
+
+        summary = self.assertMatchesExact(self.member.user)
+        self.assertEqual(summary["leads_count"], 1)
+        self.assertEqual(summary["companies_count"], 0)
+
+    def test_unbuilt_org_is_counted_from_tables(self):
+        self.rebuild_delay.side_effect = None
+        summary = self.assertMatchesExact(self.user)
+        self.assertEqual(summary["leads_count"], 4)
+        self.assertFalse(DashboardRollup.objects.filter(org=self.org).exists())
+        # queued once, not on every load
+        self.rebuild_delay.assert_called_once_with(str(self.org.id))
+
+        tasks.rebuild_dashboard_rollups.apply((str(self.org.id),))
+        self.assertTrue(DashboardRollup.objects.filter(org=self.org).exists())
+        self.assertMatchesExact(self.user)
+        self.assertEqual(self.rebuild_delay.call_count, 1)
+
+    @mock.patch("common.tasks.refresh_dashboard_rollup.delay")
+    def test_rollups_follow_changes(self, delay):
+        delay.side_effect = lambda *args: tasks.refresh_dashboard_rollup.apply(args)
+        self.get_summary(self.user)
+        self.assertTrue(DashboardRollup.objects.filter(org=self.org).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            lead = Lead.objects.create(status="new", organization=self.org)
+        with self.captureOnCommitCallbacks(execute=True):
+            Lead.objects.filter(status="qualified").first().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            lead.assigned_to = self.member
+            lead.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            Opportunity.objects.get(stage="CLOSED WON").assigned_to.remove(self.member)
+
+        self.assertEqual(delay.call_count, 4)
+        self.assertIsNotNone(self.org.dashboard_rollup_state.built_at)
+        summary = self.assertMatchesExact(self.user)
+        self.assertEqual(summary["leads_by_status"], {"new": 3, "recycled": 1})
+        self.assertMatchesExact(self.member.user)
+        self.assertMatchesExact(self.member.user, opportunity_stage="CLOSED WON")
+
+
+class DashboardResponseCacheTestCase(OrgAPITestCase):
+    org_name = "Cached Org"
+    email = "cached@example.com"
+
+    def setUp(self):
+        super().setUp()
+        Lead.objects.create(status="new", organization=self.org)
+        self.run_tasks_eagerly(
+            tasks.refresh_dashboard_rollup, tasks.rebuild_dashboard_rollups
+        )
+
+    def create_lead(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Lead.objects.create(status="new", organization=self.org)
+
+    def get(self, url="/api/dashboard/summary/", **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_hit_and_invalidation(self):
+        self.assertEqual(self.get()["X-Cache"], "MISS")
+        response = self.get()
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertIn("Age", response)
+        self.assertEqual(self.get(lead_status="new")["X-Cache"], "MISS")
+
+        self.create_lead()
+        response = self.get()
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["leads_count"], 2)
+
+        url = "/api/companies/job-titles/"
+        self.assertEqual(self.get(url)["X-Cache"], "MISS")
+        self.assertEqual(self.get(url)["X-Cache"], "HIT")
+
+    def test_stale_served_while_recomputing(self):
+        self.get()
+        self.create_lead()
+        # another worker holds the lock of the new key
+        with mock.patch("common.response_cache.cache.add", return_value=False):
+            response = self.get()
+        self.assertEqual(response["X-Cache"], "STALE")
+        self.assertEqual(response.data["leads_count"], 1)
+        self.assertEqual(self.get().data["leads_count"], 2)
+
+    def test_stale_served_on_database_error(self):
+        self.get()
+        self.create_lead()
+        with mock.patch.object(
+            DashboardSummaryView, "get_summary", side_effect=DatabaseError("timeout")
+        ):
+            response = self.get()
+        self.assertEqual(response["X-Cache"], "STALE")
+        self.assertEqual(response.data["leads_count"], 1)
+
+
+class GlobalSearchTestCase(OrgAPITestCase):
+    org_name = "Global Org"
+    email = "admin@global.com"
+
+    def setUp(self):
+        super().setUp()
+        self.member = self.create_member("user@global.com", "+15550008001")
+        # dashboard rollups are refreshed on commit too, keep them off the broker
+        _, self.related_delay = self.run_tasks_eagerly(
+            tasks.refresh_dashboard_rollup, tasks.refresh_related_search_entries
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            company = CompanyProfile.objects.create(
+                name="Hooli", website="https://hooli.com", email="hi@hooli.com", org=self.org
+            )
+            contact = Contact.objects.create(
+                first_name="Gavin", last_name="Belson", primary_email="gavin@hooli.com",
+                company=company, org=self.org,
+            )
+            Lead.objects.create(
+                lead_title="Hooli XYZ", contact=contact, company=company, organization=self.org
+            )
+            self.opportunity = Opportunity.objects.create(
+                name="Nucleus", stage="PROPOSAL", org=self.org
+            )
+
+    def search(self, user, **params):
+        self.authenticate(user)
+        response = self.client.get("/api/search/", params)
+        self.assertEqual(response.status_code, 200)
+        return sorted((hit["type"], hit["title"]) for hit in response.data["results"])
+
+    def test_typed_hits_and_visibility(self):
+        self.assertEqual(
+            self.search(self.user, q="hooli"),
+            [("company", "Hooli"), ("contact", "Gavin Belson"), ("lead", "Hooli XYZ")],
+        )
+        self.assertEqual(
+            self.search(self.user, q="hooli", types="contact"),
+            [("contact", "Gavin Belson")],
+        )
+        # leads and opportunities are only visible to their owners
+        self.assertEqual(
+            self.search(self.member.user, q="hooli"),
+            [("company", "Hooli"), ("contact", "Gavin Belson")],
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.opportunity.assigned_to.add(self.member)
+        self.assertEqual(self.search(self.member.user, q="nucl"), [("opportunity", "Nucleus")])
+
+    def test_company_rename_is_refreshed_in_one_task(self):
+        company = CompanyProfile.objects.get(name="Hooli")
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(20):
+                Lead.objects.create(
+                    lead_title=f"Deal {i}", company=company, organization=self.org
+                )
+        self.related_delay.side_effect = None
+        with self.captureOnCommitCallbacks(execute=True):
+            company.name = "Pied Piper"
+            company.save()
+        self.related_delay.assert_called_once_with("company", str(company.pk))
+        self.assertEqual(self.search(self.user, q="pied piper", types="lead"), [])
+
+        tasks.refresh_related_search_entries.apply(("company", str(company.pk)))
+        self.assertEqual(
+            len(self.search(self.user, q="pied piper", types="lead,contact", limit=50)), 22
+        )
+
+    def test_entries_follow_changes_and_rebuild(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            contact = Contact.objects.get(first_name="Gavin")
+            contact.last_name = "Hoover"
+            contact.save()
+        self.assertEqual(self.search(self.user, q="hoover", types="lead"), [("lead", "Hooli XYZ")])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.opportunity.delete()
+        self.assertEqual(self.search(self.user, q="nucl"), [])
+
+        before = self.search(self.user, q="hoo")
+        global_search.rebuild(self.org.id)
+        self.assertEqual(self.search(self.user, q="hoo"), before)
+        response = self.client.get("/api/search/", {"q": "h"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ApiHomeViewTestCase(OrgAPITestCase):
+    org_name = "Home Org"
+    email = "home@example.com"
+
+    def setUp(self):
+        super().setUp()
+        self.member = self.create_member("home-rep@example.com", "+15550000001")
+        for i in range(4):
+            Lead.objects.create(
+                lead_title=f"Lead {i}",
+                organization=self.org,
+                assigned_to=self.member if i < 2 else None,
+            )
+        Lead.objects.create(lead_title="Closed", status="closed", organization=self.org)
+        for i in range(3):
+            opportunity = Opportunity.objects.create(
+                name=f"Deal {i}", stage="PROPOSAL", org=self.org
+            )
+            if i == 0:
+                opportunity.assigned_to.add(self.member)
+        Account.objects.create(
+            name="Open account", email="a@example.com", status="open", org=self.org
+        )
+        other = Org.objects.create(name="Other Org")
+        Lead.objects.create(lead_title="Elsewhere", organization=other)
+
+    def test_counts_and_recent_rows(self):
+        response = self.client.get("/api/dashboard/", {"limit": 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["leads_count"], 4)
+        self.assertEqual(response.data["opportunities_count"], 3)
+        self.assertEqual(response.data["accounts_count"], 1)
+        self.assertEqual(response.data["contacts_count"], 0)
+        self.assertEqual(
+            [lead["lead_title"] for lead in response.data["leads"]],
+            ["Lead 3", "Lead 2", "Lead 1"],
+        )
+        self.assertIsNone(response.data["accounts_next_cursor"])
+
+        response = self.client.get(
+            "/api/dashboard/",
+            {
+                "limit": 3,
+                "entity": "leads",
+                "leads_cursor": response.data["leads_next_cursor"],
+            },
+        )
+        self.assertEqual(
+            [lead["lead_title"] for lead in response.data["leads"]], ["Lead 0"]
+        )
+        self.assertNotIn("opportunities", response.data)
+        self.assertEqual(response.data["opportunities_count"], 3)
+
+        response = self.client.get("/api/dashboard/", {"entity": "cases"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_user_sees_own_rows(self):
+        self.authenticate(self.member.user)
+        response = self.client.get("/api/dashboard/")
+        self.assertEqual(response.data["leads_count"], 2)
+        self.assertEqual(response.data["opportunities_count"], 1)
+        self.assertEqual(len(response.data["leads"]), 2)
+        self.assertEqual(response.data["opportunities"][0]["name"], "Deal 0")
+
+
+class QueryBudgetTestCase(OrgAPITestCase):
+    org_name = "Budget Org"
+    email = "budget@example.com"
+
+    def setUp(self):
+        super().setUp()
+        self.run_tasks_eagerly(
+            tasks.refresh_dashboard_rollup,
+            tasks.rebuild_dashboard_rollups,
+            tasks.refresh_related_search_entries,
+        )
+
+    def test_endpoints_stay_within_budget(self):
+        report = query_budget.run([5, 10])
+        self.assertEqual(report["failures"], [])
+        self.assertEqual(
+            {result["endpoint"] for result in report["results"]},
+            set(query_budget.ENDPOINTS),
+        )
+        # a fixed regression must leave KNOWN_REGRESSIONS
+        self.assertEqual(
+            {failure["endpoint"] for failure in report["known_failures"]},
+            set(query_budget.KNOWN_REGRESSIONS),
+        )
+        json.dumps(report)
+
+    def test_growth_fails(self):
+        # the known regressions fail under another name
+        endpoints = {"tasks_page": query_budget.ENDPOINTS["tasks"]}
+        report = query_budget.run([10], endpoints)
+        reasons = [failure["reason"] for failure in report["failures"]]
+        self.assertTrue(any("grows with the page size" in r for r in reasons))
+
+        endpoints = {"account_detail": query_budget.ENDPOINTS["account"]}
+        report = query_budget.run([5, 10], endpoints)
+        reasons = [failure["reason"] for failure in report["failures"]]
+        self.assertTrue(any("grows with the org size" in r for r in reasons))
+        self.assertEqual(report["known_failures"], [])
+
+        endpoints = {"leads": dict(query_budget.ENDPOINTS["leads"], budget=1)}
+        report = query_budget.run([10], endpoints)
+        self.assertEqual(len(report["failures"]), 2)
+        self.assertIn("budget 1", report["failures"][0]["reason"])
+
+
+class ConditionalGetTestCase(OrgAPITestCase):
+    org_name = "Conditional Org"
+    email = "conditional@example.com"
+
+    def setUp(self):
+        super().setUp()
+        self.company = CompanyProfile.objects.create(name="Initech", org=self.org)
+        self.lead = Lead.objects.create(
+            lead_title="Printers", company=self.company, organization=self.org
+        )
+        self.path = f"/api/leads/{self.lead.id}/"
+
+    def test_if_none_match(self):
+        response = self.client.get(self.path)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(self.path)["ETag"], etag)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        # the lead and its state, nothing serialized
+        self.assertLessEqual(len(queries), 2)
+
+        Comment.objects.create(
+            comment="Call back", lead=self.lead, commented_by=self.profile
+        )
+        response = self.client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        etag = response["ETag"]
+        self.company.name = "Initech Corp"
+        self.company.save()
+        response = self.client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since(self):
+        path = f"/api/companies/{self.company.id}/"
+        last_modified = self.client.get(path)["Last-Modified"]
+        response = self.client.get(path, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_no_access_is_not_answered_304(self):
+        member = self.create_member("other@example.com", "+15550000001")
+        etag = self.client.get(self.path)["ETag"]
+        self.authenticate(member.user)
+        response = self.client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 403)
+
+
+class BulkWriteTestCase(OrgAPITestCase):
+    org_name = "Bulk Org"
+    email = "bulk@example.com"
+
+    def setUp(self):
+        super().setUp()
+        self.company = CompanyProfile.objects.create(name="Umbrella", org=self.org)
+        self.contact = Contact.objects.create(
+            first_name="Ada", primary_email="ada@example.com", org=self.org
+        )
+
+    def lead(self, title, **fields):
+        return {
+            "lead_title": title,
+            "description": "Imported",
+            "status": "assigned",
+            "probability": 10,
+            "contact": str(self.contact.id),
+            "company": str(self.company.id),
+            "assigned_to": str(self.profile.id),
+            **fields,
+        }
+
+    def create_leads(self, count):
+        items = [self.lead(f"Lead {i}") for i in range(count)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                "/api/leads/bulk/", {"items": items}, format="json"
+            )
+        self.assertEqual(response.status_code, 201)
+        return len(queries), response.data
+
+    def test_create_validates_in_bulk(self):
+        self.create_leads(1)  # warm the profile cache
+        small, _ = self.create_leads(2)
+        large, data = self.create_leads(20)
+        self.assertEqual(small, large)
+        self.assertEqual(data["processed"], 20)
+
+        lead = Lead.objects.get(id=data["results"][0]["id"])
+        self.assertEqual(lead.created_by, self.user)
+        self.assertEqual(lead.organization, self.org)
+        self.assertEqual(lead.company, self.company)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            _, data = self.create_leads(1)
+        entry = SearchEntry.objects.get(object_id=data["results"][0]["id"])
+        self.assertEqual(entry.title, "Lead 0")
+        self.assertEqual(list(entry.owners.all()), [self.profile])
+
+    def test_invalid_items_are_reported(self):
+        other = Org.objects.create(name="Other Org")
+        foreign = CompanyProfile.objects.create(name="Foreign", org=other)
+        items = [
+            self.lead("Good"),
+            self.lead("Bad company", company=str(foreign.id)),
+            self.lead("Bad probability", probability=500),
+        ]
+        response = self.client.post(
+            "/api/leads/bulk/", {"items": items}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data["error"])
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["created", "error", "error"],
+        )
+        self.assertIn("company", response.data["results"][1]["errors"])
+        self.assertIn("probability", response.data["results"][2]["errors"])
+        titles = Lead.objects.filter(organization=self.org).values_list(
+            "lead_title", flat=True
+        )
+        self.assertEqual(list(titles), ["Good"])
+
+    def test_update_and_delete(self):
+        _, data = self.create_leads(3)
+        ids = [result["id"] for result in data["results"]]
+        response = self.client.patch(
+            "/api/leads/bulk/",
+            {"items": [{"id": ids[0], "status": "in process"}, {"id": "nope"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["processed"], 1)
+        lead = Lead.objects.get(id=ids[0])
+        self.assertEqual(lead.status, "in process")
+        self.assertEqual(lead.lead_title, "Lead 0")
+        self.assertEqual(lead.updated_by, self.user)
+
+        response = self.client.delete(
+            "/api/leads/bulk/", {"ids": ids[1:]}, format="json"
+        )
+        self.assertEqual(response.data["processed"], 2)
+        self.assertEqual(list(Lead.objects.values_list("id", flat=True)), [lead.id])
+
+    def test_contact_duplicates(self):
+        items = [
+            {"first_name": "Bob", "primary_email": "bob@example.com", "last_name": "Smith"},
+            {"first_name": "Carol", "primary_email": "ADA@example.com", "last_name": "Smith"},
+            {"first_name": "Dan", "primary_email": "dan@example.com", "last_name": "Smith"},
+            {"first_name": "dan", "primary_email": "dan2@example.com", "last_name": "Smith"},
+        ]
+        response = self.client.post(
+            "/api/contacts/bulk/", {"items": items}, format="json"
+        )
+        results = response.data["results"]
+        self.assertEqual(results[0]["status"], "created")
+        self.assertIn("already exists", results[1]["errors"]["primary_email"][0])
+        self.assertIn("Duplicate", results[2]["errors"]["first_name"][0])
+        self.assertEqual(Contact.objects.filter(org=self.org).count(), 2)
+
+    def test_too_many_items(self):
+        with self.settings(BULK_WRITE_MAX_ITEMS=2):
+            response = self.client.post(
+                "/api/companies/bulk/",
+                {"items": [{"name": f"Company {i}"} for i in range(3)]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 400)
+
+
+class AuditedQuerySetTestCase(OrgAPITestCase):
+    org_name = "Audit Org"
+    email = "audit@example.com"
+
+    def setUp(self):
+        super().setUp()
+        self.other = self.create_member("other@example.com", "+14155550199").user
+
+    def contact(self, name):
+        return Contact(
+            first_name=name, primary_email=f"{name.lower()}@example.com", org=self.org
+        )
+
+    def test_bulk_create(self):
+        contacts = Contact.audited.as_user(self.other).bulk_create(
+            [self.contact("Ada"), self.contact("Bob")]
+        )
+        for contact in Contact.objects.filter(pk__in=[c.pk for c in contacts]):
+            self.assertEqual(contact.created_by, self.other)
+            self.assertEqual(contact.updated_by, self.other)
+            self.assertIsNotNone(contact.created_at)
+
+    def test_user_of_the_request(self):
+        contact = Contact.objects.create(
+            first_name="Ada", primary_email="ada@example.com", org=self.org
+        )
+        with crum.impersonate(self.user):
+            Contact.audited.filter(pk=contact.pk).update(last_name="Lovelace")
+            Contact.audited.bulk_create([self.contact("Bob")])
+        contact.refresh_from_db()
+        self.assertEqual(contact.last_name, "Lovelace")
+        self.assertEqual(contact.updated_by, self.user)
+        self.assertEqual(Contact.objects.get(first_name="Bob").created_by, self.user)
+
+    def test_bulk_update_and_update(self):
+        contact = Contact.objects.create(
+            first_name="Ada", primary_email="ada@example.com", org=self.org
+        )
+        updated_at = contact.updated_at
+        contact.last_name = "Lovelace"
+        Contact.audited.as_user(self.other.id).bulk_update([contact], ["last_name"])
+        contact.refresh_from_db()
+        self.assertEqual(contact.last_name, "Lovelace")
+        self.assertEqual(contact.updated_by, self.other)
+        self.assertGreater(contact.updated_at, updated_at)
+
+        # out of requests, without a user: updated_by is left alone
+        updated_at = contact.updated_at
+        Contact.audited.filter(pk=contact.pk).update(last_name="King")
+        contact.refresh_from_db()
+        self.assertEqual(contact.updated_by, self.other)
+        self.assertGreater(contact.updated_at, updated_at)
+
+
+class CsvExportTestCase(OrgAPITestCase):
+    org_name = "Export Org"
+    email = "export@example.com"
+
+    def setUp(self):
+        super().setUp()
+        self.user.first_name, self.user.last_name = "Ann", "Admin"
+        self.user.save()
+        self.company = CompanyProfile.objects.create(
+            name="Globex", industry="ENERGY", org=self.org
+        )
+        self.contact = Contact.objects.create(
+            first_name="Hank",
+            last_name="Scorpio",
+            primary_email="hank@globex.com",
+            org=self.org,
+        )
+        self.lead = Lead.objects.create(
+            lead_title="=cmd()",
+            company=self.company,
+            contact=self.contact,
+            organization=self.org,
+        )
+
+    def export(self, url, **params):
+        response = self.client.get(url, {"export": "true", **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b"".join(response.streaming_content).decode()
+        return list(csv.reader(io.StringIO(content)))
+
+    def add_opportunity(self, name):
+        opportunity = Opportunity.objects.create(
+            name=name, stage="PROPOSAL", org=self.org, lead=self.lead
+        )
+        opportunity.contacts.add(self.contact)
+        opportunity.assigned_to.add(self.profile)
+        return opportunity
+
+    def test_export_queries_dont_grow_with_the_rows(self):
+        self.add_opportunity("Deal 1")
+        # caches the profile of the user
+        self.export("/api/opportunities/")
+        with CaptureQueriesContext(connection) as few:
+            rows = self.export("/api/opportunities/")
+        self.assertEqual(rows[1][rows[0].index("Company")], "Globex")
+        self.assertEqual(rows[1][rows[0].index("Contacts")], "Hank Scorpio")
+        self.assertEqual(rows[1][rows[0].index("Assigned To")], "Ann Admin")
+
+        for i in range(2, 6):
+            self.add_opportunity(f"Deal {i}")
+        with CaptureQueriesContext(connection) as many:
+            rows = self.export("/api/opportunities/")
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(len(many), len(few))
+
+    def test_export_cases(self):
+        case = Case.objects.create(
+            name="Lost deal",
+            priority="High",
+            closed_on="2026-01-31",
+            org=self.org,
+            opportunity=self.add_opportunity("Deal"),
+        )
+        case.assigned_to.add(self.profile)
+        rows = self.export("/api/cases/")
+        self.assertEqual(
+            rows,
+            [
+                [
+                    "Case Name",
+                    "Industry",
+                    "Contact",
+                    "Result",
+                    "Close Date",
+                    "Assigned To",
+                ],
+                ["Lost deal", "ENERGY", "Hank Scorpio", "", "2026-01-31", "Ann Admin"],
+            ],
+        )
+
+    def test_export_applies_the_filters_and_escapes_formulas(self):
+        Lead.objects.create(lead_title="Other", organization=self.org)
+        rows = self.export("/api/leads/", name="cmd")
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][0], "'=cmd()")
+        self.assertEqual(rows[1][rows[0].index("Email")], "hank@globex.com")
+
+    def test_list_endpoints_export(self):
+        Account.objects.create(
+            name="Acme", email="acme@example.com", status="open", org=self.org
+        )
+        for url, header, value in (
+            ("/api/contacts/", "Email", "hank@globex.com"),
+            ("/api/companies/", "Industry", "ENERGY"),
+            ("/api/accounts/", "Name", "Acme"),
+        ):
+            rows = self.export(url)
+            self.assertEqual(len(rows), 2, url)
+            self.assertEqual(rows[1][rows[0].index(header)], value)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), EXPORT_CHUNK_SIZE=2)
+class ExportJobTestCase(OrgAPITestCase):
+    org_name = "Export Job Org"
+    email = "exports@example.com"
+
+    def setUp(self):
+        super().setUp()
+        self.run_tasks_eagerly(tasks.run_export_job)
+        self.contact = Contact.objects.create(
+            first_name="Hank",
+            last_name="Scorpio",
+            primary_email="hank@globex.com",
+            org=self.org,
+        )
+        for title in ("Renewal", "Upsell", "Expansion"):
+            Lead.objects.create(
+                lead_title=title, contact=self.contact, organization=self.org
+            )
+
+    def queue(self, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/exports/", data, format="json")
+        self.assertEqual(response.status_code, 202)
+        return ExportJob.objects.get(pk=response.data["job"]["id"])
+
+    def read(self, job):
+        with job.file.open("rb") as file:
+            return gzip.decompress(file.read()).decode()
+
+    def test_csv_export(self):
+        job = self.queue(entity="leads", params={"name": "e"}, notify=True)
+        self.assertEqual(job.status, "completed")
+        self.assertEqual(job.row_count, 3)
+        self.assertEqual(job.file_size, job.file.size)
+        self.assertIsNotNone(job.finished_at)
+        rows = list(csv.reader(io.StringIO(self.read(job))))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(
+            sorted(row[0] for row in rows[1:]), ["Expansion", "Renewal", "Upsell"]
+        )
+
+        response = self.client.get(f"/api/exports/{job.id}/")
+        self.assertEqual(response.data["job"]["status"], "completed")
+        self.assertIn(job.file.name, response.data["job"]["download_url"])
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(response.data["job"]["download_url"], mail.outbox[0].body)
+
+    def test_ndjson_export_applies_the_filters(self):
+        job = self.queue(entity="leads", format="ndjson", params={"name": "up"})
+        records = [json.loads(line) for line in self.read(job).splitlines()]
+        self.assertEqual(job.row_count, 1)
+        self.assertEqual(records[0]["Title"], "Upsell")
+        self.assertEqual(records[0]["Email"], "hank@globex.com")
+
+    def test_invoice_export(self):
+        account = Account.objects.create(
+            name="Acme", email="acme@example.com", status="open", org=self.org
+        )
+        invoice = Invoice.objects.create(
+            invoice_title="Q1",
+            invoice_number="INV-001",
+            name="Acme",
+            email="billing@acme.com",
+            org=self.org,
+        )
+        invoice.accounts.add(account)
+        job = self.queue(entity="invoices", format="ndjson")
+        [record] = [json.loads(line) for line in self.read(job).splitlines()]
+        self.assertEqual(record["Number"], "INV-001")
+        self.assertEqual(record["Accounts"], "Acme")
+
+    def test_invalid_entity(self):
+        response = self.client.post(
+            "/api/exports/", {"entity": "users"}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ExportJob.objects.exists())
+
+    def test_jobs_of_other_users(self):
+        job = self.queue(entity="contacts")
+        member = self.create_member("member@example.com", "+14155550111")
+        self.authenticate(member.user)
+        response = self.client.get(f"/api/exports/{job.id}/")
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get("/api/exports/")
+        self.assertEqual(response.data["jobs"], [])
+
+
+class ChangeLogTestCase(OrgAPITestCase):
+    org_name = "History Org"
+    email = "history@example.com"
+
+    def setUp(self):
+        super().setUp()
+        # dashboard rollups and search entries are refreshed on commit too
+        self.run_tasks_eagerly(
+            tasks.refresh_dashboard_rollup, tasks.refresh_related_search_entries
+        )
+        self.company = CompanyProfile.objects.create(name="Globex", org=self.org)
+
+    def test_changes_are_written_once_committed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with crum.impersonate(self.user):
+                contact = Contact.objects.create(
+                    first_name="Hank",
+                    last_name="Smith",
+                    primary_email="hank@globex.com",
+                    org=self.org,
+                )
+                contact.last_name = "Scorpio"
+                contact.company = self.company
+                contact.save()
+                # nothing changed
+                contact.save()
+            self.assertFalse(ChangeLogEntry.objects.exists())
+        entries = list(ChangeLogEntry.objects.order_by("id"))
+        self.assertEqual([entry.action for entry in entries], ["create", "update"])
+        self.assertEqual(
+            entries[1].changes,
+            {
+                "last_name": ["Smith", "Scorpio"],
+                "company": [None, str(self.company.id)],
+            },
+        )
+        self.assertEqual(entries[1].user, self.user)
+        self.assertEqual(entries[1].org, self.org)
+        self.assertEqual(entries[1].entity, "contact")
+
+    def test_one_insert_per_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            leads = [
+                Lead.objects.create(lead_title=f"Lead {i}", organization=self.org)
+                for i in range(5)
+            ]
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                for lead in Lead.objects.filter(pk__in=[lead.pk for lead in leads]):
+                    lead.status = "closed"
+                    lead.save()
+        inserts = [
+            query
+            for query in queries
+            if query["sql"].startswith('INSERT INTO "change_log_entry"')
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(ChangeLogEntry.objects.filter(action="update").count(), 5)
+
+    def test_rolled_back_changes_are_not_logged(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            lead = Lead.objects.create(lead_title="Renewal", organization=self.org)
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    lead.lead_title = "Upsell"
+                    lead.save()
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+            lead.description = "Kept"
+            lead.save()
+        [entry] = ChangeLogEntry.objects.filter(action="update")
+        self.assertEqual(list(entry.changes), ["description"])
+
+    def test_history_endpoint(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            lead = Lead.objects.create(lead_title="Renewal", organization=self.org)
+            lead.status = "assigned"
+            lead.save()
+        response = self.client.get(f"/api/history/lead/{lead.id}/", {"limit": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 2)
+        [entry] = response.data["history"]
+        self.assertEqual(entry["action"], "update")
+        self.assertEqual(entry["changes"]["status"][1], "assigned")
+
+        self.assertEqual(
+            self.client.get(f"/api/history/users/{lead.id}/").status_code, 404
+        )
+        member = self.create_member("member@example.com", "+14155550133")
+        self.authenticate(member.user)
+        response = self.client.get(f"/api/history/lead/{lead.id}/")
+        self.assertEqual(response.status_code, 403)
+        lead.assigned_to = member
+        lead.save()
+        response = self.client.get(f"/api/history/lead/{lead.id}/")
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,47 @@
+"""
+Trigram (pg_trgm) lookups of the contact and company list endpoints.
+
+The ``name``/``email``/``phone``/``company_name`` filters are ``icontains``
+lookups, which Django runs as ``UPPER(column::text) LIKE UPPER('%term%')``.
+The contacts and companies migrations create ``gin (UPPER(column::text)
+gin_trgm_ops)`` indexes on PostgreSQL, so those substring lookups use an
+index instead of a sequential scan.
+
+``similarity_search`` is the ranked mode behind ``?search=``: rows where any
+of the fields contains the term or has a word similar to it (``%>``, typo
+tolerant, same indexes) ordered by the best ``word_similarity``. Other
+databases only get the ``icontains`` part, unranked.
+"""
+from functools import reduce
+from operator import or_
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Q
+from django.db.models.functions import Greatest, Upper
+
+
+def is_supported(queryset):
+    return connections[queryset.db].vendor == "postgresql"
+
+
+def similarity_search(queryset, fields, term):
+    """
+    Filter ``queryset`` on ``term`` over ``fields``. Ranked rows carry a
+    ``search_rank`` annotation and are ordered by it (best first).
+    """
+    contains = reduce(or_, [Q(**{f"{field}__icontains": term}) for field in fields])
+    if not is_supported(queryset):
+        return queryset.filter(contains)
+
+    aliases = {f"_upper_{index}": Upper(field) for index, field in enumerate(fields)}
+    similar = reduce(
+        or_, [Q(**{f"{alias}__trigram_word_similar": term}) for alias in aliases]
+    )
+    ranks = [TrigramWordSimilarity(term, expression) for expression in aliases.values()]
+    return (
+        queryset.alias(**aliases)
+        .filter(contains | similar)
+        .annotate(search_rank=Greatest(*ranks) if len(ranks) > 1 else ranks[0])
+        .order_by("-search_rank", "-created_at")
+    )
@@ -44,6 +44,11 @@ urlpatterns = [
         views.CurrentUserProfileView.as_view(),
         name="current_user_profile",
     ),
+    path("profile-cache/stats/", views.ProfileCacheStatsView.as_view()),
+    path("search/", views.GlobalSearchView.as_view()),
+    path("exports/", views.ExportJobListView.as_view()),
+    path("exports/<str:pk>/", views.ExportJobDetailView.as_view()),
+    path("history/<str:entity>/<str:pk>/", views.ChangeLogView.as_view()),
     path("users/get-teams-and-users/", views.GetTeamsAndUsersView.as_view()),
     path("users/", views.UsersListView.as_view()),
     path("user/<str:pk>/", views.UserDetailView.as_view()),
@@ -1,6 +1,7 @@
 import json
 from operator import is_
 import secrets
+import uuid
 from multiprocessing import context
 from django_ratelimit.decorators import ratelimit
 from django_ratelimit.exceptions import Ratelimited
@@ -14,7 +15,8 @@ from django.conf import settings
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.hashers import make_password
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import F, Func, IntegerField, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.http.response import JsonResponse, Http404
 from django.shortcuts import get_object_or_404, render
 from django.utils import timezone
@@ -36,13 +38,28 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from accounts.models import Account, Contact, Tags
-from accounts.serializer import AccountSerializer
+from accounts.serializer import AccountListSerializer, AccountSerializer
 from cases.models import Case
 from cases.serializer import CaseSerializer
 
 ##from common.custom_auth import JSONWebTokenAuthentication
-from common import serializer, swagger_params1
-from common.models import APISettings, Document, Org, Profile, User
+from common import (
+    change_log,
+    global_search,
+    profile_cache,
+    serializer,
+    swagger_params1,
+)
+from common.models import (
+    APISettings,
+    ChangeLogEntry,
+    Document,
+    ExportJob,
+    Org,
+    Profile,
+    User,
+)
+from common.pagination import KeysetPagination
 from common.serializer import *
 
 # from common.serializer import (
@@ -52,6 +69,7 @@ from common.serializer import *
 # )
 from common.tasks import (
     resend_activation_link_to_user,
+    run_export_job,
     send_email_to_new_user,
     send_email_to_reset_password,
     send_email_user_delete,
@@ -61,11 +79,15 @@ from common.token_generator import account_activation_token
 
 # from rest_framework_jwt.serializers import jwt_encode_handler
 from common.utils import COUNTRIES, ROLES, jwt_payload_handler
-from contacts.serializer import ContactSerializer
+from contacts.serializer import ContactListSerializer, ContactSerializer
 from leads.models import Lead
-from leads.serializer import LeadSerializer
+from leads.serializer import LeadDashboardSerializer, LeadSerializer
 from opportunity.models import Opportunity
-from opportunity.serializer import OpportunitySerializer
+from opportunity.serializer import (
+    OpportunityDashboardSerializer,
+    OpportunityListSerializer,
+    OpportunitySerializer,
+)
 from teams.models import Teams
 from teams.serializer import TeamsSerializer
 
@@ -112,11 +134,15 @@ class GetTeamsAndUsersView(APIView):
     @extend_schema(tags=["users"], parameters=swagger_params1.organization_params)
     def get(self, request, *args, **kwargs):
         data = {}
-        teams = Teams.objects.filter(org=request.profile.org).order_by("-id")
+        teams = TeamsSerializer.prefetch_plan(
+            Teams.objects.filter(org=request.profile.org).order_by("-id")
+        )
         teams_data = TeamsSerializer(teams, many=True).data
-        profiles = Profile.objects.filter(
-            is_active=True, org=request.profile.org
-        ).order_by("user__email")
+        profiles = (
+            Profile.objects.filter(is_active=True, org=request.profile.org)
+            .select_related("user", "address")
+            .order_by("user__email")
+        )
         profiles_data = ProfileSerializer(profiles, many=True).data
         data["teams"] = teams_data
         data["profiles"] = profiles_data
@@ -184,7 +210,46 @@ class UsersListView(APIView, LimitOffsetPagination):
                         status=status.HTTP_201_CREATED,
                     )
 
-    @extend_schema(parameters=swagger_params1.user_list_params)
+    def get_offset_buckets(self, queryset_active_users, queryset_inactive_users):
+        context = {}
+        results_active_users = self.paginate_queryset(
+            queryset_active_users.distinct(), self.request, view=self
+        )
+        active_users = ProfileSerializer(results_active_users, many=True).data
+        if results_active_users:
+            offset = queryset_active_users.filter(
+                id__gte=results_active_users[-1].id
+            ).count()
+            if offset == queryset_active_users.count():
+                offset = None
+        else:
+            offset = 0
+        context["active_users"] = {
+            "active_users_count": self.count,
+            "active_users": active_users,
+            "offset": offset,
+        }
+
+        results_inactive_users = self.paginate_queryset(
+            queryset_inactive_users.distinct(), self.request, view=self
+        )
+        inactive_users = ProfileSerializer(results_inactive_users, many=True).data
+        if results_inactive_users:
+            offset = queryset_inactive_users.filter(
+                id__gte=results_inactive_users[-1].id
+            ).count()
+            if offset == queryset_inactive_users.count():
+                offset = None
+        else:
+            offset = 0
+        context["inactive_users"] = {
+            "inactive_users_count": self.count,
+            "inactive_users": inactive_users,
+            "offset": offset,
+        }
+        return context
+
+    @extend_schema(parameters=swagger_params1.user_list_params + swagger_params1.cursor_pagination_params)
     def get(self, request, format=None):
         org_id = request.headers.get("org")
         if not org_id:
@@ -230,42 +295,31 @@ class UsersListView(APIView, LimitOffsetPagination):
                         pass
         context = {}
         queryset_active_users = queryset.filter(is_active=True)
-        results_active_users = self.paginate_queryset(
-            queryset_active_users.distinct(), self.request, view=self
-        )
-        active_users = ProfileSerializer(results_active_users, many=True).data
-        if results_active_users:
-            offset = queryset_active_users.filter(
-                id__gte=results_active_users[-1].id
-            ).count()
-            if offset == queryset_active_users.count():
-                offset = None
-        else:
-            offset = 0
-        context["active_users"] = {
-            "active_users_count": self.count,
-            "active_users": active_users,
-            "offset": offset,
-        }
-
         queryset_inactive_users = queryset.filter(is_active=False)
-        results_inactive_users = self.paginate_queryset(
-            queryset_inactive_users.distinct(), self.request, view=self
-        )
-        inactive_users = ProfileSerializer(results_inactive_users, many=True).data
-        if results_inactive_users:
-            offset = queryset_inactive_users.filter(
-                id__gte=results_inactive_users[-1].id
-            ).count()
-            if offset == queryset_inactive_users.count():
-                offset = None
+        if KeysetPagination.is_requested(self.request):
+            paginator = KeysetPagination(self.request)
+            active_page = paginator.paginate(
+                queryset_active_users.distinct(), bucket="active"
+            )
+            inactive_page = paginator.paginate(
+                queryset_inactive_users.distinct(), bucket="inactive"
+            )
+            context["active_users"] = {
+                "active_users_count": active_page.count,
+                "active_users": ProfileSerializer(active_page.results, many=True).data,
+                **active_page.links(),
+            }
+            context["inactive_users"] = {
+                "inactive_users_count": inactive_page.count,
+                "inactive_users": ProfileSerializer(
+                    inactive_page.results, many=True
+                ).data,
+                **inactive_page.links(),
+            }
         else:
-            offset = 0
-        context["inactive_users"] = {
-            "inactive_users_count": self.count,
-            "inactive_users": inactive_users,
-            "offset": offset,
-        }
+            context.update(
+                self.get_offset_buckets(queryset_active_users, queryset_inactive_users)
+            )
 
         context["admin_email"] = settings.ADMIN_EMAIL
         context["roles"] = ROLES
@@ -302,8 +356,10 @@ class UserDetailView(APIView):
         ).values("id", "user__email")
         context = {}
         context["profile_obj"] = ProfileSerializer(profile_obj).data
-        opportunity_list = Opportunity.objects.filter(assigned_to=profile_obj)
-        context["opportunity_list"] = OpportunitySerializer(
+        opportunity_list = OpportunityListSerializer.prefetch_plan(
+            Opportunity.objects.filter(assigned_to=profile_obj)
+        )
+        context["opportunity_list"] = OpportunityListSerializer(
             opportunity_list, many=True
         ).data
         contacts = Contact.objects.filter(assigned_to=profile_obj)
@@ -435,48 +491,109 @@ class UserDetailView(APIView):
         )
 
 
-# check_header not working
+def _count(queryset):
+    """Subquery counting the distinct rows of ``queryset``"""
+    rows = queryset.model._default_manager.filter(
+        pk__in=queryset.order_by().values("pk")
+    )
+    return Coalesce(
+        Subquery(
+            rows.order_by()
+            .annotate(count=Func(F("pk"), function="COUNT"))
+            .values("count"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
 class ApiHomeView(APIView):
-    permission_classes = (IsAuthenticated,)
+    """
+    Home feed: the number of open accounts, contacts, open leads and
+    opportunities the profile can see (one query) and the most recent rows
+    of each, ``?limit=`` of them (10 by default). Every list comes with a
+    ``<entity>_next_cursor``: send it back as ``?<entity>_cursor=``, with
+    ``?entity=<entity>`` to only get that list, to load more.
+    """
 
-    @extend_schema(parameters=swagger_params1.organization_params)
-    def get(self, request, format=None):
-        accounts = Account.objects.filter(status="open", org=request.profile.org)
-        contacts = Contact.objects.filter(org=request.profile.org)
-        leads = Lead.objects.filter(org=request.profile.org).exclude(
-            Q(status="converted") | Q(status="closed")
-        )
-        opportunities = Opportunity.objects.filter(org=request.profile.org)
+    permission_classes = (IsAuthenticated,)
 
+    # entity -> serializer of the feed rows and the related rows it reads
+    feed = {
+        "accounts": {
+            "serializer": AccountListSerializer,
+            "select_related": ("company",),
+        },
+        "contacts": {
+            "serializer": ContactListSerializer,
+            "select_related": ("company",),
+        },
+        "leads": {
+            "serializer": LeadDashboardSerializer,
+            "select_related": ("contact", "company"),
+        },
+        "opportunities": {
+            "serializer": OpportunityDashboardSerializer,
+            "select_related": ("lead__company",),
+            "prefetch_related": (
+                Prefetch(
+                    "contacts",
+                    queryset=Contact.objects.select_related("company").order_by("pk"),
+                ),
+            ),
+        },
+    }
+
+    def get_querysets(self):
+        profile = self.request.profile
+        querysets = {
+            "accounts": Account.objects.filter(status="open", org=profile.org),
+            "contacts": Contact.objects.filter(org=profile.org),
+            "leads": Lead.objects.filter(organization=profile.org).exclude(
+                status__in=["converted", "closed"]
+            ),
+            "opportunities": Opportunity.objects.filter(org=profile.org),
+        }
         if (
-            self.request.profile.role not in ["ADMIN", "MANAGER"]
+            profile.role not in ["ADMIN", "MANAGER"]
             and not self.request.user.is_superuser
         ):
-            accounts = accounts.filter(
-                Q(assigned_to=self.request.profile)
-                | Q(created_by=self.request.profile.user)
-            )
-            contacts = contacts.filter(
-                Q(assigned_to__id__in=self.request.profile)
-                | Q(created_by=self.request.profile.user)
+            visible = Q(assigned_to=profile) | Q(created_by=profile.user)
+            querysets = {
+                name: queryset.filter(visible) for name, queryset in querysets.items()
+            }
+        return querysets
+
+    @extend_schema(parameters=swagger_params1.home_feed_params)
+    def get(self, request, format=None):
+        querysets = self.get_querysets()
+        entity = request.query_params.get("entity")
+        if entity and entity not in self.feed:
+            return Response(
+                {
+                    "error": True,
+                    "errors": f"entity must be one of {', '.join(self.feed)}",
+                },
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            leads = leads.filter(
-                Q(assigned_to__id__in=self.request.profile)
-                | Q(created_by=self.request.profile.user)
-            ).exclude(status="closed")
-            opportunities = opportunities.filter(
-                Q(assigned_to__id__in=self.request.profile)
-                | Q(created_by=self.request.profile.user)
+
+        counts = {f"{name}_count": _count(qs) for name, qs in querysets.items()}
+        context = Org.objects.filter(pk=request.profile.org_id).values(**counts).get()
+
+        paginator = KeysetPagination(request)
+        for name, feed in self.feed.items():
+            if entity and name != entity:
+                continue
+            queryset = (
+                querysets[name]
+                .select_related(*feed["select_related"])
+                .prefetch_related(*feed.get("prefetch_related", ()))
+                .distinct()
             )
-        context = {}
-        context["accounts_count"] = accounts.count()
-        context["contacts_count"] = contacts.count()
-        context["leads_count"] = leads.count()
-        context["opportunities_count"] = opportunities.count()
-        context["accounts"] = AccountSerializer(accounts, many=True).data
-        context["contacts"] = ContactSerializer(contacts, many=True).data
-        context["leads"] = LeadSerializer(leads, many=True).data
-        context["opportunities"] = OpportunitySerializer(opportunities, many=True).data
+            page = paginator.paginate(queryset, bucket=name)
+            context[name] = feed["serializer"](page.results, many=True).data
+            context[f"{name}_next_cursor"] = page.next_cursor
+            context[f"{name}_previous_cursor"] = page.previous_cursor
         return Response(context, status=status.HTTP_200_OK)
 
 
@@ -1407,3 +1524,218 @@ class ResetPasswordConfirmView(APIView):
                 content_type="application/json",
                 status=status.HTTP_429_TOO_MANY_REQUESTS,
             )
+
+
+class ProfileCacheStatsView(APIView):
+    """Hit/miss counters of the profile cache used by GetProfileAndOrg (this worker only)"""
+
+    permission_classes = (IsAuthenticated,)
+
+    @extend_schema(tags=["profile"], parameters=swagger_params1.organization_params)
+    def get(self, request, format=None):
+        if not request.user.is_superuser:
+            return Response(
+                {"error": True, "errors": "Permission Denied"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        return Response(
+            {"error": False, "stats": profile_cache.get_stats()},
+            status=status.HTTP_200_OK,
+        )
+
+
+class GlobalSearchView(APIView):
+    """Leads, contacts, companies, opportunities and cases matching ``q``, see common.global_search"""
+
+    permission_classes = (IsAuthenticated,)
+    max_limit = 50
+
+    @extend_schema(tags=["search"], parameters=swagger_params1.global_search_params)
+    def get(self, request, format=None):
+        term = request.query_params.get("q", "").strip()
+        if len(term) < 2:
+            return Response(
+                {"error": True, "errors": "q must be at least 2 characters long"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        entities = [
+            entity.strip()
+            for entity in request.query_params.get("types", "").split(",")
+            if entity.strip()
+        ]
+        unknown = set(entities) - set(global_search.SOURCES)
+        if unknown:
+            return Response(
+                {"error": True, "errors": f"Unknown types: {', '.join(sorted(unknown))}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            limit = min(max(int(request.query_params.get("limit", 20)), 1), self.max_limit)
+        except ValueError:
+            limit = 20
+
+        is_admin = (
+            request.profile.role in ["ADMIN", "MANAGER"] or request.user.is_superuser
+        )
+        entries = global_search.search(
+            request.profile, term, entities=entities, limit=limit, is_admin=is_admin
+        )
+        return Response(
+            {
+                "error": False,
+                "results": [
+                    {
+                        "type": entry.entity,
+                        "id": entry.object_id,
+                        "title": entry.title,
+                        "secondary": entry.secondary,
+                        "rank": getattr(entry, "search_rank", None),
+                    }
+                    for entry in entries
+                ],
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class ExportJobListView(APIView, LimitOffsetPagination):
+    """Exports to files queued in the background, see common.export_jobs"""
+
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        queryset = ExportJob.objects.filter(org=self.request.profile.org)
+        if (
+            self.request.profile.role not in ["ADMIN", "MANAGER"]
+            and not self.request.user.is_superuser
+        ):
+            queryset = queryset.filter(profile=self.request.profile)
+        return queryset.order_by("-created_at")
+
+    @extend_schema(
+        tags=["exports"],
+        parameters=swagger_params1.organization_params,
+        responses={200: ExportJobSerializer(many=True)},
+    )
+    def get(self, request, format=None):
+        jobs = self.paginate_queryset(self.get_queryset(), request, view=self)
+        return Response(
+            {
+                "error": False,
+                "count": self.count,
+                "offset": self.offset,
+                "jobs": ExportJobSerializer(jobs, many=True).data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    @extend_schema(
+        tags=["exports"],
+        parameters=swagger_params1.organization_params,
+        request=ExportJobCreateSerializer,
+        responses={202: ExportJobSerializer},
+    )
+    def post(self, request, format=None):
+        serializer = ExportJobCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {"error": True, "errors": serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        job = ExportJob.objects.create(
+            org=request.profile.org, profile=request.profile, **serializer.validated_data
+        )
+        transaction.on_commit(lambda: run_export_job.delay(str(job.id)))
+        return Response(
+            {
+                "error": False,
+                "message": "Export queued",
+                "job": ExportJobSerializer(job).data,
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class ExportJobDetailView(APIView):
+    """Status and download link of an export queued by ExportJobListView"""
+
+    permission_classes = (IsAuthenticated,)
+
+    @extend_schema(
+        tags=["exports"],
+        parameters=swagger_params1.organization_params,
+        responses={200: ExportJobSerializer},
+    )
+    def get(self, request, pk, format=None):
+        job = get_object_or_404(ExportJob, pk=pk, org=request.profile.org)
+        if (
+            request.profile.role not in ["ADMIN", "MANAGER"]
+            and not request.user.is_superuser
+            and job.profile_id != request.profile.id
+        ):
+            return Response(
+                {
+                    "error": True,
+                    "errors": "You do not have Permission to perform this action",
+                },
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        return Response(
+            {"error": False, "job": ExportJobSerializer(job).data},
+            status=status.HTTP_200_OK,
+        )
+
+
+class ChangeLogView(APIView, LimitOffsetPagination):
+    """Changes of a lead, opportunity, account, contact, case or invoice, see common.change_log"""
+
+    permission_classes = (IsAuthenticated,)
+
+    @extend_schema(tags=["history"], parameters=swagger_params1.change_log_params)
+    def get(self, request, entity, pk, format=None):
+        if entity not in change_log.SOURCES:
+            return Response(
+                {"error": True, "errors": f"Unknown entity: {entity}"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        try:
+            object_id = uuid.UUID(pk)
+        except ValueError:
+            return Response(
+                {"error": True, "errors": "Invalid id"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        if not change_log.can_view(request, entity, object_id):
+            return Response(
+                {
+                    "error": True,
+                    "errors": "You do not have Permission to perform this action",
+                },
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        entries = (
+            ChangeLogEntry.objects.filter(
+                org=request.profile.org, entity=entity, object_id=object_id
+            )
+            .select_related("user")
+            .order_by("-id")
+        )
+        page = self.paginate_queryset(entries, request, view=self)
+        return Response(
+            {
+                "error": False,
+                "count": self.count,
+                "offset": self.offset,
+                "history": [
+                    {
+                        "id": entry.id,
+                        "action": entry.action,
+                        "changes": entry.changes,
+                        "user": entry.user.email if entry.user else None,
+                        "created_at": entry.created_at,
+                    }
+                    for entry in page
+                ],
+            },
+            status=status.HTTP_200_OK,
+        )
@@ -159,6 +159,7 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiTypes
 from common.swagger_params1 import organization_params
 from contacts.models import Contact
 from common.models import Org
+from common.response_cache import CachedResponseMixin
 from companies.models import CompanyProfile
 from leads.models import Lead
 from common.utils import LEAD_STATUS
@@ -182,15 +183,26 @@ from common.utils import LEAD_STATUS
     ],
     responses={200: "Company dashboard data"}
 )
-class JobTitlesDistributionView(APIView):
+class JobTitlesDistributionView(CachedResponseMixin, APIView):
     permission_classes = [IsAuthenticated]
+    response_cache_name = "job_titles_distribution"
+    response_cache_dependencies = (
+        "common.Profile",
+        "companies.CompanyProfile",
+        "contacts.Contact",
+        "leads.Lead",
+    )
 
     def get(self, request):
         """
         Returns job titles distribution for contacts in the organization
         and leads information grouped by status for the selected company.
         You can specify the number of job titles to return with the 'limit' parameter.
+        Responses are cached, see common.response_cache.
         """
+        return self.cached_response(request, self.get_distribution)
+
+    def get_distribution(self, request):
         if not hasattr(request, "profile") or request.profile is None:
             return Response(
                 {"error": True, "message": "User profile not found or not authenticated."},
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:10
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# icontains lookups run UPPER(column::text) LIKE ..., see common/trigram.py
+INDEXED_COLUMNS = ['name', 'email']
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in INDEXED_COLUMNS:
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS companies_%s_trgm ON companies '
+            'USING gin (UPPER(%s::text) gin_trgm_ops)' % (column, column)
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in INDEXED_COLUMNS:
+        schema_editor.execute('DROP INDEX IF EXISTS companies_%s_trgm' % column)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0016_companyprofile_account'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
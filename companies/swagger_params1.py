@@ -14,6 +14,14 @@ company_list_get_params = [
         location=OpenApiParameter.QUERY,
     ),
 
+    OpenApiParameter(
+        name="search",
+        description="Search companies by name or email, typo tolerant and ranked by similarity",
+        required=False,
+        type=OpenApiTypes.STR,
+        location=OpenApiParameter.QUERY,
+    ),
+
     OpenApiParameter(
         name="billing_country",
         description="Filter by country",
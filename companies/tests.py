@@ -1,3 +1,23 @@
-from django.test import TestCase
+from common.testing import OrgAPITestCase
+from companies.models import CompanyProfile
 
-# Create your tests here.
+
+class CompanySearchTestCase(OrgAPITestCase):
+    org_name = "Trigram Org"
+    email = "trigram@example.com"
+
+    def setUp(self):
+        super().setUp()
+        for name in ["Initech", "Umbrella"]:
+            CompanyProfile.objects.create(
+                name=name,
+                website=f"https://{name.lower()}.com",
+                email=f"info@{name.lower()}.com",
+                org=self.org,
+            )
+
+    def test_company_search(self):
+        response = self.client.get("/api/companies/", {"search": "umbr"})
+        self.assertEqual(
+            [company["name"] for company in response.data["results"]], ["Umbrella"]
+        )
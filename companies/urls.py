@@ -6,6 +6,7 @@ app_name = "api_companies"
 
 urlpatterns = [
     path("", views.CompanyListView.as_view(), name="company_list"),
+    path("bulk/", views.CompanyBulkView.as_view(), name="company_bulk"),
      path("job-titles/", JobTitlesDistributionView.as_view(), name="job_titles_distribution"),
     path("<str:pk>/", views.CompanyDetailView.as_view(), name="company_detail"),
     path('<str:pk>/logo/', views.CompanyLogoUploadView.as_view(), name='company-logo-upload'),
@@ -10,6 +10,17 @@ from drf_spectacular.utils import extend_schema, extend_schema_view
 
 from rest_framework.pagination import LimitOffsetPagination
 
+from common import export, global_search
+from common.bulk import BulkWriteView
+from common.conditional_get import ConditionalGetMixin
+from common.export import CsvExportMixin
+from common.serializer import BulkIdsSwaggerSerializer, BulkItemsSwaggerSerializer
+from common.swagger_params1 import export_params
+from common.trigram import similarity_search
+
+from leads import search
+from leads.models import Lead
+
 from .models import CompanyProfile
 from .serializer import (
     CompanyListSerializer,
@@ -62,27 +73,52 @@ def format_serializer_errors(serializer_errors):
 )
 
 
-class CompanyListView(APIView):
+class CompanyListView(CsvExportMixin, APIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = CompanyListSerializer
+    export_filename = "companies_export.csv"
+    export_columns = (
+        ("Name", "name"),
+        ("Email", "email"),
+        ("Phone", "phone"),
+        ("Website", "website"),
+        ("Industry", "industry"),
+        ("City", "billing_city"),
+        ("State", "billing_state"),
+        ("Country", "billing_country"),
+        ("Created At", "created_at"),
+    )
+
+    def get_queryset(self):
+        """The companies the filters of the request select"""
+        request = self.request
+        companies = CompanyProfile.objects.filter(org=request.profile.org)
+        name_search = request.query_params.get("name")
+        if name_search:
+            companies = companies.filter(name__icontains=name_search)
+        search = request.query_params.get("search")
+        country_filter = request.query_params.get("billing_country")
+        if country_filter:
+            companies = companies.filter(billing_country=country_filter)
+        industry_filter = request.query_params.get("industry")
+        if industry_filter:
+            companies = companies.filter(industry=industry_filter)
+        if search:
+            # ranked by trigram similarity on PostgreSQL (common/trigram.py)
+            return similarity_search(companies, ["name", "email"], search)
+        return companies.order_by("-created_at")
 
     @extend_schema(
-        tags=["Companies"], parameters=company_list_get_params + company_auth_headers
+        tags=["Companies"],
+        parameters=company_list_get_params + company_auth_headers + export_params,
     )
 
     def get(self, request, *args, **kwargs):
+        if export.is_requested(request):
+            return self.export_csv()
         try:
-            companies = CompanyProfile.objects.filter(org=request.profile.org)
-            name_search = request.query_params.get("name")
-            if name_search:
-                companies = companies.filter(name__icontains=name_search)
-            country_filter = request.query_params.get("billing_country")
-            if country_filter:
-                companies = companies.filter(billing_country=country_filter)
-            industry_filter = request.query_params.get("industry")
-            if industry_filter:
-                companies = companies.filter(industry=industry_filter)
-            companies = companies.order_by("-created_at")
+            # CompanyListSerializer nests the creator and the org
+            companies = self.get_queryset().select_related("created_by", "org")
 
             # 1. Create a paginator instance
             paginator = LimitOffsetPagination()
@@ -282,8 +318,10 @@ class CompanyListView(APIView):
         },
     ),
 )
-class CompanyDetailView(APIView):
+class CompanyDetailView(ConditionalGetMixin, APIView):
     permission_classes = (IsAuthenticated,)
+    conditional_related = ("org", "created_by", "updated_by")
+    conditional_dependencies = ("common.User",)
 
     def get_object(self, pk):
         """Get the company object"""
@@ -306,10 +344,14 @@ class CompanyDetailView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
+        headers = self.get_conditional_headers(request, company)
+        if self.is_not_modified(request, headers):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
         serializer = CompanyDetailSerializer(company)
         return Response(
             {"error": False, "data": serializer.data},
             status=status.HTTP_200_OK,
+            headers=headers,
         )
 
     @extend_schema(
@@ -396,6 +438,47 @@ class CompanyDetailView(APIView):
         )
 
 
+@extend_schema_view(
+    post=extend_schema(
+        tags=["Companies"],
+        description="Create up to BULK_WRITE_MAX_ITEMS companies",
+        parameters=company_auth_headers,
+        request=BulkItemsSwaggerSerializer,
+    ),
+    patch=extend_schema(
+        tags=["Companies"],
+        description="Update up to BULK_WRITE_MAX_ITEMS companies",
+        parameters=company_auth_headers,
+        request=BulkItemsSwaggerSerializer,
+    ),
+    delete=extend_schema(
+        tags=["Companies"],
+        description="Delete up to BULK_WRITE_MAX_ITEMS companies",
+        parameters=company_auth_headers,
+        request=BulkIdsSwaggerSerializer,
+    ),
+)
+class CompanyBulkView(BulkWriteView):
+    model = CompanyProfile
+    serializer_class = CompanyCreateUpdateSerializer
+    unique_fields = {"name": False, "email": False, "website": False}
+    search_entity = "company"
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        # users only change the companies they created
+        if request.profile.role == "USER":
+            queryset = queryset.filter(created_by=request.profile.user)
+        return queryset
+
+    def rows_written(self, request, pks, created):
+        super().rows_written(request, pks, created)
+        if not created:
+            # leads, contacts and opportunities show the names of their companies
+            search.update_search_vectors(Lead.objects.filter(company__in=pks))
+            global_search.schedule_related_refresh("company", pks)
+
+
 @extend_schema_view(
     put=extend_schema(
         tags=["Companies"],
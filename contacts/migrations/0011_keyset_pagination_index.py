@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0016_keyset_pagination_index'),
+        ('companies', '0016_companyprofile_account'),
+        ('contacts', '0010_alter_contact_language'),
+        ('teams', '0003_alter_teams_created_by'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['org', 'created_at', 'id'], name='contacts_org_id_46f048_idx'),
+        ),
+    ]
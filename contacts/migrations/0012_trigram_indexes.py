@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:10
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# icontains lookups run UPPER(column::text) LIKE ..., see common/trigram.py
+INDEXED_COLUMNS = ['first_name', 'last_name', 'primary_email', 'mobile_number']
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in INDEXED_COLUMNS:
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS contacts_%s_trgm ON contacts '
+            'USING gin (UPPER(%s::text) gin_trgm_ops)' % (column, column)
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in INDEXED_COLUMNS:
+        schema_editor.execute('DROP INDEX IF EXISTS contacts_%s_trgm' % column)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0011_keyset_pagination_index'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -79,6 +79,10 @@ class Contact(BaseModel):
         verbose_name_plural = "Contacts"
         db_table = "contacts"
         ordering = ("-created_at",)
+        indexes = [
+            # keyset pagination (common.pagination.KeysetPagination)
+            models.Index(fields=["org", "created_at", "id"]),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
@@ -7,6 +7,7 @@ from common.serializer import (
     OrganizationSerializer,
     ProfileSerializer,
 )
+from common.sparse_fields import SparseFieldsMixin
 from companies.models import CompanyProfile
 from companies.serializer import CompanyListSerializer
 from contacts.models import Contact
@@ -14,7 +15,7 @@ from teams.serializer import TeamsSerializer
 from common.utils import COUNTRIES
 
 
-class ContactSerializer(serializers.ModelSerializer):
+class ContactSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     teams = TeamsSerializer(read_only=True, many=True)
     assigned_to = ProfileSerializer(read_only=True, many=True)
     address = BillingAddressSerializer(read_only=True)
@@ -134,6 +135,27 @@ class ContactBasicSerializer(serializers.ModelSerializer):
         )
 
 
+class ContactListSerializer(serializers.ModelSerializer):
+    """Contact nested in list rows, expects company to be loaded"""
+
+    company_name = serializers.CharField(
+        source="company.name", read_only=True, default=None
+    )
+
+    class Meta:
+        model = Contact
+        fields = (
+            "id",
+            "salutation",
+            "first_name",
+            "last_name",
+            "title",
+            "primary_email",
+            "mobile_number",
+            "company_name",
+        )
+
+
 class CreateContactSerializer(serializers.ModelSerializer):
     company = serializers.PrimaryKeyRelatedField(
         queryset=CompanyProfile.objects.all(),
@@ -235,6 +257,24 @@ class CreateContactSerializer(serializers.ModelSerializer):
         )
 
 
+class ContactBulkSerializer(CreateContactSerializer):
+    """
+    Items of ``ContactBulkView``: the company id and the unique names, emails
+    and phone numbers are checked for the whole batch (common.bulk).
+    """
+
+    company = serializers.UUIDField(required=False, allow_null=True)
+
+    def validate_first_name(self, first_name):
+        return first_name
+
+    def validate_primary_email(self, primary_email):
+        return primary_email
+
+    def validate_company(self, company):
+        return company
+
+
 class ContactDetailEditSwaggerSerializer(serializers.Serializer):
     comment = serializers.CharField()
     contact_attachment = serializers.FileField()
@@ -19,6 +19,13 @@ organization_params = [
 
 contact_list_get_params = [
     organization_params_in_header,
+    OpenApiParameter(
+        name="search",
+        description="Search by name, email or phone, typo tolerant and ranked by similarity",
+        required=False,
+        type=OpenApiTypes.STR,
+        location=OpenApiParameter.QUERY,
+    ),
     OpenApiParameter(
         name="name",
         description="Search by name",
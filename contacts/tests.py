@@ -0,0 +1,68 @@
+from common.testing import OrgAPITestCase
+from companies.models import CompanyProfile
+from contacts.models import Contact
+
+
+class ContactSearchTestCase(OrgAPITestCase):
+    org_name = "Trigram Org"
+    email = "trigram@example.com"
+
+    def setUp(self):
+        super().setUp()
+        for first_name, email in [
+            ("Joanna", "jo@initech.com"),
+            ("Peter", "peter@example.com"),
+        ]:
+            Contact.objects.create(
+                first_name=first_name,
+                last_name="Smith",
+                primary_email=email,
+                org=self.org,
+            )
+
+    def test_contact_search(self):
+        response = self.client.get("/api/contacts/", {"search": "initech"})
+        contacts = response.data["data"]["contact_obj_list"]
+        self.assertEqual([contact["first_name"] for contact in contacts], ["Joanna"])
+
+
+class ContactSparseFieldsTestCase(OrgAPITestCase):
+    org_name = "Sparse Contact Org"
+    email = "sparse-contacts@example.com"
+
+    def setUp(self):
+        super().setUp()
+        self.company = CompanyProfile.objects.create(name="Initech", org=self.org)
+        self.contact = Contact.objects.create(
+            first_name="Bill",
+            last_name="Lumbergh",
+            primary_email="bill@initech.com",
+            company=self.company,
+            org=self.org,
+        )
+        self.contact.assigned_to.add(self.profile)
+
+    def test_list_fields(self):
+        for params in ({}, {"pagination": "cursor"}):
+            response = self.client.get(
+                "/api/contacts/",
+                {"fields": "id,first_name,company,assigned_to", **params},
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                response.data["data"]["contact_obj_list"],
+                [
+                    {
+                        "id": str(self.contact.id),
+                        "first_name": "Bill",
+                        "company": self.company.id,
+                        "assigned_to": [self.profile.id],
+                    }
+                ],
+            )
+
+        response = self.client.get(
+            "/api/contacts/", {"fields": "id,company", "expand": "company"}
+        )
+        row = response.data["data"]["contact_obj_list"][0]
+        self.assertEqual(row["company"]["name"], "Initech")
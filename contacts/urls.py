@@ -6,6 +6,8 @@ app_name = "api_contacts"
 
 urlpatterns = [
     path("", views.ContactsListView.as_view()),
+    path("meta/", views.ContactMetaView.as_view()),
+    path("bulk/", views.ContactBulkView.as_view()),
     path("<str:pk>/", views.ContactDetailView.as_view()),
     path("comment/<str:pk>/", views.ContactCommentView.as_view()),
     path("attachment/<str:pk>/", views.ContactAttachmentView.as_view()),
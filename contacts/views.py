@@ -2,17 +2,36 @@ import json
 
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
-from drf_spectacular.utils import OpenApiExample, OpenApiParameter, extend_schema
+from drf_spectacular.utils import (
+    OpenApiExample,
+    OpenApiParameter,
+    extend_schema,
+    extend_schema_view,
+)
 from rest_framework import status
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from common import export, global_search
+from common.bulk import BulkWriteView
+from common.conditional_get import ConditionalGetMixin
+from common.export import CsvExportMixin
 from common.models import Attachments, Comment, Profile
+from common.pagination import KeysetPagination
+from common.reference_data import ReferenceDataView, lookups_requested
+from common.swagger_params1 import (
+    cursor_pagination_params,
+    export_params,
+    include_lookups_params,
+)
+from common.trigram import similarity_search
 from common.serializer import (
     AttachmentsSerializer,
     BillingAddressSerializer,
+    BulkIdsSwaggerSerializer,
+    BulkItemsSwaggerSerializer,
     CommentSerializer,
 )
 from common.utils import COUNTRIES
@@ -25,6 +44,8 @@ from contacts.tasks import send_email_to_assigned_user
 from tasks.serializer import TaskSerializer
 from teams.models import Teams
 from companies.models import CompanyProfile
+from leads import search
+from leads.models import Lead
 from contacts.serializer import ContactBasicSerializer
 
 
@@ -42,18 +63,85 @@ def format_serializer_errors(errors):
     return "; ".join(messages)
 
 
-class ContactsListView(APIView, LimitOffsetPagination):
+class ContactMetaView(ReferenceDataView):
+    """Lookups used by the contact list filters, see common.reference_data"""
+
+    entity = "contacts"
+    dependencies = ("companies.CompanyProfile", "contacts.Contact")
+
+    @classmethod
+    def build(cls, request):
+        org = request.profile.org
+        job_titles = (
+            Contact.objects.filter(org=org)
+            .exclude(title__isnull=True)
+            .exclude(title__exact="")
+            .values_list("title", flat=True)
+            .distinct()
+        )
+        departments = (
+            Contact.objects.filter(org=org)
+            .exclude(department__isnull=True)
+            .exclude(department__exact="")
+            .values_list("department", flat=True)
+            .distinct()
+            .order_by("department")
+        )
+        return {
+            "companies": list(
+                CompanyProfile.objects.filter(org=org).values("id", "name")
+            ),
+            "job_titles": list(job_titles),
+            "departments": list(departments),
+        }
+
+    @extend_schema(tags=["contacts"], parameters=swagger_params1.organization_params)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class ContactsListView(CsvExportMixin, APIView, LimitOffsetPagination):
     # authentication_classes = (CustomDualAuthentication,)
     permission_classes = (IsAuthenticated,)
     model = Contact
+    export_filename = "contacts_export.csv"
+    export_columns = (
+        ("First Name", "first_name"),
+        ("Last Name", "last_name"),
+        ("Title", "title"),
+        ("Email", "primary_email"),
+        ("Phone", "mobile_number"),
+        ("Company", "company.name"),
+        ("Department", "department"),
+        ("City", "address.city"),
+        ("Country", "country"),
+        ("Assigned To", export.profile_names("assigned_to")),
+        ("Created At", "created_at"),
+    )
+    export_select_related = ("company", "address")
+    export_prefetch_related = ("assigned_to__user",)
 
-    def get_context_data(self, **kwargs):
+    def get_queryset(self):
+        """The contacts the filters of the request select"""
         params = self.request.query_params
-        queryset = self.model.objects.filter(org=self.request.profile.org).order_by(
-            "-id"
+        queryset = (
+            self.model.objects.filter(org=self.request.profile.org)
+            .select_related(
+                "org",
+                "address",
+                "company__org",
+                "company__created_by",
+                "created_by",
+            )
+            .prefetch_related(
+                "assigned_to__user",
+                "assigned_to__address",
+                "contact_attachment",
+                "teams",
+            )
+            .order_by("-id")
         )
 
-        context = {}
         # Remove the restrictive filter - all users in the organization should see all contacts
         # if self.request.profile.role not in ["ADMIN", "MANAGER"] and not self.request.profile.is_admin:
         #     queryset = queryset.filter(
@@ -62,6 +150,13 @@ class ContactsListView(APIView, LimitOffsetPagination):
         #     ).distinct()
         # Applying filters from request parameters
         if params:
+            if params.get("search"):
+                # ranked by trigram similarity on PostgreSQL (common/trigram.py)
+                queryset = similarity_search(
+                    queryset,
+                    ["first_name", "last_name", "primary_email", "mobile_number"],
+                    params.get("search"),
+                )
             if params.get("name"):
                 queryset = queryset.filter(
                     Q(first_name__icontains=params.get("name"))
@@ -92,9 +187,10 @@ class ContactsListView(APIView, LimitOffsetPagination):
                 )
                 print(f"Filtering by department: {params.get('department')}")
                 print(f"Contacts found: {queryset.count()}")
-                context["selected_department"] = params.get("department")
 
-            sort_field = params.get("sort_by", "-id")
+            # searches stay ordered by similarity unless sort_by is given
+            default_sort = "" if params.get("search") else "-id"
+            sort_field = params.get("sort_by", default_sort)
             sort_order = params.get("sort_order", "")
 
             if sort_field == "department":
@@ -102,60 +198,54 @@ class ContactsListView(APIView, LimitOffsetPagination):
                     queryset = queryset.order_by("-department")
                 else:
                     queryset = queryset.order_by("department")
-            else:
+            elif sort_field or default_sort:
                 queryset = queryset.order_by(sort_field if sort_field else "-id")
+        return queryset
 
-        results_contact = self.paginate_queryset(
-            queryset.distinct(), self.request, view=self
-        )
-        contacts = ContactSerializer(results_contact, many=True).data
-        if results_contact:
-            offset = queryset.filter(id__gte=results_contact[-1].id).count()
-            if offset == queryset.count():
-                offset = None
+    def get_context_data(self, **kwargs):
+        queryset = self.get_queryset()
+        context = {}
+        if self.request.query_params.get("department"):
+            context["selected_department"] = self.request.query_params.get(
+                "department"
+            )
+        # ?fields=/?expand= (common.sparse_fields)
+        queryset = ContactSerializer.prune_queryset(queryset, self.request)
+        if KeysetPagination.is_requested(self.request):
+            # cursor pages are always ordered by (created_at, id), sort_by is ignored
+            paginator = KeysetPagination(self.request)
+            page = paginator.paginate(queryset.distinct())
+            context["per_page"] = paginator.limit
+            context.update({"contacts_count": page.count, **page.links()})
+            context["contact_obj_list"] = ContactSerializer(
+                page.results, many=True, context={"request": self.request}
+            ).data
         else:
-            offset = 0
-        context["per_page"] = 10
-        page_number = (int(self.offset / 10) + 1,)
-        context["page_number"] = page_number
-        context.update({"contacts_count": self.count, "offset": offset})
-        context["contact_obj_list"] = contacts
-
-        # Add users for filters and drop-down lists
-        #         users = Profile.objects.filter(is_active=True, org=self.request.profile.org).values(
-        #             "id", "user__email"
-        #         )
-        #         context["users"] = users
-
-        # Add companies for filters
-        companies = CompanyProfile.objects.filter(org=self.request.profile.org).values(
-            "id", "name"
-        )
-        context["companies"] = companies
-        # Add unique job titles for filters
-        job_titles = (
-            self.model.objects.filter(org=self.request.profile.org)
-            .exclude(title__isnull=True)
-            .exclude(title__exact="")
-            .values_list("title", flat=True)
-            .distinct()
-        )
-        context["job_titles"] = list(job_titles)
+            results_contact = self.paginate_queryset(
+                queryset.distinct(), self.request, view=self
+            )
+            contacts = ContactSerializer(
+                results_contact, many=True, context={"request": self.request}
+            ).data
+            if results_contact:
+                offset = queryset.filter(id__gte=results_contact[-1].id).count()
+                if offset == queryset.count():
+                    offset = None
+            else:
+                offset = 0
+            context["per_page"] = 10
+            page_number = (int(self.offset / 10) + 1,)
+            context["page_number"] = page_number
+            context.update({"contacts_count": self.count, "offset": offset})
+            context["contact_obj_list"] = contacts
 
-        departments = (
-            self.model.objects.filter(org=self.request.profile.org)
-            .exclude(department__isnull=True)
-            .exclude(department__exact="")
-            .values_list("department", flat=True)
-            .distinct()
-            .order_by("department")
-        )
-        context["departments"] = list(departments)
+        if lookups_requested(self.request):
+            context.update(ContactMetaView.get_payload(self.request))
 
         return context
 
     @extend_schema(
-        tags=["contacts"], parameters=swagger_params1.contact_list_get_params
+        tags=["contacts"], parameters=swagger_params1.contact_list_get_params + cursor_pagination_params + include_lookups_params + export_params
     )
     def get(self, request, *args, **kwargs):
         """Getting a list of contacts with filtering by companies and other parameters"""
@@ -182,6 +272,9 @@ class ContactsListView(APIView, LimitOffsetPagination):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        if export.is_requested(request):
+            return self.export_csv()
+
         try:
             # Getting context data taking into account all filters
             context = self.get_context_data(**kwargs)
@@ -280,10 +373,72 @@ class ContactsListView(APIView, LimitOffsetPagination):
             )
 
 
-class ContactDetailView(APIView):
+@extend_schema_view(
+    post=extend_schema(
+        tags=["contacts"],
+        description="Create up to BULK_WRITE_MAX_ITEMS contacts",
+        parameters=swagger_params1.organization_params,
+        request=BulkItemsSwaggerSerializer,
+    ),
+    patch=extend_schema(
+        tags=["contacts"],
+        description="Update up to BULK_WRITE_MAX_ITEMS contacts",
+        parameters=swagger_params1.organization_params,
+        request=BulkItemsSwaggerSerializer,
+    ),
+    delete=extend_schema(
+        tags=["contacts"],
+        description="Delete up to BULK_WRITE_MAX_ITEMS contacts",
+        parameters=swagger_params1.organization_params,
+        request=BulkIdsSwaggerSerializer,
+    ),
+)
+class ContactBulkView(BulkWriteView):
+    model = Contact
+    serializer_class = ContactBulkSerializer
+    relations = {"company": CompanyProfile}
+    # primary_email and mobile_number are unique in the table
+    unique_fields = {"first_name": False, "primary_email": True, "mobile_number": True}
+    search_entity = "contact"
+
+    def get_serializer_kwargs(self, request):
+        return {"request_obj": request, "context": {"request": request}}
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        # users only change the contacts they created
+        if request.profile.role == "USER":
+            queryset = queryset.filter(created_by=request.profile.user)
+        return queryset
+
+    def delete(self, request, *args, **kwargs):
+        if (
+            request.profile.role not in ["ADMIN", "MANAGER"]
+            and not request.user.is_superuser
+        ):
+            return Response(
+                {
+                    "error": True,
+                    "errors": "You don't have permission to delete contacts",
+                },
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        return super().delete(request, *args, **kwargs)
+
+    def rows_written(self, request, pks, created):
+        super().rows_written(request, pks, created)
+        if not created:
+            # leads and cases show the names of their contacts
+            search.update_search_vectors(Lead.objects.filter(contact__in=pks))
+            global_search.schedule_related_refresh("contact", pks)
+
+
+class ContactDetailView(ConditionalGetMixin, APIView):
     # #authentication_classes = (CustomDualAuthentication,)
     permission_classes = (IsAuthenticated,)
     model = Contact
+    conditional_related = ("company", "created_by")
+    conditional_dependencies = ("common.Profile", "common.User")
 
     def get_object(self, pk):
         return get_object_or_404(Contact, pk=pk)
@@ -412,11 +567,14 @@ class ContactDetailView(APIView):
                 )
             # All users can view all contacts in their organization (shared visibility)
             # No additional permission check needed
+            headers = self.get_conditional_headers(request, contact_obj)
+            if self.is_not_modified(request, headers):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
             contact_data = ContactBasicSerializer(contact_obj).data
 
             context = {"error": False, "contact": contact_data}
 
-            return Response(context, status=status.HTTP_200_OK)
+            return Response(context, status=status.HTTP_200_OK, headers=headers)
 
         except Contact.DoesNotExist:
             return Response(
@@ -529,7 +687,9 @@ class ContactDetailView(APIView):
         ).order_by("-id")
         context.update(
             {
-                "contact_obj": ContactSerializer(self.contact_obj).data,
+                "contact_obj": ContactSerializer(
+                    self.contact_obj, context={"request": self.request}
+                ).data,
                 "attachments": AttachmentsSerializer(attachments, many=True).data,
                 "comments": CommentSerializer(comments, many=True).data,
             }
@@ -60,6 +60,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.sessions",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "phonenumber_field",
     "rest_framework",
     "rest_framework_simplejwt",
@@ -149,6 +150,24 @@ CACHES = {
         "LOCATION": os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379/1"),
     }
 }
+# Profile resolved by GetProfileAndOrg (common/profile_cache.py)
+PROFILE_CACHE_TIMEOUT = int(os.environ.get("PROFILE_CACHE_TIMEOUT", 300))
+PROFILE_CACHE_LOCAL_TTL = int(os.environ.get("PROFILE_CACHE_LOCAL_TTL", 5))
+PROFILE_CACHE_LOCAL_SIZE = int(os.environ.get("PROFILE_CACHE_LOCAL_SIZE", 2048))
+# Resolved api keys (common/api_keys.py)
+API_KEY_CACHE_TIMEOUT = int(os.environ.get("API_KEY_CACHE_TIMEOUT", 600))
+API_KEY_CACHE_MISSING_TIMEOUT = int(os.environ.get("API_KEY_CACHE_MISSING_TIMEOUT", 60))
+# Lookups served by the /meta/ endpoints (common/reference_data.py)
+REFERENCE_DATA_CACHE_TIMEOUT = int(os.environ.get("REFERENCE_DATA_CACHE_TIMEOUT", 3600))
+REFERENCE_DATA_MAX_AGE = int(os.environ.get("REFERENCE_DATA_MAX_AGE", 60))
+# Dashboard responses (common/response_cache.py)
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get("RESPONSE_CACHE_TIMEOUT", 300))
+RESPONSE_CACHE_STALE_TIMEOUT = int(os.environ.get("RESPONSE_CACHE_STALE_TIMEOUT", 86400))
+RESPONSE_CACHE_LOCK_TIMEOUT = int(os.environ.get("RESPONSE_CACHE_LOCK_TIMEOUT", 30))
+RESPONSE_CACHE_LOCK_WAIT = float(os.environ.get("RESPONSE_CACHE_LOCK_WAIT", 2))
+# Dashboard rollups (common/dashboard_rollups.py): how long a queued rebuild
+# of an org blocks queuing another one
+DASHBOARD_ROLLUP_REBUILD_LOCK = int(os.environ.get("DASHBOARD_ROLLUP_REBUILD_LOCK", 300))
 # Password validation
 # https://docs.djangoproject.com/en/1.10/ref/settings/#auth-password-validators
 
@@ -287,8 +306,9 @@ SETTINGS_EXPORT = ["APPLICATION_NAME"]
 REST_FRAMEWORK = {
     "EXCEPTION_HANDLER": "rest_framework.views.exception_handler",
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # verifies the bearer token once, shared with GetProfileAndOrg
         "common.external_auth.CustomDualAuthentication",
+        # "rest_framework_simplejwt.authentication.JWTAuthentication",
         # "rest_framework.authentication.SessionAuthentication",
         # "rest_framework.authentication.BasicAuthentication",
     ),
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0016_keyset_pagination_index'),
+        ('contacts', '0011_keyset_pagination_index'),
+        ('events', '0001_initial'),
+        ('teams', '0003_alter_teams_created_by'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['org', 'created_at', 'id'], name='event_org_id_388589_idx'),
+        ),
+    ]
@@ -62,6 +62,10 @@ class Event(BaseModel):
         verbose_name_plural = "Events"
         db_table = "event"
         ordering = ("-created_at",)
+        indexes = [
+            # keyset pagination (common.pagination.KeysetPagination)
+            models.Index(fields=["org", "created_at", "id"]),
+        ]
 
     def __str__(self):
         return f"{self.name}"
@@ -9,12 +9,13 @@ from common.serializer import (
     ProfileSerializer,
     UserSerializer
 )
+from common.sparse_fields import SparseFieldsMixin
 from contacts.serializer import ContactSerializer
 from events.models import Event
 from teams.serializer import TeamsSerializer
 
 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     created_by = UserSerializer()
     assigned_to = ProfileSerializer(read_only=True, many=True)
     contacts = ContactSerializer(read_only=True, many=True)
@@ -0,0 +1,68 @@
+from datetime import date, time
+
+from common.testing import OrgAPITestCase
+from contacts.models import Contact
+from events.models import Event
+
+
+class EventSparseFieldsTestCase(OrgAPITestCase):
+    org_name = "Sparse Event Org"
+    email = "sparse-events@example.com"
+
+    def setUp(self):
+        super().setUp()
+        self.contact = Contact.objects.create(
+            first_name="Bill",
+            last_name="Lumbergh",
+            primary_email="bill@initech.com",
+            org=self.org,
+        )
+        self.event = Event.objects.create(
+            name="Kick-off",
+            event_type="Non-Recurring",
+            start_date=date(2026, 1, 31),
+            start_time=time(9),
+            end_date=date(2026, 1, 31),
+            date_of_meeting=date(2026, 1, 31),
+            org=self.org,
+            created_by=self.profile,
+        )
+        self.event.contacts.add(self.contact)
+        self.event.assigned_to.add(self.profile)
+
+    def test_list_fields(self):
+        for params in ({}, {"pagination": "cursor"}):
+            response = self.client.get(
+                "/api/events/", {"fields": "id,name,contacts", **params}
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                response.data["events"],
+                [
+                    {
+                        "id": str(self.event.id),
+                        "name": "Kick-off",
+                        "contacts": [self.contact.id],
+                    }
+                ],
+            )
+
+        response = self.client.get(
+            "/api/events/", {"fields": "id,assigned_to", "expand": "assigned_to"}
+        )
+        profile = response.data["events"][0]["assigned_to"][0]
+        self.assertEqual(profile["user_details"]["email"], self.email)
+
+    def test_detail_fields(self):
+        response = self.client.get(
+            f"/api/events/{self.event.id}/", {"fields": "id,event_type,contacts"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["event_obj"],
+            {
+                "id": str(self.event.id),
+                "event_type": "Non-Recurring",
+                "contacts": [self.contact.id],
+            },
+        )
@@ -11,6 +11,9 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from common.models import Attachments, Comment, Profile, User
+from common.pagination import KeysetPagination
+from common.reference_data import ReferenceDataView, lookups_requested
+from common.swagger_params1 import cursor_pagination_params, include_lookups_params
 
 #from common.external_auth import CustomDualAuthentication
 from common.serializer import (
@@ -38,6 +41,48 @@ WEEKDAYS = (
 )
 
 
+class EventMetaView(ReferenceDataView):
+    """Lookups used by the event list and forms, see common.reference_data"""
+
+    entity = "events"
+    dependencies = (
+        "common.Address",
+        "common.Attachments",
+        "common.Org",
+        "common.Profile",
+        "common.User",
+        "companies.CompanyProfile",
+        "contacts.Contact",
+        "teams.Teams",
+    )
+
+    @classmethod
+    def is_restricted(cls, request):
+        return request.profile.role not in ["ADMIN", "MANAGER"] and not request.profile.is_admin
+
+    @classmethod
+    def get_scope(cls, request):
+        return str(request.profile.id) if cls.is_restricted(request) else "all"
+
+    @classmethod
+    def build(cls, request):
+        contacts = Contact.objects.filter(org=request.profile.org)
+        if cls.is_restricted(request):
+            contacts = contacts.filter(
+                Q(created_by=request.profile.user) | Q(assigned_to=request.profile)
+            ).distinct()
+        return {
+            "recurring_days": WEEKDAYS,
+            "contacts_list": ContactSerializer(contacts, many=True).data,
+        }
+
+    @extend_schema(
+        tags=["Events"], parameters=swagger_params1.organization_params
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
 class EventListView(APIView, LimitOffsetPagination):
     model = Event
     #authentication_classes = (CustomDualAuthentication,)
@@ -46,15 +91,11 @@ class EventListView(APIView, LimitOffsetPagination):
     def get_context_data(self, **kwargs):
         params = self.request.query_params
         queryset = self.model.objects.filter(org=self.request.profile.org).order_by("-id")
-        contacts = Contact.objects.filter(org=self.request.profile.org)
         if self.request.profile.role not in ["ADMIN", "MANAGER"] and not self.request.profile.is_admin:
             queryset = queryset.filter(
                 Q(assigned_to__in=[self.request.profile])
                 | Q(created_by=self.request.profile.user)
             )
-            contacts = contacts.filter(
-                Q(created_by=self.request.profile.user) | Q(assigned_to=self.request.profile)
-            ).distinct()
 
         if params:
             if params.get("name"):
@@ -70,22 +111,33 @@ class EventListView(APIView, LimitOffsetPagination):
                     date_of_meeting=params.get("date_of_meeting")
                 )
         context = {}
-        results_events = self.paginate_queryset(queryset, self.request, view=self)
-        events = EventSerializer(results_events, many=True).data
-        if results_events:
-            offset = queryset.filter(id__gte=results_events[-1].id).count()
-            if offset == queryset.count():
-                offset = None
+        # ?fields=/?expand= (common.sparse_fields)
+        queryset = EventSerializer.prune_queryset(queryset, self.request)
+        if KeysetPagination.is_requested(self.request):
+            page = KeysetPagination(self.request).paginate(queryset.distinct())
+            context.update({"events_count": page.count, **page.links()})
+            context["events"] = EventSerializer(
+                page.results, many=True, context={"request": self.request}
+            ).data
         else:
-            offset = 0
-        context.update({"events_count": self.count, "offset": offset})
-        context["events"] = events
-        context["recurring_days"] = WEEKDAYS
-        context["contacts_list"] = ContactSerializer(contacts, many=True).data
+            results_events = self.paginate_queryset(queryset, self.request, view=self)
+            events = EventSerializer(
+                results_events, many=True, context={"request": self.request}
+            ).data
+            if results_events:
+                offset = queryset.filter(id__gte=results_events[-1].id).count()
+                if offset == queryset.count():
+                    offset = None
+            else:
+                offset = 0
+            context.update({"events_count": self.count, "offset": offset})
+            context["events"] = events
+        if lookups_requested(self.request):
+            context.update(EventMetaView.get_payload(self.request))
         return context
 
     @extend_schema(
-        tags=["Events"], parameters=swagger_params1.event_list_get_params
+        tags=["Events"], parameters=swagger_params1.event_list_get_params + cursor_pagination_params + include_lookups_params
     )
     def get(self, request, *args, **kwargs):
         context = self.get_context_data(**kwargs)
@@ -276,7 +328,9 @@ class EventDetailView(APIView):
         )
         context.update(
             {
-                "event_obj": EventSerializer(self.event_obj).data,
+                "event_obj": EventSerializer(
+                    self.event_obj, context={"request": self.request}
+                ).data,
                 "attachments": AttachmentsSerializer(attachments, many=True).data,
                 "comments": CommentSerializer(comments, many=True).data,
                 "selected_recurring_days": selected_recurring_days,
@@ -289,7 +343,9 @@ class EventDetailView(APIView):
         context["users_excluding_team"] = ProfileSerializer(
             users_excluding_team, many=True
         ).data
-        context["teams"] = TeamsSerializer(Teams.objects.all(), many=True).data
+        context["teams"] = TeamsSerializer(
+            TeamsSerializer.prefetch_plan(Teams.objects.all()), many=True
+        ).data
         return context
 
     @extend_schema(
@@ -355,7 +411,9 @@ class EventDetailView(APIView):
         )
         context.update(
             {
-                "event_obj": EventSerializer(self.event_obj).data,
+                "event_obj": EventSerializer(
+                    self.event_obj, context={"request": self.request}
+                ).data,
                 "attachments": AttachmentsSerializer(attachments, many=True).data,
                 "comments": CommentSerializer(comments, many=True).data,
             }
@@ -95,10 +95,19 @@ class InvoiceListView(APIView, LimitOffsetPagination):
             search = True
 
         context["search"] = search
+        # ?fields=/?expand= (common.sparse_fields)
+        queryset = InvoiceSerailizer.prune_queryset(
+            queryset.select_related(
+                "from_address", "to_address", "created_by", "org"
+            ).prefetch_related("teams", "assigned_to"),
+            self.request,
+        )
         results_invoice = self.paginate_queryset(
             queryset.distinct(), self.request, view=self
         )
-        invoices = InvoiceSerailizer(results_invoice, many=True).data
+        invoices = InvoiceSerailizer(
+            results_invoice, many=True, context={"request": self.request}
+        ).data
         context["per_page"] = 10
         page_number = (int(self.offset / 10) + 1,)
         context["page_number"] = page_number
@@ -421,7 +430,9 @@ class InvoiceDetailView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
         context = {}
-        context["invoice_obj"] = InvoiceSerailizer(self.invoice).data
+        context["invoice_obj"] = InvoiceSerailizer(
+            self.invoice, context={"request": self.request}
+        ).data
         if self.request.user.role != "ADMIN" and not self.request.user.is_superuser:
             if not (
                 (self.request.user == self.invoice.created_by)
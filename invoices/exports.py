@@ -0,0 +1,52 @@
+"""
+Export of the invoices of an org by ``common.export_jobs``. The invoice list
+endpoint isn't routed, so its filters are applied here.
+"""
+from django.db.models import Q
+
+from common import export
+from common.export import CsvExportMixin
+from invoices.models import Invoice
+
+
+class InvoiceExport(CsvExportMixin):
+    export_filename = "invoices_export.csv"
+    export_columns = (
+        ("Number", "invoice_number"),
+        ("Title", "invoice_title"),
+        ("Status", "status"),
+        ("Name", "name"),
+        ("Email", "email"),
+        ("Currency", "currency"),
+        ("Total Amount", "total_amount"),
+        ("Amount Due", "amount_due"),
+        ("Amount Paid", "amount_paid"),
+        ("Due Date", "due_date"),
+        ("Accounts", export.related_names("accounts")),
+        ("Assigned To", export.related_names("assigned_to", "email")),
+        ("Created At", "created_at"),
+    )
+    export_prefetch_related = ("accounts", "assigned_to")
+
+    def get_queryset(self):
+        params = self.request.query_params
+        queryset = Invoice.objects.filter(org=self.request.profile.org).order_by(
+            "-created_at"
+        )
+        if (
+            self.request.profile.role not in ["ADMIN", "MANAGER"]
+            and not self.request.user.is_superuser
+        ):
+            queryset = queryset.filter(
+                Q(created_by=self.request.user) | Q(assigned_to=self.request.user)
+            )
+        if params.get("invoice_title_or_number"):
+            queryset = queryset.filter(
+                Q(invoice_title__icontains=params.get("invoice_title_or_number"))
+                | Q(invoice_number__icontains=params.get("invoice_title_or_number"))
+            )
+        if params.get("status"):
+            queryset = queryset.filter(status=params.get("status"))
+        if params.get("created_by"):
+            queryset = queryset.filter(created_by=params.get("created_by"))
+        return queryset
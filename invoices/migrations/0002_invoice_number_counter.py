@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0019_export_job'),
+        ('invoices', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceNumberCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('last_value', models.PositiveIntegerField(default=0)),
+                ('org', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='invoice_number_counters', to='common.org')),
+            ],
+            options={
+                'verbose_name': 'Invoice Number Counter',
+                'verbose_name_plural': 'Invoice Number Counters',
+                'db_table': 'invoice_number_counter',
+                'constraints': [models.UniqueConstraint(fields=('org', 'day'), name='invoice_number_counter_org_day'), models.UniqueConstraint(condition=models.Q(('org__isnull', True)), fields=('day',), name='invoice_number_counter_no_org_day')],
+            },
+        ),
+    ]
@@ -1,5 +1,3 @@
-import datetime
-
 import arrow
 from django.db import models
 from django.utils.translation import gettext_lazy as _
@@ -82,19 +80,10 @@ class Invoice(BaseModel):
 
     def save(self, *args, **kwargs):
         if not self.invoice_number:
-            self.invoice_number = self.invoice_id_generator()
-            while Invoice.objects.filter(invoice_number=self.invoice_number).exists():
-                self.invoice_number = self.invoice_id_generator(
-                    prev_invoice_number=self.invoice_number
-                )
-        super(Invoice, self).save(*args, **kwargs)
+            from invoices import numbering
 
-    def invoice_id_generator(self, prev_invoice_number=None):
-        if prev_invoice_number:
-            prev_invoice_number += 1
-            return prev_invoice_number
-        date = datetime.datetime.now().strftime("%d%m%Y")
-        return int(date + "0001")
+            self.invoice_number = numbering.next_number(self.org_id)
+        super(Invoice, self).save(*args, **kwargs)
 
     def formatted_total_amount(self):
         return self.currency + " " + str(self.total_amount)
@@ -153,6 +142,39 @@ class Invoice(BaseModel):
         return User.objects.filter(id__in=list(user_ids))
 
 
+class InvoiceNumberCounter(models.Model):
+    """Last invoice number handed out to an org on a day, see invoices.numbering"""
+
+    org = models.ForeignKey(
+        Org,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="invoice_number_counters",
+    )
+    day = models.DateField()
+    last_value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Invoice Number Counter"
+        verbose_name_plural = "Invoice Number Counters"
+        db_table = "invoice_number_counter"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["org", "day"], name="invoice_number_counter_org_day"
+            ),
+            # invoices without an org share one counter a day
+            models.UniqueConstraint(
+                fields=["day"],
+                condition=models.Q(org__isnull=True),
+                name="invoice_number_counter_no_org_day",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.org_id} {self.day}: {self.last_value}"
+
+
 class InvoiceHistory(BaseModel):
     """Model definition for InvoiceHistory.
     This model is used to track/keep a record of the updates made to original invoice object."""
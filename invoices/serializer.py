@@ -5,11 +5,12 @@ from common.serializer import (
     OrganizationSerializer,
     UserSerializer,
 )
+from common.sparse_fields import SparseFieldsMixin
 from invoices.models import Invoice, InvoiceHistory
 from teams.serializer import TeamsSerializer
 
 
-class InvoiceSerailizer(serializers.ModelSerializer):
+class InvoiceSerailizer(SparseFieldsMixin, serializers.ModelSerializer):
     from_address = BillingAddressSerializer()
     to_address = BillingAddressSerializer()
     created_by = UserSerializer()
@@ -0,0 +1,60 @@
+import datetime
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from common.models import Org
+from common.testing import OrgAPITestCase
+from invoices import numbering
+from invoices.models import Invoice, InvoiceNumberCounter
+
+
+class InvoiceNumberingTestCase(OrgAPITestCase):
+    org_name = "Invoice Org"
+    email = "invoices@example.com"
+
+    def create_invoice(self, org=None, **fields):
+        return Invoice.objects.create(
+            invoice_title="Q1",
+            name="Acme",
+            email="billing@acme.com",
+            org=org or self.org,
+            **fields,
+        )
+
+    def test_numbers_of_the_day(self):
+        prefix = timezone.localdate().strftime("%d%m%Y")
+        numbers = [self.create_invoice().invoice_number for _ in range(3)]
+        self.assertEqual(numbers, [f"{prefix}{rank:04d}" for rank in (1, 2, 3)])
+
+        # numbered per org
+        other = Org.objects.create(name="Other Org")
+        self.assertEqual(self.create_invoice(org=other).invoice_number, f"{prefix}0001")
+
+    def test_reserve_block(self):
+        day = datetime.date(2026, 1, 31)
+        self.assertEqual(
+            numbering.reserve(self.org.id, 3, day),
+            ["310120260001", "310120260002", "310120260003"],
+        )
+        with CaptureQueriesContext(connection) as few:
+            numbering.reserve(self.org.id, 1, day)
+        with CaptureQueriesContext(connection) as many:
+            block = numbering.reserve(self.org.id, 500, day)
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(block[0], "310120260005")
+        self.assertEqual(block[-1], "310120260504")
+        counter = InvoiceNumberCounter.objects.get(org=self.org, day=day)
+        self.assertEqual(counter.last_value, 504)
+
+    def test_starts_after_the_numbers_already_used(self):
+        day = datetime.date(2026, 1, 31)
+        self.create_invoice(invoice_number="310120260007")
+        self.create_invoice(invoice_number="INV-42")
+        self.assertEqual(numbering.reserve(self.org.id, 1, day), ["310120260008"])
+
+    def test_given_numbers_are_kept(self):
+        invoice = self.create_invoice(invoice_number="INV-42")
+        self.assertEqual(invoice.invoice_number, "INV-42")
+        self.assertFalse(InvoiceNumberCounter.objects.exists())
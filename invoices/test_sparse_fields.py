@@ -0,0 +1,34 @@
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from common.testing import OrgAPITestCase
+from invoices.models import Invoice
+from invoices.serializer import InvoiceSerailizer
+
+
+class InvoiceSparseFieldsTestCase(OrgAPITestCase):
+    # the invoice views are not routed, the serializer is checked directly
+    org_name = "Sparse Invoice Org"
+    email = "sparse-invoices@example.com"
+
+    def serialize(self, invoice, **params):
+        request = Request(APIRequestFactory().get("/api/invoices/", params))
+        return InvoiceSerailizer(invoice, context={"request": request}).data
+
+    def test_fields(self):
+        invoice = Invoice.objects.create(
+            invoice_title="Q1", name="Acme", email="billing@acme.com", org=self.org
+        )
+        invoice.assigned_to.add(self.user)
+        self.assertEqual(
+            self.serialize(invoice, fields="id,invoice_title,org,assigned_to"),
+            {
+                "id": str(invoice.id),
+                "invoice_title": "Q1",
+                "org": self.org.id,
+                "assigned_to": [self.user.id],
+            },
+        )
+        data = self.serialize(invoice, fields="id,assigned_to", expand="assigned_to")
+        self.assertEqual(data["assigned_to"][0]["email"], self.email)
+        self.assertIn("from_address", self.serialize(invoice))
@@ -0,0 +1,487 @@
+"""
+CSV import of leads.
+
+``LeadUploadView`` streams the upload through ``normalize_file``, which
+detects its encoding and csv dialect from its first bytes and rewrites its
+rows, as it reads them, to a spooled temporary file in UTF-8 and the
+default dialect. That file is stored in a ``LeadImportJob`` and only the id
+of the job is queued to ``leads.tasks.create_lead_from_file``, which runs
+``run``:
+
+* the columns of the file are mapped to fields (``COLUMNS``) and each row is
+  validated by ``LeadImportRowSerializer``, without database queries;
+* a row whose lead title (compared case-insensitively) is already used in
+  the org, or by an earlier row of the file, is skipped as a duplicate. The
+  titles of the org are loaded once in a set, as are the emails of its
+  contacts and the names of its companies: the contact and company of a row
+  are reused when they exist and created otherwise;
+* the values new contacts and companies must not share with existing rows
+  (emails, phone numbers, websites) are looked up with one query per field
+  and chunk;
+* rows are written in chunks of ``LEAD_IMPORT_CHUNK_SIZE`` (default 500)
+  with ``bulk_create``, one transaction per chunk that also records the
+  progress of the job, so the caller polling it sees the import move and a
+  failure keeps the chunks already imported.
+
+Rows that can't be imported are counted in ``failed_rows`` and the first
+``LEAD_IMPORT_MAX_REPORTED_ROWS`` (default 1000) are reported with their
+line, values and errors. Columns that aren't in ``COLUMNS`` are ignored.
+"""
+import codecs
+import csv
+import io
+import logging
+import tempfile
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import CharField
+from django.db.models.functions import Cast, Lower
+from django.utils import timezone
+
+from common.bulk import refresh_written_rows
+from companies.models import CompanyProfile
+from contacts.models import Contact
+from leads import search
+from leads.models import Lead, LeadImportJob
+from leads.serializer import LeadImportRowSerializer
+
+logger = logging.getLogger(__name__)
+
+# column of the file (lowercase) -> field of LeadImportRowSerializer
+COLUMNS = {
+    "title": "lead_title",
+    "lead title": "lead_title",
+    "description": "description",
+    "status": "status",
+    "source": "lead_source",
+    "lead source": "lead_source",
+    "amount": "amount",
+    "probability": "probability",
+    "link": "link",
+    "notes": "notes",
+    "first name": "first_name",
+    "last name": "last_name",
+    "email": "email",
+    "phone": "phone",
+    "job title": "job_title",
+    "country": "country",
+    "company": "company",
+    "account_name": "company",
+    "website": "website",
+    "company email": "company_email",
+    "company phone": "company_phone",
+    "industry": "industry",
+}
+
+LEAD_FIELDS = (
+    "lead_title",
+    "description",
+    "status",
+    "lead_source",
+    "amount",
+    "probability",
+    "link",
+    "notes",
+)
+# field of the row -> field of the model
+CONTACT_FIELDS = {
+    "first_name": "first_name",
+    "last_name": "last_name",
+    "email": "primary_email",
+    "phone": "mobile_number",
+    "job_title": "title",
+    "country": "country",
+}
+COMPANY_FIELDS = {
+    "company": "name",
+    "website": "website",
+    "company_email": "email",
+    "company_phone": "phone",
+    "industry": "industry",
+}
+# fields of the row -> (model, field, unique in the whole table) of the values
+# new contacts and companies can't share with existing rows
+UNIQUE_FIELDS = {
+    "email": (Contact, "primary_email", True),
+    "phone": (Contact, "mobile_number", True),
+    "company_email": (CompanyProfile, "email", False),
+    "website": (CompanyProfile, "website", False),
+}
+
+
+def chunk_size():
+    return getattr(settings, "LEAD_IMPORT_CHUNK_SIZE", 500)
+
+
+def max_reported_rows():
+    return getattr(settings, "LEAD_IMPORT_MAX_REPORTED_ROWS", 1000)
+
+
+def _key(value):
+    return str(value).lower()
+
+
+def spool_size():
+    return getattr(settings, "LEAD_IMPORT_SPOOL_SIZE", 10 * 1024 * 1024)
+
+
+# byte order marks -> encoding, checked before the encodings of the prefix
+BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+PREFIX_ENCODINGS = ("utf-8", "cp1252")
+PREFIX_SIZE = 64 * 1024
+# decodes any byte
+LAST_ENCODING = "iso-8859-1"
+
+
+def detect_format(prefix):
+    """``(encoding, dialect)`` of a csv file starting with the bytes ``prefix``"""
+    for bom, encoding in BOMS:
+        if prefix.startswith(bom):
+            break
+    else:
+        encoding = LAST_ENCODING
+        for candidate in PREFIX_ENCODINGS:
+            try:
+                # the prefix may end in the middle of a character
+                codecs.getincrementaldecoder(candidate)().decode(prefix)
+            except UnicodeDecodeError:
+                continue
+            encoding = candidate
+            break
+
+    text = prefix.decode(encoding, errors="ignore")
+    if "\n" in text:
+        # without the line the prefix cuts
+        text = text[: text.rindex("\n")]
+    try:
+        dialect = csv.Sniffer().sniff(text, delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+    return encoding, dialect
+
+
+def _header(reader):
+    return [column.strip().lower() for column in next(reader, [])]
+
+
+def _is_blank(row):
+    return not any(value.strip() for value in row)
+
+
+def _copy_rows(reader, writer):
+    header = _header(reader)
+    if not any(COLUMNS.get(column) == "lead_title" for column in header):
+        raise ValueError("Missing headers: title")
+    writer.writerow(["line", *header])
+    total = 0
+    for row in reader:
+        if not _is_blank(row):
+            writer.writerow([reader.line_num, *(value.strip() for value in row)])
+            total += 1
+    if not total:
+        raise ValueError("The file has no leads")
+    return total
+
+
+def _fallbacks(encoding):
+    """
+    The encodings to retry the copy with when a byte past the prefix doesn't
+    decode in ``encoding`` (none when it was given by a byte order mark)
+    """
+    encodings = (*PREFIX_ENCODINGS, LAST_ENCODING)
+    if encoding not in encodings:
+        return ()
+    return encodings[encodings.index(encoding) + 1 :]
+
+
+def _normalize(file, encoding, dialect):
+    file.seek(0)
+    normalized = tempfile.SpooledTemporaryFile(max_size=spool_size())
+    source = io.TextIOWrapper(file, encoding=encoding, newline="")
+    target = io.TextIOWrapper(normalized, encoding="utf-8", newline="")
+    try:
+        total = _copy_rows(csv.reader(source, dialect), csv.writer(target))
+    except Exception:
+        normalized.close()
+        raise
+    finally:
+        source.detach()
+    target.detach()
+    normalized.seek(0)
+    return normalized, total
+
+
+def normalize_file(file):
+    """
+    ``(normalized, total)``: the non blank rows of the uploaded csv ``file``
+    rewritten, as they are read, in UTF-8 comma separated values to a
+    spooled temporary file, and their number. The encoding and dialect of
+    the upload are detected from its first bytes; when a later byte doesn't
+    decode, the copy starts over in the next encoding of ``_fallbacks``. The
+    first column of ``normalized`` is the line of the row in the upload.
+    Raises ValueError when the file can't be imported.
+    """
+    file.seek(0)
+    encoding, dialect = detect_format(file.read(PREFIX_SIZE))
+    encodings = (encoding, *_fallbacks(encoding))
+    for encoding in encodings:
+        try:
+            return _normalize(file, encoding, dialect)
+        except UnicodeDecodeError:
+            if encoding == encodings[-1]:
+                raise ValueError("Not a valid CSV file")
+            logger.info("Lead upload isn't %s past its first bytes", encoding)
+        except (csv.Error, UnicodeError):
+            raise ValueError("Not a valid CSV file")
+
+
+def read_rows(file):
+    """``(line, {column: value})`` of the rows of a normalized csv ``file``"""
+    reader = csv.reader(codecs.iterdecode(file, "utf-8"))
+    columns = next(reader, [])[1:]
+    for line, *row in reader:
+        yield int(line), dict(zip(columns, row))
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def row_data(values):
+    """Input of ``LeadImportRowSerializer`` for the ``values`` of a row"""
+    data = {}
+    for column, value in values.items():
+        value = (value or "").strip()
+        if column in COLUMNS and value:
+            data.setdefault(COLUMNS[column], value)
+    return data
+
+
+class LeadImporter:
+    def __init__(self, job):
+        self.job = job
+        self.org_id = job.org_id
+        self.user_id = job.created_by_id
+        self.titles = set(
+            Lead.objects.filter(organization_id=self.org_id, lead_title__isnull=False)
+            .annotate(key=Lower("lead_title"))
+            .values_list("key", flat=True)
+        )
+        self.contacts = dict(
+            Contact.objects.filter(org_id=self.org_id)
+            .annotate(key=Lower("primary_email"))
+            .values_list("key", "pk")
+        )
+        self.companies = dict(
+            CompanyProfile.objects.filter(org_id=self.org_id)
+            .annotate(key=Lower("name"))
+            .values_list("key", "pk")
+        )
+        # values of UNIQUE_FIELDS known to be taken
+        self.taken = {field: set() for field in UNIQUE_FIELDS}
+        self.counts = {
+            "processed_rows": 0,
+            "created_leads": 0,
+            "created_contacts": 0,
+            "created_companies": 0,
+            "duplicate_rows": 0,
+            "failed_rows": 0,
+        }
+        self.failed_report = []
+
+    def fail(self, line, values, errors):
+        self.counts["failed_rows"] += 1
+        if len(self.failed_report) < max_reported_rows():
+            self.failed_report.append(
+                {"line": line, "values": values, "errors": errors}
+            )
+
+    def load_taken(self, rows):
+        """Add the values of ``rows`` used by existing rows to ``taken``"""
+        for field, (model, model_field, table_wide) in UNIQUE_FIELDS.items():
+            known = self.contacts if model is Contact else self.companies
+            owner = "email" if model is Contact else "company"
+            keys = {
+                _key(data[field])
+                for data in rows
+                if field in data and _key(data[owner]) not in known
+            } - self.taken[field]
+            if not keys:
+                continue
+            queryset = model.objects.all()
+            if not table_wide:
+                queryset = queryset.filter(org_id=self.org_id)
+            self.taken[field].update(
+                queryset.annotate(key=Lower(Cast(model_field, CharField())))
+                .filter(key__in=keys)
+                .values_list("key", flat=True)
+            )
+
+    def new_row_errors(self, data, fields):
+        """Errors of the values of a new contact or company"""
+        errors = {}
+        for field in fields:
+            if field in UNIQUE_FIELDS and field in data:
+                if _key(data[field]) in self.taken[field]:
+                    errors[field] = ["Already used by another row"]
+        return errors
+
+    def contact_errors(self, data):
+        if "email" not in data or _key(data["email"]) in self.contacts:
+            return {}
+        errors = self.new_row_errors(data, CONTACT_FIELDS)
+        for field in ("first_name", "last_name"):
+            if field not in data:
+                errors[field] = ["Needed to create the contact"]
+        return errors
+
+    def company_errors(self, data):
+        if "company" not in data or _key(data["company"]) in self.companies:
+            return {}
+        errors = self.new_row_errors(data, COMPANY_FIELDS)
+        for field in LeadImportRowSerializer.COMPANY_FIELDS:
+            if field not in data:
+                errors[field] = ["Needed to create the company"]
+        return errors
+
+    def build(self, model, fields, data, **extra):
+        return model(
+            **{
+                model_field: data[field]
+                for field, model_field in fields.items()
+                if field in data
+            },
+            **extra,
+        )
+
+    def import_chunk(self, rows):
+        valid = []
+        for line, values in rows:
+            serializer = LeadImportRowSerializer(data=row_data(values))
+            if serializer.is_valid():
+                valid.append((line, values, serializer.validated_data))
+            else:
+                self.fail(line, values, serializer.errors)
+        self.load_taken([data for _, _, data in valid])
+
+        companies, contacts, leads = [], [], []
+        for line, values, data in valid:
+            title = _key(data["lead_title"])
+            if title in self.titles:
+                self.counts["duplicate_rows"] += 1
+                continue
+            errors = {**self.company_errors(data), **self.contact_errors(data)}
+            if errors:
+                self.fail(line, values, errors)
+                continue
+
+            company_id = None
+            if "company" in data:
+                key = _key(data["company"])
+                if key not in self.companies:
+                    company = self.build(
+                        CompanyProfile, COMPANY_FIELDS, data, org_id=self.org_id
+                    )
+                    companies.append(company)
+                    self.companies[key] = company.pk
+                    self.taken_by(data, COMPANY_FIELDS)
+                company_id = self.companies[key]
+            contact_id = None
+            if "email" in data:
+                key = _key(data["email"])
+                if key not in self.contacts:
+                    contact = self.build(
+                        Contact,
+                        CONTACT_FIELDS,
+                        data,
+                        org_id=self.org_id,
+                        company_id=company_id,
+                    )
+                    contacts.append(contact)
+                    self.contacts[key] = contact.pk
+                    self.taken_by(data, CONTACT_FIELDS)
+                contact_id = self.contacts[key]
+            leads.append(
+                self.build(
+                    Lead,
+                    {field: field for field in LEAD_FIELDS},
+                    data,
+                    organization_id=self.org_id,
+                    company_id=company_id,
+                    contact_id=contact_id,
+                )
+            )
+            self.titles.add(title)
+
+        with transaction.atomic():
+            batch_size = chunk_size()
+            # stamped with the user who uploaded the file
+            for model, objects in (
+                (CompanyProfile, companies),
+                (Contact, contacts),
+                (Lead, leads),
+            ):
+                model.audited.as_user(self.user_id).bulk_create(
+                    objects, batch_size=batch_size
+                )
+            self.counts["processed_rows"] += len(rows)
+            self.counts["created_leads"] += len(leads)
+            self.counts["created_contacts"] += len(contacts)
+            self.counts["created_companies"] += len(companies)
+            self.update_job()
+            transaction.on_commit(lambda: self.rows_written(companies, contacts, leads))
+
+    def taken_by(self, data, fields):
+        for field in fields:
+            if field in UNIQUE_FIELDS and field in data:
+                self.taken[field].add(_key(data[field]))
+
+    def rows_written(self, companies, contacts, leads):
+        """Refresh what the signals of the models maintain"""
+        for model, objects, entity in (
+            (CompanyProfile, companies, "company"),
+            (Contact, contacts, "contact"),
+            (Lead, leads, "lead"),
+        ):
+            if objects:
+                pks = [obj.pk for obj in objects]
+                refresh_written_rows(model, self.org_id, pks, entity, chunk_size())
+        if leads:
+            search.update_search_vectors(
+                Lead.objects.filter(pk__in=[lead.pk for lead in leads])
+            )
+
+    def update_job(self, **fields):
+        # not job.save(): BaseModel.save clears created_by outside requests
+        LeadImportJob.objects.filter(pk=self.job.pk).update(
+            **self.counts, failed_report=self.failed_report, **fields
+        )
+
+
+def run(job_id):
+    """Import the file of the queued ``LeadImportJob`` ``job_id``"""
+    claimed = LeadImportJob.objects.filter(pk=job_id, status="queued").update(
+        status="running", started_at=timezone.now()
+    )
+    if not claimed:
+        # unknown, or already run by another worker
+        return
+    job = LeadImportJob.objects.get(pk=job_id)
+    importer = LeadImporter(job)
+    try:
+        with job.file.open("rb") as file:
+            for rows in _chunks(read_rows(file), chunk_size()):
+                importer.import_chunk(rows)
+    except Exception as e:
+        logger.exception("Lead import %s failed", job_id)
+        importer.update_job(status="failed", error=str(e), finished_at=timezone.now())
+        return
+    importer.update_job(status="completed", finished_at=timezone.now())
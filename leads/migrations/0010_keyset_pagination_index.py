@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0016_keyset_pagination_index'),
+        ('companies', '0016_companyprofile_account'),
+        ('contacts', '0011_keyset_pagination_index'),
+        ('leads', '0009_lead_converted_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['organization', 'created_at', 'id'], name='lead_organiz_5d28c4_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:52
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Replace
+
+
+def related(model, field, outer_field):
+    return Subquery(model.objects.filter(pk=OuterRef(outer_field)).values(field)[:1])
+
+
+def set_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Lead = apps.get_model('leads', 'Lead')
+    Contact = apps.get_model('contacts', 'Contact')
+    CompanyProfile = apps.get_model('companies', 'CompanyProfile')
+    Lead.objects.update(
+        search_vector=SearchVector('lead_title', weight='A', config='simple')
+        + SearchVector(
+            related(CompanyProfile, 'name', 'company_id'), weight='A', config='simple'
+        )
+        + SearchVector(
+            related(Contact, 'first_name', 'contact_id'),
+            related(Contact, 'last_name', 'contact_id'),
+            related(Contact, 'primary_email', 'contact_id'),
+            Replace(related(Contact, 'primary_email', 'contact_id'), Value('@'), Value(' ')),
+            weight='B',
+            config='simple',
+        )
+        + SearchVector('lead_source', 'status', weight='C', config='simple')
+        + SearchVector('description', weight='D', config='simple')
+    )
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS lead_search_vector_gin ON lead USING gin (search_vector)'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS lead_search_vector_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0016_companyprofile_account'),
+        ('contacts', '0011_keyset_pagination_index'),
+        ('leads', '0010_keyset_pagination_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(set_search_vectors, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
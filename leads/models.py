@@ -1,4 +1,5 @@
 import arrow
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
@@ -71,11 +72,18 @@ class Lead(BaseModel):
     # Removed explicit created_by and updated_by fields to use those from BaseModel
     # which reference common.User instead of Profile
     converted_at = models.DateTimeField(null=True, blank=True)
+    # full-text search of the lead, its contact and company (leads/search.py),
+    # its GIN index only exists on PostgreSQL and is created by migration 0011
+    search_vector = SearchVectorField(null=True, editable=False)
     class Meta:
         verbose_name = "Lead"
         verbose_name_plural = "Leads"
         db_table = "lead"
         ordering = ("-created_at",)
+        indexes = [
+            # keyset pagination (common.pagination.KeysetPagination)
+            models.Index(fields=["organization", "created_at", "id"]),
+        ]
 
     def __str__(self):
         return f"Lead {self.id}"
@@ -94,3 +102,47 @@ class Lead(BaseModel):
     #     close_leads = queryset.filter(status='closed')
     #     cache.set('admin_leads_open_queryset', open_leads, 60*60)
     #     cache.set('admin_leads_close_queryset', close_leads, 60*60)
+
+
+class LeadImportJob(BaseModel):
+    """
+    CSV import of leads queued by ``LeadUploadView`` and run in chunks by
+    ``leads.tasks.create_lead_from_file`` (leads/imports.py), which records
+    its progress here for the caller to poll.
+    """
+
+    STATUS_CHOICES = (
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    )
+
+    org = models.ForeignKey(
+        Org, on_delete=models.CASCADE, related_name="lead_import_jobs"
+    )
+    file = models.FileField(upload_to="lead_imports/%Y/%m/", max_length=1000)
+    file_name = models.CharField(max_length=255, blank=True, default="")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    created_leads = models.PositiveIntegerField(default=0)
+    created_contacts = models.PositiveIntegerField(default=0)
+    created_companies = models.PositiveIntegerField(default=0)
+    duplicate_rows = models.PositiveIntegerField(default=0)
+    failed_rows = models.PositiveIntegerField(default=0)
+    # {"line": ..., "values": {column: value}, "errors": {...}} of the first
+    # LEAD_IMPORT_MAX_REPORTED_ROWS rows that failed
+    failed_report = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True, default="")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Lead Import Job"
+        verbose_name_plural = "Lead Import Jobs"
+        db_table = "lead_import_job"
+        ordering = ("-created_at",)
+
+    def __str__(self):
+        return f"Lead import {self.id}"
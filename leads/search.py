@@ -0,0 +1,115 @@
+"""
+Full-text search of leads.
+
+``Lead.search_vector`` holds a weighted tsvector of the lead and of the
+denormalized text of its contact and company:
+
+* A: lead title, company name
+* B: contact first name, last name and primary email (also with the "@"
+  blanked out, so the local part and the domain are lexemes of their own)
+* C: lead source, status
+* D: description
+
+It is kept up to date from ``leads.signals`` (lead, contact and company
+saves) and searched through the GIN index created by migration 0011. The
+search term goes through the same parser as the document, so an email or a
+host stays one lexeme on both sides, and its last lexeme is matched as a
+prefix so the search works while typing. Results are ranked with ``ts_rank``.
+
+``search_vector`` is PostgreSQL only. On any other database backend
+``search_leads`` falls back to ``icontains`` lookups.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F, Func, OuterRef, Q, Subquery, TextField, Value
+from django.db.models.functions import Cast, Replace
+
+from companies.models import CompanyProfile
+from contacts.models import Contact
+
+# no stemming: names, emails and titles are matched as typed
+SEARCH_CONFIG = "simple"
+
+
+def is_supported(queryset):
+    return connections[queryset.db].vendor == "postgresql"
+
+
+def _related(model, field, outer_field):
+    return Subquery(
+        model.objects.filter(pk=OuterRef(outer_field)).order_by().values(field)[:1]
+    )
+
+
+def build_search_vector():
+    """Expression of ``Lead.search_vector``, usable in ``QuerySet.update``"""
+    return (
+        SearchVector("lead_title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector(
+            _related(CompanyProfile, "name", "company_id"),
+            weight="A",
+            config=SEARCH_CONFIG,
+        )
+        + SearchVector(
+            _related(Contact, "first_name", "contact_id"),
+            _related(Contact, "last_name", "contact_id"),
+            _related(Contact, "primary_email", "contact_id"),
+            Replace(
+                _related(Contact, "primary_email", "contact_id"), Value("@"), Value(" ")
+            ),
+            weight="B",
+            config=SEARCH_CONFIG,
+        )
+        + SearchVector("lead_source", "status", weight="C", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="D", config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(queryset):
+    """Recompute the search vector of the leads of ``queryset``"""
+    if is_supported(queryset):
+        queryset.update(search_vector=build_search_vector())
+
+
+def build_search_query(term):
+    """
+    ``term`` parsed like the document (``plainto_tsquery``) with a prefix
+    marker on its last lexeme, None when it has no word.
+    """
+    if not re.search(r"[^\W_]", term):
+        return None
+    # 'john' & 'example.com'  ->  'john' & 'example.com':*
+    parsed = Cast(SearchQuery(term, config=SEARCH_CONFIG), TextField())
+    return SearchQuery(
+        Func(parsed, Value("'$"), Value("':*"), function="regexp_replace"),
+        search_type="raw",
+        config=SEARCH_CONFIG,
+    )
+
+
+def search_leads(queryset, term):
+    """
+    Filter ``queryset`` on ``term``. Returns the queryset and the annotations
+    ranking the results ({} when the database can't rank them).
+    """
+    query = build_search_query(term) if is_supported(queryset) else None
+    if query is None:
+        return (
+            queryset.filter(
+                Q(lead_title__icontains=term)
+                | Q(description__icontains=term)
+                | Q(lead_source__icontains=term)
+                | Q(status__icontains=term)
+                | Q(contact__first_name__icontains=term)
+                | Q(contact__last_name__icontains=term)
+                | Q(contact__primary_email__icontains=term)
+                | Q(company__name__icontains=term)
+            ),
+            {},
+        )
+    return (
+        queryset.filter(search_vector=query),
+        {"search_rank": SearchRank(F("search_vector"), query)},
+    )
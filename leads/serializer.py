@@ -1,3 +1,5 @@
+from django.core.validators import URLValidator
+from phonenumber_field.serializerfields import PhoneNumberField
 from rest_framework import serializers
 
 from accounts.models import Tags
@@ -8,8 +10,10 @@ from common.serializer import (
     ProfileSerializer,
     UserSerializer,
 )
+from common.sparse_fields import SparseFieldsMixin
+from common.utils import COUNTRIES, INDCHOICES, LEAD_SOURCE, LEAD_STATUS
 from contacts.serializer import ContactSerializer
-from leads.models import Lead
+from leads.models import Lead, LeadImportJob
 from companies.models import CompanyProfile
 
 
@@ -41,7 +45,7 @@ class CompanySerializer(serializers.ModelSerializer):
         fields = ("id", "name", "email", "phone", "website")
 
 
-class LeadListSerializer(serializers.ModelSerializer):
+class LeadListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     # Use lead_title if available, otherwise use description as a fallback
     lead_name = serializers.SerializerMethodField()
     contact_name = serializers.CharField(source="contact.first_name", read_only=True)
@@ -73,7 +77,7 @@ class LeadListSerializer(serializers.ModelSerializer):
         return obj.created_at.strftime("%B %d, %Y,") if obj.created_at else None
 
 
-class LeadSerializer(serializers.ModelSerializer):
+class LeadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     contact = ContactSerializer(read_only=True)
     assigned_to = ProfileSerializer(read_only=True)
     created_by = UserSerializer(read_only=True)
@@ -247,6 +251,18 @@ class LeadCreateSerializer(serializers.ModelSerializer):
         )
 
 
+class LeadBulkSerializer(LeadCreateSerializer):
+    """
+    Items of ``LeadBulkView``: contact, company and assignee ids are checked
+    for the whole batch (common.bulk).
+    """
+
+    class Meta(LeadCreateSerializer.Meta):
+        fields = tuple(
+            field for field in LeadCreateSerializer.Meta.fields if field != "organization"
+        )
+
+
 class LeadCreateSwaggerSerializer(serializers.ModelSerializer):
     lead_title = serializers.CharField(help_text="Title of the lead", required=False)
     description = serializers.CharField(
@@ -336,6 +352,109 @@ class LeadCommentEditSwaggerSerializer(serializers.Serializer):
 class LeadUploadSwaggerSerializer(serializers.Serializer):
     leads_file = serializers.FileField()
 
+
+class LeadImportRowSerializer(serializers.Serializer):
+    """
+    Values of a row of a lead import (leads/imports.py), by field. Only
+    checks the values themselves: the rows they refer to are looked up by
+    the importer for the whole chunk.
+    """
+
+    lead_title = serializers.CharField(max_length=255)
+    description = serializers.CharField(required=False)
+    status = serializers.ChoiceField(choices=LEAD_STATUS, required=False)
+    lead_source = serializers.ChoiceField(choices=LEAD_SOURCE, required=False)
+    amount = serializers.DecimalField(
+        max_digits=12, decimal_places=2, required=False
+    )
+    probability = serializers.IntegerField(
+        min_value=0, max_value=100, required=False
+    )
+    link = serializers.CharField(max_length=255, required=False)
+    notes = serializers.CharField(required=False)
+    # contact of the lead, looked up by email
+    first_name = serializers.CharField(max_length=255, required=False)
+    last_name = serializers.CharField(max_length=255, required=False)
+    email = serializers.EmailField(required=False)
+    phone = PhoneNumberField(required=False)
+    job_title = serializers.CharField(max_length=255, required=False)
+    country = serializers.ChoiceField(choices=COUNTRIES, required=False)
+    # company of the lead, looked up by name
+    company = serializers.CharField(
+        max_length=255,
+        required=False,
+        validators=CompanyProfile._meta.get_field("name").validators,
+    )
+    website = serializers.CharField(
+        max_length=255,
+        required=False,
+        validators=[URLValidator(schemes=["http", "https"])],
+    )
+    company_email = serializers.EmailField(max_length=255, required=False)
+    company_phone = PhoneNumberField(required=False)
+    industry = serializers.ChoiceField(choices=INDCHOICES, required=False)
+
+    CONTACT_FIELDS = ("first_name", "last_name", "phone", "job_title", "country")
+    COMPANY_FIELDS = ("website", "company_email", "company_phone", "industry")
+
+    def to_internal_value(self, data):
+        # choices are matched whatever the case of the file
+        data = dict(data)
+        for field in ("status", "lead_source"):
+            if field in data:
+                data[field] = data[field].lower()
+        for field in ("country", "industry"):
+            if field in data:
+                data[field] = data[field].upper()
+        return super().to_internal_value(data)
+
+    def validate(self, data):
+        errors = {}
+        if "email" not in data:
+            for field in self.CONTACT_FIELDS:
+                if field in data:
+                    errors[field] = ["Needs the email of the contact"]
+        if "company" not in data:
+            for field in self.COMPANY_FIELDS:
+                if field in data:
+                    errors[field] = ["Needs the name of the company"]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return data
+
+
+class LeadImportJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = LeadImportJob
+        fields = (
+            "id",
+            "file_name",
+            "status",
+            "progress",
+            "total_rows",
+            "processed_rows",
+            "created_leads",
+            "created_contacts",
+            "created_companies",
+            "duplicate_rows",
+            "failed_rows",
+            "failed_report",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        )
+
+    def get_progress(self, obj):
+        """Percentage of the rows processed"""
+        if obj.status == "completed":
+            return 100
+        if not obj.total_rows:
+            return 0
+        return min(100, obj.processed_rows * 100 // obj.total_rows)
+
 class LeadDashboardSerializer(serializers.ModelSerializer):
     contact_name = serializers.SerializerMethodField()
     company_name = serializers.SerializerMethodField()
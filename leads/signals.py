@@ -0,0 +1,24 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from companies.models import CompanyProfile
+from contacts.models import Contact
+from leads import search
+from leads.models import Lead
+
+
+@receiver(post_save, sender=Lead)
+def update_lead_search_vector(sender, instance, **kwargs):
+    search.update_search_vectors(Lead.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Contact)
+def update_contact_leads_search_vector(sender, instance, created, **kwargs):
+    if not created:
+        search.update_search_vectors(Lead.objects.filter(contact=instance))
+
+
+@receiver(post_save, sender=CompanyProfile)
+def update_company_leads_search_vector(sender, instance, created, **kwargs):
+    if not created:
+        search.update_search_vectors(Lead.objects.filter(company=instance))
@@ -1,5 +1,3 @@
-import re
-
 from celery import Celery
 from django.conf import settings
 from django.core.cache import cache
@@ -7,7 +5,8 @@ from django.core.mail import EmailMessage, EmailMultiAlternatives
 from django.db.models import Q
 from django.template.loader import render_to_string
 
-from common.models import Org, Profile
+from common.models import Profile
+from leads import imports
 from leads.models import Lead
 
 app = Celery("crm", broker=settings.CELERY_BROKER_URL)
@@ -101,38 +100,9 @@ def send_email_to_assigned_user(recipients, lead_id, source=""):
 
 
 @app.task
-def create_lead_from_file(validated_rows, invalid_rows, user_id, source, company_id):
-    """Parameters : validated_rows, invalid_rows, user_id.
-    This function is used to create leads from a given file.
-    """
-    email_regex = "^[_a-zA-Z0-9-]+(\.[_a-zA-Z0-9-]+)*@[a-zA-Z0-9-]+(\.[a-zA-Z0-9-]+)*(\.[a-zA-Z]{2,4})$"
-    profile = Profile.objects.get(id=user_id)
-    org = Org.objects.filter(id=company_id).first()
-    for row in validated_rows:
-        if not Lead.objects.filter(title=row.get("title")).exists():
-            if re.match(email_regex, row.get("email")) is not None:
-                try:
-                    lead = Lead()
-                    lead.title = row.get("title", "")[:64]
-                    lead.first_name = row.get("first name", "")[:255]
-                    lead.last_name = row.get("last name", "")[:255]
-                    lead.website = row.get("website", "")[:255]
-                    lead.email = row.get("email", "")
-                    lead.phone = row.get("phone", "")
-                    lead.address_line = row.get("address", "")[:255]
-                    lead.city = row.get("city", "")[:255]
-                    lead.state = row.get("state", "")[:255]
-                    lead.postcode = row.get("postcode", "")[:64]
-                    lead.country = row.get("country", "")[:3]
-                    lead.description = row.get("description", "")
-                    lead.status = row.get("status", "")
-                    lead.account_name = row.get("account_name", "")[:255]
-                    lead.created_from_site = False
-                    lead.created_by = profile
-                    lead.org = org
-                    lead.save()
-                except Exception as e:
-                    print(e)
+def create_lead_from_file(job_id):
+    """Run the lead import ``job_id`` queued by LeadUploadView"""
+    imports.run(job_id)
 
 
 @app.task
@@ -0,0 +1,236 @@
+import io
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+
+from common.testing import OrgAPITestCase
+from companies.models import CompanyProfile
+from contacts.models import Contact
+from leads import imports, search
+from leads.models import Lead, LeadImportJob
+from leads.tasks import create_lead_from_file
+
+
+class LeadSearchTestCase(OrgAPITestCase):
+    org_name = "Search Org"
+    email = "search@example.com"
+
+    def setUp(self):
+        super().setUp()
+        self.company = CompanyProfile.objects.create(name="Globex", org=self.org)
+        contact = Contact.objects.create(
+            first_name="Hank",
+            last_name="Scorpio",
+            primary_email="hank@cypress.io",
+            org=self.org,
+        )
+        Lead.objects.create(
+            lead_title="Renewal",
+            company=self.company,
+            contact=contact,
+            organization=self.org,
+        )
+        Lead.objects.create(lead_title="Upsell", organization=self.org)
+
+    def search(self, term):
+        response = self.client.get("/api/leads/", {"search": term})
+        self.assertEqual(response.status_code, 200)
+        return [lead["lead_title"] for lead in response.data["open_leads"]["open_leads"]]
+
+    def test_search_query_needs_a_word(self):
+        self.assertIsNone(search.build_search_query("&|!"))
+        self.assertIsNotNone(search.build_search_query("glob"))
+
+    def test_search_matches_lead_title_and_company_prefix(self):
+        self.assertEqual(self.search("renew"), ["Renewal"])
+        self.assertEqual(self.search("glob"), ["Renewal"])
+
+    def test_search_by_contact_email_and_domain(self):
+        self.assertEqual(self.search("hank@cypress.io"), ["Renewal"])
+        self.assertEqual(self.search("cypress"), ["Renewal"])
+        self.assertEqual(self.search("hank"), ["Renewal"])
+
+    def test_company_rename_updates_results(self):
+        self.company.name = "Initrode"
+        self.company.save()
+        self.assertEqual(self.search("initrode"), ["Renewal"])
+        self.assertEqual(self.search("globex"), [])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), LEAD_IMPORT_CHUNK_SIZE=2)
+class LeadImportTestCase(OrgAPITestCase):
+    org_name = "Import Org"
+    email = "import@example.com"
+
+    def setUp(self):
+        super().setUp()
+        self.run_tasks_eagerly(create_lead_from_file)
+        self.company = CompanyProfile.objects.create(name="Globex", org=self.org)
+        self.contact = Contact.objects.create(
+            first_name="Hank",
+            last_name="Scorpio",
+            primary_email="hank@globex.com",
+            mobile_number="+14155550100",
+            org=self.org,
+        )
+        Lead.objects.create(lead_title="Renewal", organization=self.org)
+
+    def upload(self, content, encoding="utf-8"):
+        document = SimpleUploadedFile(
+            "leads.csv", content.encode(encoding), "text/csv"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post("/api/leads/upload/", {"leads_file": document})
+
+    def test_import(self):
+        response = self.upload(
+            "Title,First Name,Last Name,Email,Phone,Company,Status\n"
+            "renewal,,,,,,\n"
+            "Upsell,Hank,,HANK@globex.com,,globex,Qualified\n"
+            "Expansion,Marge,Simpson,marge@example.com,,Globex,\n"
+            ",,,,,,\n"
+            "expansion,,,,,,\n"
+            "Pilot,Homer,Simpson,not-an-email,,,\n"
+            "Trial,Lisa,Simpson,lisa@example.com,+14155550100,,\n"
+            "Referral,Bart,Simpson,bart@example.com,,Initech,\n"
+        )
+        self.assertEqual(response.status_code, 202)
+        job = LeadImportJob.objects.get(pk=response.data["job"]["id"])
+        self.assertEqual(job.created_by, self.user)
+
+        response = self.client.get(f"/api/leads/upload/{job.pk}/")
+        self.assertEqual(response.status_code, 200)
+        job = response.data["job"]
+        self.assertEqual(job["status"], "completed")
+        self.assertEqual(job["progress"], 100)
+        self.assertEqual(job["total_rows"], 7)
+        self.assertEqual(job["processed_rows"], 7)
+        self.assertEqual(job["created_leads"], 2)
+        self.assertEqual(job["created_contacts"], 1)
+        self.assertEqual(job["duplicate_rows"], 2)
+        self.assertEqual(job["failed_rows"], 3)
+        errors = {row["line"]: set(row["errors"]) for row in job["failed_report"]}
+        self.assertEqual(
+            errors,
+            {
+                7: {"email"},
+                8: {"phone"},
+                9: {"website", "company_email", "company_phone", "industry"},
+            },
+        )
+
+        upsell = Lead.objects.get(lead_title="Upsell")
+        self.assertEqual(upsell.status, "qualified")
+        self.assertEqual(upsell.contact, self.contact)
+        self.assertEqual(upsell.company, self.company)
+        self.assertEqual(upsell.created_by, self.user)
+        expansion = Lead.objects.get(lead_title="Expansion")
+        self.assertEqual(expansion.contact.primary_email, "marge@example.com")
+        self.assertEqual(expansion.contact.company, self.company)
+        self.assertEqual(Lead.objects.filter(organization=self.org).count(), 3)
+
+    def test_encoding_and_dialect_are_detected(self):
+        response = self.upload(
+            'Title;Description;Amount\r\nCafé;"Beans; 5€";12.50\r\n', "cp1252"
+        )
+        self.assertEqual(response.status_code, 202)
+        lead = Lead.objects.get(lead_title="Café")
+        self.assertEqual(lead.description, "Beans; 5€")
+        self.assertEqual(str(lead.amount), "12.50")
+
+    def test_encoding_falls_back_past_the_prefix(self):
+        rows = "".join(f"Lead {i},Plain ASCII row\r\n" for i in range(5000))
+        content = f"Title,Description\r\n{rows}Café,Crème brûlée\r\n"
+        self.assertGreater(len(rows), imports.PREFIX_SIZE)
+        for encoding in ("cp1252", "iso-8859-1"):
+            normalized, total = imports.normalize_file(
+                io.BytesIO(content.encode(encoding))
+            )
+            self.assertEqual(total, 5001)
+            line, values = list(imports.read_rows(normalized))[-1]
+            self.assertEqual(line, 5002)
+            self.assertEqual(
+                values, {"title": "Café", "description": "Crème brûlée"}
+            )
+
+        # \x81 isn't a cp1252 character
+        content = b"Title\r\n" + b"Lead\r\n" * 20000 + b"A\x81\r\n"
+        normalized, _ = imports.normalize_file(io.BytesIO(content))
+        line, values = list(imports.read_rows(normalized))[-1]
+        self.assertEqual(values, {"title": "A\x81"})
+
+    def test_file_needs_a_title_column(self):
+        response = self.upload("First Name,Email\nHank,hank@globex.com\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(LeadImportJob.objects.exists())
+
+    def test_users_only_see_their_imports(self):
+        response = self.upload("Title\nUpsell\n")
+        job_id = response.data["job"]["id"]
+        self.authenticate(self.create_member("rep@example.com", "+15550000001").user)
+        response = self.client.get(f"/api/leads/upload/{job_id}/")
+        self.assertEqual(response.status_code, 403)
+
+
+class LeadSparseFieldsTestCase(OrgAPITestCase):
+    org_name = "Sparse Lead Org"
+    email = "sparse-leads@example.com"
+
+    def setUp(self):
+        super().setUp()
+        company = CompanyProfile.objects.create(name="Initech", org=self.org)
+        self.contact = Contact.objects.create(
+            first_name="Bill",
+            last_name="Lumbergh",
+            primary_email="bill@initech.com",
+            org=self.org,
+        )
+        self.lead = Lead.objects.create(
+            lead_title="Printers",
+            company=company,
+            contact=self.contact,
+            assigned_to=self.profile,
+            organization=self.org,
+        )
+        Lead.objects.create(
+            lead_title="Staplers", status="closed", organization=self.org
+        )
+
+    def list_leads(self, **params):
+        response = self.client.get("/api/leads/", params)
+        self.assertEqual(response.status_code, 200)
+        return (
+            response.data["open_leads"]["open_leads"],
+            response.data["close_leads"]["close_leads"],
+        )
+
+    def test_list_fields(self):
+        for params in ({}, {"pagination": "cursor"}, {"search": "printers"}):
+            open_leads, _ = self.list_leads(fields="id,lead_title,status", **params)
+            self.assertEqual(
+                open_leads,
+                [{"id": str(self.lead.id), "lead_title": "Printers", "status": None}],
+            )
+        open_leads, closed = self.list_leads(fields="lead_title,company_name")
+        self.assertEqual(open_leads[0]["company_name"], "Initech")
+        self.assertEqual(closed, [{"lead_title": "Staplers"}])
+
+        open_leads, _ = self.list_leads(fields="id,assigned_to_email")
+        self.assertEqual(open_leads[0]["assigned_to_email"], self.email)
+
+    def test_detail_fields(self):
+        path = f"/api/leads/{self.lead.id}/"
+        response = self.client.get(path, {"fields": "id,lead_title,contact"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["lead_obj"],
+            {
+                "id": str(self.lead.id),
+                "lead_title": "Printers",
+                "contact": self.contact.id,
+            },
+        )
+
+        response = self.client.get(path, {"fields": "id,contact", "expand": "contact"})
+        self.assertEqual(response.data["lead_obj"]["contact"]["first_name"], "Bill")
@@ -11,8 +11,11 @@ urlpatterns = [
         name="create_lead_from_site",
     ),
 
+    path("meta/", views.LeadMetaView.as_view()),
     path("companies/",views.CompaniesView.as_view()),
     path("upload/", views.LeadUploadView.as_view()),
+    path("upload/<str:pk>/", views.LeadImportJobView.as_view()),
+    path("bulk/", views.LeadBulkView.as_view()),
 
     path('company/<str:pk>/', views.CompanyDetail.as_view()),
 
@@ -1,7 +1,8 @@
+from django.db import transaction
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from django.http import Http404
-from drf_spectacular.utils import OpenApiExample, extend_schema
+from drf_spectacular.utils import OpenApiExample, extend_schema, extend_schema_view
 from rest_framework import status
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import IsAuthenticated
@@ -9,23 +10,40 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from accounts.models import Account, Tags
-from common.models import APISettings, Attachments, Comment, Profile
+from common import api_keys, export
+from common.bucketing import BucketedListing
+from common.bulk import BulkWriteView
+from common.conditional_get import ConditionalGetMixin
+from common.export import CsvExportMixin
+from common.models import Attachments, Comment, Profile
+from common.pagination import KeysetPagination
+from common.reference_data import ReferenceDataView, lookups_requested
+from common.swagger_params1 import (
+    cursor_pagination_params,
+    export_params,
+    include_lookups_params,
+)
 from django.utils import timezone
 
 # from common.external_auth import CustomDualAuthentication
 from common.serializer import (
     AttachmentsSerializer,
+    BulkIdsSwaggerSerializer,
+    BulkItemsSwaggerSerializer,
     CommentSerializer,
     LeadCommentSerializer,
     ProfileSerializer,
 )
 from .forms import LeadListForm
-from .models import Lead
+from .models import Lead, LeadImportJob
 from common.utils import COUNTRIES, INDCHOICES, LEAD_SOURCE, LEAD_STATUS
 from contacts.models import Contact
 from leads import swagger_params1
+from leads import search
+from leads.search import search_leads
 from companies.models import CompanyProfile
 from leads.serializer import (
+    LeadBulkSerializer,
     CompanySerializer,
     CompanySwaggerSerializer,
     LeadCreateSerializer,
@@ -36,6 +54,7 @@ from leads.serializer import (
     LeadCommentEditSwaggerSerializer,
     CreateLeadFromSiteSwaggerSerializer,
     LeadUploadSwaggerSerializer,
+    LeadImportJobSerializer,
     AttachmentCreateSwaggerSerializer,
     LeadListSerializer,
 )
@@ -49,11 +68,72 @@ from teams.models import Teams
 from teams.serializer import TeamsSerializer
 
 
-class LeadListView(APIView, LimitOffsetPagination):
+class LeadMetaView(ReferenceDataView):
+    """Lookups used by the lead list and forms, see common.reference_data"""
+
+    entity = "leads"
+    dependencies = (
+        "accounts.Tags",
+        "common.Profile",
+        "common.User",
+        "companies.CompanyProfile",
+        "contacts.Contact",
+    )
+
+    @classmethod
+    def build(cls, request):
+        org = request.profile.org
+        return {
+            "contacts": list(
+                Contact.objects.filter(org=org).values("id", "first_name")
+            ),
+            "status": LEAD_STATUS,
+            "source": LEAD_SOURCE,
+            "companies": CompanySerializer(
+                CompanyProfile.objects.filter(org=org), many=True
+            ).data,
+            # Note: Lead model no longer has tags, but we still include available tags
+            # for other models or potential future use
+            "tags": TagsSerializer(Tags.objects.all(), many=True).data,
+            "users": list(
+                Profile.objects.filter(is_active=True, org=org).values(
+                    "id", "user__email"
+                )
+            ),
+            "countries": COUNTRIES,
+            "industries": INDCHOICES,
+        }
+
+    @extend_schema(tags=["Leads"], parameters=swagger_params1.organization_params)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class LeadListView(CsvExportMixin, APIView, LimitOffsetPagination):
     model = Lead
     permission_classes = (IsAuthenticated,)
+    export_filename = "leads_export.csv"
+    export_columns = (
+        ("Title", "lead_title"),
+        ("Status", "status"),
+        ("Source", "lead_source"),
+        ("Amount", "amount"),
+        ("Probability", "probability"),
+        ("Contact", export.full_name("contact")),
+        ("Email", "contact.primary_email"),
+        ("Phone", "contact.mobile_number"),
+        ("Company", "company.name"),
+        ("Assigned To", "assigned_to.user.email"),
+        ("Description", "description"),
+        ("Created At", "created_at"),
+    )
+    export_select_related = ("contact", "company", "assigned_to__user")
 
-    def get_context_data(self, **kwargs):
+    def get_queryset(self):
+        """
+        ``(queryset, search_annotations)``: the leads the filters of the
+        request select, and the annotations ranking them when searching
+        """
         params = self.request.query_params
         queryset = (
             self.model.objects.filter(
@@ -75,20 +155,11 @@ class LeadListView(APIView, LimitOffsetPagination):
             )
 
             # ✅ Enhanced filters (this is what you want to add)
+        # full-text search on PostgreSQL, icontains elsewhere (leads/search.py)
+        search_annotations = {}
         if search := params.get("search"):
-            queryset = queryset.select_related("contact", "company").filter(
-                Q(lead_title__icontains=search)  # Add search by lead_title
-                | Q(description__icontains=search)
-                | Q(lead_source__icontains=search)
-                | Q(status__icontains=search)
-                | Q(contact__first_name__icontains=search)
-                | Q(
-                    contact__last_name__icontains=search
-                )  # Add search by contact's last name
-                | Q(
-                    contact__primary_email__icontains=search
-                )  # Add search by contact's primary email
-                | Q(company__name__icontains=search)
+            queryset, search_annotations = search_leads(
+                queryset.select_related("contact", "company"), search
             )
 
         if params:
@@ -119,68 +190,86 @@ class LeadListView(APIView, LimitOffsetPagination):
                 queryset = queryset.filter(city__icontains=params.get("city"))
             if params.get("email"):
                 queryset = queryset.filter(email__icontains=params.get("email"))
+        return queryset, search_annotations
+
+    def get_filtered_queryset(self):
+        queryset, _ = self.get_queryset()
+        return queryset.distinct()
+
+    def get_context_data(self, **kwargs):
+        queryset, search_annotations = self.get_queryset()
+        # ?fields=/?expand= (common.sparse_fields)
+        queryset = LeadListSerializer.prune_queryset(queryset, self.request)
         context = {}
-        queryset_open = queryset.exclude(status="closed")
-        results_leads_open = self.paginate_queryset(
-            queryset_open.distinct(), self.request, view=self
-        )
-        open_leads = LeadListSerializer(results_leads_open, many=True).data
-        if results_leads_open:
-            offset = queryset_open.filter(id__gte=results_leads_open[-1].id).count()
-            if offset == queryset_open.count():
-                offset = None
+        if KeysetPagination.is_requested(self.request):
+            queryset_open = queryset.exclude(status="closed")
+            queryset_close = queryset.filter(status="closed")
+            paginator = KeysetPagination(self.request)
+            page_open = paginator.paginate(queryset_open.distinct(), bucket="open")
+            page_close = paginator.paginate(queryset_close.distinct(), bucket="close")
+            context["per_page"] = paginator.limit
+            context["open_leads"] = {
+                "leads_count": page_open.count,
+                "open_leads": LeadListSerializer(
+                    page_open.results, many=True, context={"request": self.request}
+                ).data,
+                **page_open.links(),
+            }
+            context["close_leads"] = {
+                "leads_count": page_close.count,
+                "close_leads": LeadListSerializer(
+                    page_close.results, many=True, context={"request": self.request}
+                ).data,
+                **page_close.links(),
+            }
         else:
-            offset = 0
+            context.update(self.get_offset_buckets(queryset, search_annotations))
+        if lookups_requested(self.request):
+            context.update(LeadMetaView.get_payload(self.request))
+        return context
+
+    def get_offset_buckets(self, queryset, search_annotations=None):
+        # counts and pages of both buckets in two queries (common.bucketing),
+        # best matches first when searching
+        self.limit = self.get_limit(self.request)
+        self.offset = self.get_offset(self.request)
+        listing = BucketedListing(
+            queryset,
+            {"close": Q(status="closed"), "open": ~Q(status="closed")},
+            ordering=("-search_rank", "-created_at", "-id")
+            if search_annotations
+            else None,
+            annotations=search_annotations,
+        )
+        counts = listing.counts()
+        pages = listing.pages(self.limit, {"open": self.offset, "close": self.offset})
+
+        context = {}
         context["per_page"] = 10
         page_number = (int(self.offset / 10) + 1,)
         context["page_number"] = page_number
         context["open_leads"] = {
-            "leads_count": self.count,
-            "open_leads": open_leads,
-            "offset": offset,
+            "leads_count": counts["open"],
+            "open_leads": LeadListSerializer(
+                pages["open"], many=True, context={"request": self.request}
+            ).data,
+            "offset": listing.next_offset(self.offset, pages["open"], counts["open"]),
         }
-
-        queryset_close = queryset.filter(status="closed")
-        results_leads_close = self.paginate_queryset(
-            queryset_close.distinct(), self.request, view=self
-        )
-        close_leads = LeadListSerializer(results_leads_close, many=True).data
-        if results_leads_close:
-            offset = queryset_close.filter(id__gte=results_leads_close[-1].id).count()
-            if offset == queryset_close.count():
-                offset = None
-        else:
-            offset = 0
-
         context["close_leads"] = {
-            "leads_count": self.count,
-            "close_leads": close_leads,
-            "offset": offset,
+            "leads_count": counts["close"],
+            "close_leads": LeadListSerializer(
+                pages["close"], many=True, context={"request": self.request}
+            ).data,
+            "offset": listing.next_offset(
+                self.offset, pages["close"], counts["close"]
+            ),
         }
-        contacts = Contact.objects.filter(org=self.request.profile.org).values(
-            "id", "first_name"
-        )
-
-        context["contacts"] = contacts
-        context["status"] = LEAD_STATUS
-        context["source"] = LEAD_SOURCE
-        context["companies"] = CompanySerializer(
-            CompanyProfile.objects.filter(), many=True
-        ).data
-        # Note: Lead model no longer has tags, but we still include available tags in context
-        # for other models or potential future use
-        context["tags"] = TagsSerializer(Tags.objects.all(), many=True).data
-
-        users = Profile.objects.filter(
-            is_active=True, org=self.request.profile.org
-        ).values("id", "user__email")
-        context["users"] = users
-        context["countries"] = COUNTRIES
-        context["industries"] = INDCHOICES
         return context
 
-    @extend_schema(tags=["Leads"], parameters=swagger_params1.lead_list_get_params)
+    @extend_schema(tags=["Leads"], parameters=swagger_params1.lead_list_get_params + cursor_pagination_params + include_lookups_params + export_params)
     def get(self, request, *args, **kwargs):
+        if export.is_requested(request):
+            return self.export_csv()
         context = self.get_context_data(**kwargs)
         return Response(context)
 
@@ -338,10 +427,63 @@ class LeadListView(APIView, LimitOffsetPagination):
         )
 
 
-class LeadDetailView(APIView):
+@extend_schema_view(
+    post=extend_schema(
+        tags=["Leads"],
+        description="Create up to BULK_WRITE_MAX_ITEMS leads",
+        parameters=swagger_params1.organization_params,
+        request=BulkItemsSwaggerSerializer,
+    ),
+    patch=extend_schema(
+        tags=["Leads"],
+        description="Update up to BULK_WRITE_MAX_ITEMS leads",
+        parameters=swagger_params1.organization_params,
+        request=BulkItemsSwaggerSerializer,
+    ),
+    delete=extend_schema(
+        tags=["Leads"],
+        description="Delete up to BULK_WRITE_MAX_ITEMS leads",
+        parameters=swagger_params1.organization_params,
+        request=BulkIdsSwaggerSerializer,
+    ),
+)
+class LeadBulkView(BulkWriteView):
+    model = Lead
+    serializer_class = LeadBulkSerializer
+    relations = {"contact": Contact, "company": CompanyProfile, "assigned_to": Profile}
+    search_entity = "lead"
+
+    def get_serializer_kwargs(self, request):
+        return {"request_obj": request}
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if (
+            request.profile.role not in ["ADMIN", "MANAGER"]
+            and not request.user.is_superuser
+        ):
+            queryset = queryset.filter(
+                Q(created_by=request.profile.user) | Q(assigned_to=request.profile)
+            )
+        return queryset
+
+    def rows_written(self, request, pks, created):
+        super().rows_written(request, pks, created)
+        search.update_search_vectors(Lead.objects.filter(pk__in=pks))
+
+
+class LeadDetailView(ConditionalGetMixin, APIView):
     model = Lead
     # authentication_classes = (CustomDualAuthentication,)
     permission_classes = (IsAuthenticated,)
+    conditional_related = (
+        "contact",
+        "company",
+        "assigned_to",
+        "leads_comments",
+        "lead_attachment",
+    )
+    conditional_dependencies = ("common.Profile", "common.User", "teams.Teams")
 
     def get_object(self, pk):
         return get_object_or_404(Lead, id=pk)
@@ -417,7 +559,9 @@ class LeadDetailView(APIView):
         users_excluding_team = Profile.objects.filter(id__in=users_excluding_team_id)
         context.update(
             {
-                "lead_obj": LeadSerializer(self.lead_obj).data,
+                "lead_obj": LeadSerializer(
+                    self.lead_obj, context={"request": self.request}
+                ).data,
                 "attachments": AttachmentsSerializer(attachments, many=True).data,
                 "comments": LeadCommentSerializer(comments, many=True).data,
                 "users_mention": users_mention,
@@ -431,7 +575,10 @@ class LeadDetailView(APIView):
         context["source"] = LEAD_SOURCE
         context["status"] = LEAD_STATUS
         context["teams"] = TeamsSerializer(
-            Teams.objects.filter(org=self.request.profile.org), many=True
+            TeamsSerializer.prefetch_plan(
+                Teams.objects.filter(org=self.request.profile.org)
+            ),
+            many=True,
         ).data
         context["countries"] = COUNTRIES
         context["converted"] = self.lead_obj.converted
@@ -467,8 +614,11 @@ class LeadDetailView(APIView):
                     status=status.HTTP_403_FORBIDDEN,
                 )
 
+        headers = self.get_conditional_headers(request, self.lead_obj)
+        if self.is_not_modified(request, headers):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
         context = self.get_context_data(**kwargs)
-        return Response(context)
+        return Response(context, headers=headers)
 
     @extend_schema(
         tags=["Leads"],
@@ -525,7 +675,9 @@ class LeadDetailView(APIView):
         )
         context.update(
             {
-                "lead_obj": LeadSerializer(self.lead_obj).data,
+                "lead_obj": LeadSerializer(
+                    self.lead_obj, context={"request": self.request}
+                ).data,
                 "attachments": AttachmentsSerializer(attachments, many=True).data,
                 "comments": LeadCommentSerializer(comments, many=True).data,
             }
@@ -734,16 +886,21 @@ class LeadUploadView(APIView):
     def post(self, request, *args, **kwargs):
         lead_form = LeadListForm(request.POST, request.FILES)
         if lead_form.is_valid():
-            create_lead_from_file.delay(
-                lead_form.validated_rows,
-                lead_form.invalid_rows,
-                request.profile.id,
-                request.get_host(),
-                request.profile.org.id,
-            )
+            with lead_form.normalized_file as normalized:
+                job = LeadImportJob.objects.create(
+                    org=request.profile.org,
+                    file=normalized,
+                    file_name=normalized.name,
+                    total_rows=lead_form.total_rows,
+                )
+            transaction.on_commit(lambda: create_lead_from_file.delay(str(job.id)))
             return Response(
-                {"error": False, "message": "Leads created Successfully"},
-                status=status.HTTP_200_OK,
+                {
+                    "error": False,
+                    "message": "Leads import queued",
+                    "job": LeadImportJobSerializer(job).data,
+                },
+                status=status.HTTP_202_ACCEPTED,
             )
         return Response(
             {"error": True, "errors": lead_form.errors},
@@ -751,6 +908,36 @@ class LeadUploadView(APIView):
         )
 
 
+class LeadImportJobView(APIView):
+    """Progress and failed rows of a lead import queued by LeadUploadView"""
+
+    permission_classes = (IsAuthenticated,)
+
+    @extend_schema(
+        tags=["Leads"],
+        parameters=swagger_params1.organization_params,
+        responses={200: LeadImportJobSerializer},
+    )
+    def get(self, request, pk, *args, **kwargs):
+        job = get_object_or_404(LeadImportJob, pk=pk, org=request.profile.org)
+        if (
+            request.profile.role not in ["ADMIN", "MANAGER"]
+            and not request.user.is_superuser
+            and job.created_by_id != request.user.id
+        ):
+            return Response(
+                {
+                    "error": True,
+                    "errors": "You do not have Permission to perform this action",
+                },
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        return Response(
+            {"error": False, "job": LeadImportJobSerializer(job).data},
+            status=status.HTTP_200_OK,
+        )
+
+
 class LeadCommentView(APIView):
     model = Comment
     # authentication_classes = (CustomDualAuthentication,)
@@ -923,7 +1110,7 @@ class CreateLeadFromSite(APIView):
         api_key = params.get("apikey")
         # api_setting = APISettings.objects.filter(
         #     website=website_address, apikey=api_key).first()
-        api_setting = APISettings.objects.filter(apikey=api_key).first()
+        api_setting = api_keys.resolve_site_api_key(api_key)
         if not api_setting:
             return Response(
                 {
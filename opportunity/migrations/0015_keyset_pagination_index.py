@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_keyset_pagination_index'),
+        ('common', '0016_keyset_pagination_index'),
+        ('contacts', '0011_keyset_pagination_index'),
+        ('leads', '0010_keyset_pagination_index'),
+        ('opportunity', '0014_alter_opportunity_stage'),
+        ('teams', '0003_alter_teams_created_by'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='opportunity',
+            index=models.Index(fields=['org', 'created_at', 'id'], name='opportunity_org_id_45e5fd_idx'),
+        ),
+    ]
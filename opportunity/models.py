@@ -132,6 +132,10 @@ class Opportunity(BaseModel):
         verbose_name_plural = "Opportunities"
         db_table = "opportunity"
         ordering = ("-created_at",)
+        indexes = [
+            # keyset pagination (common.pagination.KeysetPagination)
+            models.Index(fields=["org", "created_at", "id"]),
+        ]
 
     def __str__(self):
         return f"{self.name}"
@@ -1,17 +1,20 @@
 from venv import create
+from django.db.models import Prefetch
 from rest_framework import serializers
 from companies.serializer import CompanyDetailSerializer
-from contacts.serializer import ContactSerializer
+from contacts.serializer import ContactListSerializer, ContactSerializer
 from django.utils import timezone
 from accounts.models import Tags
 from accounts.serializer import AccountSerializer
 from common.serializer import AttachmentsSerializer, ProfileSerializer, UserSerializer
+from common.sparse_fields import SparseFieldsMixin
 from contacts.serializer import ContactSerializer
 from opportunity.models import Opportunity
 from teams.serializer import TeamsSerializer
 from common.utils import PIPELINE_CONFIG
 from common.models import Attachments
 from companies.serializer import CompanyListSerializer
+from leads.serializer import CompanySerializer, LeadListSerializer
 
 
 class TagsSerializer(serializers.ModelSerializer):
@@ -20,22 +23,7 @@ class TagsSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "slug")
 
 
-from rest_framework import serializers
-from opportunity.models import Opportunity
-from accounts.models import Tags
-from accounts.serializer import AccountSerializer
-from common.serializer import AttachmentsSerializer, ProfileSerializer, UserSerializer
-from contacts.serializer import ContactSerializer
-from teams.serializer import TeamsSerializer
-
-
-class TagsSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Tags
-        fields = ("id", "name", "slug")
-
-
-class OpportunitySerializer(serializers.ModelSerializer):
+class OpportunitySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     company_name = serializers.CharField(source="company.name", read_only=True)
     closed_by = ProfileSerializer()
     created_by = UserSerializer()
@@ -53,6 +41,12 @@ class OpportunitySerializer(serializers.ModelSerializer):
     feedback = serializers.CharField(allow_blank=True, required=False)
     comments = serializers.SerializerMethodField()
 
+    method_field_relations = {
+        "company": ("lead", "account"),
+        "contact": ("lead", "contacts"),
+        "lead": ("lead",),
+        "comments": ("opportunity_comments",),
+    }
 
     class Meta:
         model = Opportunity
@@ -137,6 +131,140 @@ class OpportunitySerializer(serializers.ModelSerializer):
         return CommentSerializer(comments, many=True).data
 
 
+class OpportunityListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Row of the opportunity list pages. Every field is read from the rows
+    loaded by ``prefetch_plan``, so a page costs the same number of queries
+    whatever its size. The lead, contacts and company are summaries and the
+    teams are ids, ``OpportunitySerializer`` (detail view) nests them fully.
+    """
+
+    closed_by = ProfileSerializer(read_only=True)
+    created_by = UserSerializer(read_only=True)
+    tags = TagsSerializer(read_only=True, many=True)
+    assigned_to = ProfileSerializer(read_only=True, many=True)
+    contacts = ContactListSerializer(read_only=True, many=True)
+    teams = serializers.PrimaryKeyRelatedField(read_only=True, many=True)
+    opportunity_attachment = AttachmentsSerializer(many=True, read_only=True)
+    days_to_close = serializers.SerializerMethodField()
+    company = serializers.SerializerMethodField()
+    company_name = serializers.SerializerMethodField()
+    contact = serializers.SerializerMethodField()
+    lead = LeadListSerializer(read_only=True)
+    comments = serializers.SerializerMethodField()
+
+    method_field_relations = {
+        "company": ("lead", "account"),
+        "company_name": ("lead", "account"),
+        "contact": ("lead", "contacts"),
+        "comments": ("opportunity_comments",),
+    }
+    select_related = (
+        "created_by",
+        "closed_by__user",
+        "closed_by__address",
+        "account__company",
+        "lead__company",
+        "lead__contact__company",
+        "lead__assigned_to__user",
+    )
+
+    class Meta:
+        model = Opportunity
+        fields = (
+            "id",
+            "name",
+            "stage",
+            "currency",
+            "amount",
+            "lead_source",
+            "probability",
+            "contacts",
+            "closed_by",
+            "closed_on",
+            "description",
+            "assigned_to",
+            "created_by",
+            "created_at",
+            "is_active",
+            "tags",
+            "opportunity_attachment",
+            "teams",
+            "created_on_arrow",
+            "account",
+            "expected_revenue",
+            "expected_close_date",
+            "meeting_date",
+            "attachment_links",
+            "days_to_close",
+            "company",
+            "contact",
+            "company_name",
+            "lead",
+            "feedback",
+            "comments",
+        )
+
+    @classmethod
+    def prefetch_plan(cls, queryset):
+        """``queryset`` loading everything the serializer reads"""
+        from common.models import Comment, Profile
+        from contacts.models import Contact
+
+        return queryset.select_related(*cls.select_related).prefetch_related(
+            "tags",
+            "teams",
+            "opportunity_attachment",
+            Prefetch(
+                "assigned_to",
+                queryset=Profile.objects.select_related("user", "address"),
+            ),
+            Prefetch(
+                "contacts",
+                queryset=Contact.objects.select_related("company").order_by("pk"),
+            ),
+            Prefetch(
+                "opportunity_comments",
+                queryset=Comment.objects.select_related(
+                    "commented_by__user"
+                ).order_by("-created_at"),
+            ),
+        )
+
+    def _company(self, obj):
+        if obj.lead and obj.lead.company:
+            return obj.lead.company
+        if obj.account and obj.account.company:
+            return obj.account.company
+        return None
+
+    def get_days_to_close(self, obj):
+        if obj.expected_close_date and obj.created_at:
+            return (obj.expected_close_date - obj.created_at.date()).days
+        return None
+
+    def get_company(self, obj):
+        company = self._company(obj)
+        return CompanySerializer(company).data if company else None
+
+    def get_company_name(self, obj):
+        company = self._company(obj)
+        return company.name if company else None
+
+    def get_contact(self, obj):
+        if obj.lead and obj.lead.contact:
+            contact = obj.lead.contact
+        else:
+            # prefetched, .first() would query again
+            contact = next(iter(obj.contacts.all()), None)
+        return ContactListSerializer(contact).data if contact else None
+
+    def get_comments(self, obj):
+        from common.serializer import CommentSerializer
+
+        return CommentSerializer(obj.opportunity_comments.all(), many=True).data
+
+
 class OpportunityCreateSerializer(serializers.ModelSerializer):
     probability = serializers.IntegerField(max_value=100)
     closed_on = serializers.DateField
@@ -393,11 +521,40 @@ class OpportunityDashboardSerializer(serializers.ModelSerializer):
         if hasattr(obj, "lead") and obj.lead and hasattr(obj.lead, "company") and obj.lead.company:
             return obj.lead.company.name
 
-        # Если нет lead, проверяем первый контакт
-        elif obj.contacts.exists():
-            contact = obj.contacts.first()
-            if contact and contact.company:
-                return contact.company.name
+        # Если нет lead, проверяем первый контакт (uses the prefetched contacts)
+        contact = next(iter(obj.contacts.all()), None)
+        if contact and contact.company:
+            return contact.company.name
 
         return ""
 
+
+
+class OpportunityBoardSerializer(serializers.ModelSerializer):
+    """Card of the pipeline board, expects lead__company and assigned_to to be loaded"""
+
+    stage_display = serializers.CharField(source="get_stage_display", read_only=True)
+    company_name = serializers.SerializerMethodField()
+    assigned_to = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+    class Meta:
+        model = Opportunity
+        fields = (
+            "id",
+            "name",
+            "stage",
+            "stage_display",
+            "amount",
+            "currency",
+            "probability",
+            "expected_revenue",
+            "expected_close_date",
+            "assigned_to",
+            "company_name",
+            "created_at",
+        )
+
+    def get_company_name(self, obj):
+        if obj.lead and obj.lead.company:
+            return obj.lead.company.name
+        return None
@@ -43,10 +43,9 @@ def handle_opportunity_closed_won(sender, instance, **kwargs):
                         # Link opportunity to existing account
                         instance.account = existing_account
                         # Update the account's updated_at and updated_by
-                        existing_account.updated_at = timezone.now()
-                        if hasattr(instance, "_current_user"):
-                            existing_account.updated_by = instance._current_user
-                        existing_account.save()
+                        Account.audited.as_user(
+                            getattr(instance, "_current_user", None)
+                        ).filter(pk=existing_account.pk).update()
                     else:
                         # Create new account for the company
                         new_account = Account.objects.create(
@@ -19,6 +19,18 @@ opportunity_list_get_params = [
     OpenApiParameter("tags", OpenApiTypes.STR,OpenApiParameter.QUERY),
 ]
 
+opportunity_board_get_params = [
+    organization_params_in_header,
+    OpenApiParameter("name", OpenApiTypes.STR,OpenApiParameter.QUERY),
+    OpenApiParameter("account", OpenApiTypes.STR,OpenApiParameter.QUERY),
+    OpenApiParameter(
+        "column", OpenApiTypes.STR, OpenApiParameter.QUERY,
+        description="Stage of the column to page, all columns when missing",
+    ),
+    OpenApiParameter("offset", OpenApiTypes.INT,OpenApiParameter.QUERY),
+    OpenApiParameter("limit", OpenApiTypes.INT,OpenApiParameter.QUERY),
+]
+
 opportunity_detail_get_params = [
     organization_params_in_header,
     OpenApiParameter(
@@ -0,0 +1,144 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from common.models import Comment
+from common.testing import OrgAPITestCase
+from companies.models import CompanyProfile
+from contacts.models import Contact
+from leads.models import Lead
+from opportunity.models import Opportunity
+
+
+class OpportunityBoardTestCase(OrgAPITestCase):
+    org_name = "Board Org"
+    email = "board@example.com"
+
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            opportunity = Opportunity.objects.create(
+                name=f"Deal {i}",
+                stage="PROPOSAL" if i < 3 else "CLOSED WON",
+                org=self.org,
+            )
+            opportunity.assigned_to.add(self.profile)
+
+    def test_board_columns(self):
+        response = self.client.get("/api/opportunities/board/", {"limit": 2})
+        self.assertEqual(response.status_code, 200)
+        columns = {column["stage"]: column for column in response.data["columns"]}
+        self.assertEqual(columns["PROPOSAL"]["count"], 3)
+        self.assertEqual(columns["PROPOSAL"]["offset"], 2)
+        self.assertEqual(len(columns["PROPOSAL"]["opportunities"]), 2)
+        self.assertEqual(columns["NEGOTIATION"]["count"], 0)
+
+        response = self.client.get(
+            "/api/opportunities/board/", {"column": "PROPOSAL", "offset": 2}
+        )
+        self.assertEqual(len(response.data["columns"]), 1)
+        self.assertEqual(
+            response.data["columns"][0]["opportunities"][0]["name"], "Deal 0"
+        )
+
+
+class OpportunityListTestCase(OrgAPITestCase):
+    org_name = "List Org"
+    email = "list@example.com"
+
+    def setUp(self):
+        super().setUp()
+        member = self.create_member("rep@example.com", "+15550000001")
+        for i in range(6):
+            company = CompanyProfile.objects.create(
+                name=f"Company {i}",
+                email=f"info@company{i}.example.com",
+                website=f"company{i}.example.com",
+                phone=f"+1555000010{i}",
+                org=self.org,
+            )
+            contact = Contact.objects.create(
+                first_name="Contact",
+                last_name=str(i),
+                primary_email=f"contact{i}@example.com",
+                company=company,
+                org=self.org,
+            )
+            lead = Lead.objects.create(
+                lead_title=f"Lead {i}",
+                company=company,
+                contact=contact,
+                assigned_to=member,
+                organization=self.org,
+            )
+            opportunity = Opportunity.objects.create(
+                name=f"Deal {i}", stage="PROPOSAL", lead=lead, org=self.org
+            )
+            opportunity.contacts.add(contact)
+            opportunity.assigned_to.add(self.profile, member)
+            for text in ("first", "second"):
+                Comment.objects.create(
+                    comment=f"{text} {i}", opportunity=opportunity, commented_by=member
+                )
+
+    def list_queries(self, limit):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/opportunities/", {"limit": limit})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["opportunities"]), limit)
+        return len(queries), response.data["opportunities"]
+
+    def test_page_size_does_not_change_query_count(self):
+        self.list_queries(1)  # warm the profile and lookup caches
+        small, _ = self.list_queries(2)
+        large, rows = self.list_queries(6)
+        self.assertEqual(small, large)
+
+        row = rows[0]
+        self.assertEqual(row["company"]["name"], row["company_name"])
+        self.assertEqual(row["lead"]["company_name"], row["company_name"])
+        self.assertEqual(row["contact"]["company_name"], row["company_name"])
+        self.assertEqual(len(row["assigned_to"]), 2)
+        self.assertEqual(
+            [comment["comment"][:6] for comment in row["comments"]],
+            ["second", "first "],
+        )
+
+    def test_detail_keeps_nested_lead(self):
+        opportunity = Opportunity.objects.get(name="Deal 0")
+        response = self.client.get(f"/api/opportunities/{opportunity.id}/")
+        self.assertEqual(response.status_code, 200)
+        lead = response.data["opportunity_obj"]["lead"]
+        self.assertEqual(lead["company"]["name"], "Company 0")
+        self.assertIn("lead_attachment", lead)
+
+    def test_sparse_fields(self):
+        self.list_queries(1)
+        full, _ = self.list_queries(6)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                "/api/opportunities/", {"limit": 6, "fields": "id,name,lead"}
+            )
+        self.assertEqual(response.status_code, 200)
+        row = response.data["opportunities"][0]
+        self.assertEqual(set(row), {"id", "name", "lead"})
+        lead = Opportunity.objects.get(id=row["id"]).lead_id
+        self.assertEqual(str(row["lead"]), str(lead))
+        self.assertLess(len(queries), full)
+
+        response = self.client.get(
+            "/api/opportunities/", {"fields": "id,lead", "expand": "lead"}
+        )
+        row = response.data["opportunities"][0]
+        lead = Opportunity.objects.get(id=row["id"]).lead
+        self.assertEqual(row["lead"]["lead_title"], lead.lead_title)
+        self.assertEqual(row["lead"]["company_name"], lead.company.name)
+
+        opportunity = Opportunity.objects.get(name="Deal 0")
+        response = self.client.get(
+            f"/api/opportunities/{opportunity.id}/", {"fields": "id,name,contacts"}
+        )
+        contact = Contact.objects.get(last_name="0")
+        self.assertEqual(
+            response.data["opportunity_obj"],
+            {"id": str(opportunity.id), "name": "Deal 0", "contacts": [contact.id]},
+        )
@@ -6,6 +6,8 @@ app_name = "api_opportunities"
 
 urlpatterns = [
     path("", views.OpportunityListView.as_view()),
+    path("meta/", views.OpportunityMetaView.as_view()),
+    path("board/", views.OpportunityBoardView.as_view()),
     path("<str:pk>/", views.OpportunityDetailView.as_view()),
     path("<str:pk>/pipeline/", views.OpportunityPipelineView.as_view()),
     path("comment/<str:pk>/", views.OpportunityCommentView.as_view()),
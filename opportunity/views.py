@@ -12,7 +12,18 @@ from rest_framework.views import APIView
 
 from accounts.models import Account, Tags
 from accounts.serializer import AccountSerializer, TagsSerailizer
+from common import export
+from common.bucketing import BucketedListing
+from common.conditional_get import ConditionalGetMixin
+from common.export import CsvExportMixin
 from common.models import Attachments, Comment, Profile, User
+from common.pagination import KeysetPagination
+from common.reference_data import ReferenceDataView, lookups_requested
+from common.swagger_params1 import (
+    cursor_pagination_params,
+    export_params,
+    include_lookups_params,
+)
 from common.serializer import (
     AttachmentsSerializer,
     CommentSerializer,
@@ -29,22 +40,99 @@ from opportunity.tasks import send_email_to_assigned_user
 from teams.models import Teams
 
 
-class OpportunityListView(APIView, LimitOffsetPagination):
+# buckets of the opportunity list
+OPPORTUNITY_LIST_BUCKETS = {
+    "closed_won": Q(stage="CLOSED WON"),
+    "closed_lost": Q(stage="CLOSED LOST"),
+    "active": ~Q(stage__in=["CLOSED WON", "CLOSED LOST"]),
+}
+
+
+class OpportunityMetaView(ReferenceDataView):
+    """Lookups used by the opportunity list and forms, see common.reference_data"""
+
+    entity = "opportunities"
+    dependencies = (
+        "accounts.Account",
+        "accounts.Tags",
+        "common.Address",
+        "common.Attachments",
+        "common.Org",
+        "common.Profile",
+        "common.User",
+        "companies.CompanyProfile",
+        "contacts.Contact",
+        "leads.Lead",
+        "teams.Teams",
+    )
+
+    @classmethod
+    def is_restricted(cls, request):
+        return (
+            request.profile.role not in ["ADMIN", "MANAGER"]
+            and not request.user.is_superuser
+        )
+
+    @classmethod
+    def get_scope(cls, request):
+        return str(request.profile.id) if cls.is_restricted(request) else "all"
+
+    @classmethod
+    def build(cls, request):
+        accounts = Account.objects.filter(org=request.profile.org)
+        contacts = Contact.objects.filter(org=request.profile.org)
+        if cls.is_restricted(request):
+            accounts = accounts.filter(
+                Q(created_by=request.profile.user) | Q(assigned_to=request.profile)
+            ).distinct()
+            contacts = contacts.filter(
+                Q(created_by=request.profile.user) | Q(assigned_to=request.profile)
+            ).distinct()
+        return {
+            "accounts_list": AccountSerializer(accounts, many=True).data,
+            "contacts_list": ContactSerializer(contacts, many=True).data,
+            "tags": TagsSerailizer(Tags.objects.filter(), many=True).data,
+            "stage": STAGES,
+            "lead_source": SOURCES,
+        }
+
+    @extend_schema(
+        tags=["Opportunities"], parameters=swagger_params1.organization_params
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class OpportunityListView(CsvExportMixin, APIView, LimitOffsetPagination):
     # authentication_classes = (CustomDualAuthentication,)
     permission_classes = (IsAuthenticated,)
     model = Opportunity
+    export_filename = "opportunities_export.csv"
+    export_columns = (
+        ("Name", "name"),
+        ("Stage", "stage"),
+        ("Amount", "amount"),
+        ("Currency", "currency"),
+        ("Probability", "probability"),
+        ("Expected Revenue", "expected_revenue"),
+        ("Expected Close Date", "expected_close_date"),
+        ("Lead Source", "lead_source"),
+        ("Account", "account.name"),
+        ("Company", "lead.company.name"),
+        ("Contacts", export.full_names("contacts")),
+        ("Assigned To", export.profile_names("assigned_to")),
+        ("Created At", "created_at"),
+    )
+    export_select_related = ("account", "lead__company")
+    export_prefetch_related = ("contacts", "assigned_to__user")
 
-    def get_context_data(self, **kwargs):
+    def get_queryset(self):
+        """The opportunities the filters of the request select"""
         params = self.request.query_params
         # Include all opportunities regardless of stage (including CLOSED WON and CLOSED LOST)
-        queryset = self.model.objects.filter(org=self.request.profile.org).select_related(
-            'created_by', 'closed_by', 'account', 'lead'
-        ).prefetch_related(
-            'assigned_to', 'contacts', 'teams', 'tags', 'opportunity_attachment',
-            'opportunity_comments__commented_by'
+        queryset = OpportunityListSerializer.prefetch_plan(
+            self.model.objects.filter(org=self.request.profile.org)
         ).order_by("-id")
-        accounts = Account.objects.filter(org=self.request.profile.org)
-        contacts = Contact.objects.filter(org=self.request.profile.org)
         if (
             self.request.profile.role not in ["ADMIN", "MANAGER"]
             and not self.request.user.is_superuser
@@ -53,14 +141,6 @@ class OpportunityListView(APIView, LimitOffsetPagination):
                 Q(created_by=self.request.profile.user)
                 | Q(assigned_to=self.request.profile)
             ).distinct()
-            accounts = accounts.filter(
-                Q(created_by=self.request.profile.user)
-                | Q(assigned_to=self.request.profile)
-            ).distinct()
-            contacts = contacts.filter(
-                Q(created_by=self.request.profile.user)
-                | Q(assigned_to=self.request.profile)
-            ).distinct()
 
         if params:
             if params.get("name"):
@@ -75,95 +155,137 @@ class OpportunityListView(APIView, LimitOffsetPagination):
                 )
             if params.get("tags"):
                 queryset = queryset.filter(tags__in=params.get("tags")).distinct()
+        return queryset
 
+    def get_context_data(self, **kwargs):
         context = {}
+        # ?fields=/?expand= (common.sparse_fields)
+        queryset = OpportunityListSerializer.prune_queryset(
+            self.get_queryset(), self.request
+        )
 
         # Separate opportunities by status
-        # Active opportunities (excluding CLOSED WON and CLOSED LOST)
-        active_queryset = queryset.exclude(stage__in=["CLOSED WON", "CLOSED LOST"])
-        results_opportunities = self.paginate_queryset(
-            active_queryset.distinct(), self.request, view=self
-        )
-        opportunities = OpportunitySerializer(results_opportunities, many=True).data
-        if results_opportunities:
-            offset = active_queryset.filter(
-                id__gte=results_opportunities[-1].id
-            ).count()
-            if offset == active_queryset.count():
-                offset = None
+        if KeysetPagination.is_requested(self.request):
+            # Active opportunities (excluding CLOSED WON and CLOSED LOST)
+            active_queryset = queryset.filter(OPPORTUNITY_LIST_BUCKETS["active"])
+            closed_won_queryset = queryset.filter(OPPORTUNITY_LIST_BUCKETS["closed_won"])
+            closed_lost_queryset = queryset.filter(
+                OPPORTUNITY_LIST_BUCKETS["closed_lost"]
+            )
+            paginator = KeysetPagination(self.request)
+            page = paginator.paginate(active_queryset.distinct(), bucket="active")
+            won_page = paginator.paginate(
+                closed_won_queryset.distinct(), bucket="closed_won"
+            )
+            lost_page = paginator.paginate(
+                closed_lost_queryset.distinct(), bucket="closed_lost"
+            )
+            context["per_page"] = paginator.limit
+            context.update(
+                {
+                    "opportunities_count": page.count,
+                    "closed_won_count": won_page.count,
+                    "closed_lost_count": lost_page.count,
+                    "total_opportunities_count": (
+                        page.count + won_page.count + lost_page.count
+                        if page.count is not None
+                        else None
+                    ),
+                    **page.links(),
+                }
+            )
+            context["opportunities"] = OpportunityListSerializer(
+                page.results,
+                many=True,
+                context={"request": self.request},
+            ).data
+            context["closed_won_opportunities"] = {
+                "opportunities": OpportunityListSerializer(
+                    won_page.results,
+                    many=True,
+                    context={"request": self.request},
+                ).data,
+                "total_count": won_page.count,
+                **won_page.links(),
+            }
+            context["closed_lost_opportunities"] = {
+                "opportunities": OpportunityListSerializer(
+                    lost_page.results,
+                    many=True,
+                    context={"request": self.request},
+                ).data,
+                "total_count": lost_page.count,
+                **lost_page.links(),
+            }
         else:
-            offset = 0
+            context.update(self.get_offset_buckets(queryset))
+        if lookups_requested(self.request):
+            context.update(OpportunityMetaView.get_payload(self.request))
 
-        # CLOSED WON opportunities
-        closed_won_queryset = queryset.filter(stage="CLOSED WON")
-        results_closed_won = self.paginate_queryset(
-            closed_won_queryset.distinct(), self.request, view=self
-        )
-        closed_won_opportunities = OpportunitySerializer(
-            results_closed_won, many=True
-        ).data
-        if results_closed_won:
-            closed_won_offset = closed_won_queryset.filter(
-                id__gte=results_closed_won[-1].id
-            ).count()
-            if closed_won_offset == closed_won_queryset.count():
-                closed_won_offset = None
-        else:
-            closed_won_offset = 0
+        return context
 
-        # CLOSED LOST opportunities
-        closed_lost_queryset = queryset.filter(stage="CLOSED LOST")
-        results_closed_lost = self.paginate_queryset(
-            closed_lost_queryset.distinct(), self.request, view=self
+    def get_offset_buckets(self, queryset):
+        # counts and pages of the three buckets in two queries (common.bucketing)
+        self.limit = self.get_limit(self.request)
+        self.offset = self.get_offset(self.request)
+        listing = BucketedListing(queryset, OPPORTUNITY_LIST_BUCKETS)
+        counts = listing.counts()
+        pages = listing.pages(
+            self.limit, {name: self.offset for name in OPPORTUNITY_LIST_BUCKETS}
         )
-        closed_lost_opportunities = OpportunitySerializer(
-            results_closed_lost, many=True
-        ).data
-        if results_closed_lost:
-            closed_lost_offset = closed_lost_queryset.filter(
-                id__gte=results_closed_lost[-1].id
-            ).count()
-            if closed_lost_offset == closed_lost_queryset.count():
-                closed_lost_offset = None
-        else:
-            closed_lost_offset = 0
 
+        context = {}
         context["per_page"] = 10
         page_number = (int(self.offset / 10) + 1,)
         context["page_number"] = page_number
         context.update(
             {
-                "opportunities_count": active_queryset.count(),  # Active opportunities count
-                "offset": offset,
-                "closed_won_count": closed_won_queryset.count(),
-                "closed_lost_count": closed_lost_queryset.count(),
-                "total_opportunities_count": queryset.count(),  # Total count of all opportunities
+                "opportunities_count": counts["active"],  # Active opportunities count
+                "offset": listing.next_offset(
+                    self.offset, pages["active"], counts["active"]
+                ),
+                "closed_won_count": counts["closed_won"],
+                "closed_lost_count": counts["closed_lost"],
+                "total_opportunities_count": sum(counts.values()),  # Total count of all opportunities
             }
         )
-        context["opportunities"] = opportunities
+        context["opportunities"] = OpportunityListSerializer(
+            pages["active"],
+            many=True,
+            context={"request": self.request},
+        ).data
         context["closed_won_opportunities"] = {
-            "offset": closed_won_offset,
-            "opportunities": closed_won_opportunities,
-            "total_count": closed_won_queryset.count(),
+            "offset": listing.next_offset(
+                self.offset, pages["closed_won"], counts["closed_won"]
+            ),
+            "opportunities": OpportunityListSerializer(
+                pages["closed_won"],
+                many=True,
+                context={"request": self.request},
+            ).data,
+            "total_count": counts["closed_won"],
         }
         context["closed_lost_opportunities"] = {
-            "offset": closed_lost_offset,
-            "opportunities": closed_lost_opportunities,
-            "total_count": closed_lost_queryset.count(),
+            "offset": listing.next_offset(
+                self.offset, pages["closed_lost"], counts["closed_lost"]
+            ),
+            "opportunities": OpportunityListSerializer(
+                pages["closed_lost"],
+                many=True,
+                context={"request": self.request},
+            ).data,
+            "total_count": counts["closed_lost"],
         }
-        context["accounts_list"] = AccountSerializer(accounts, many=True).data
-        context["contacts_list"] = ContactSerializer(contacts, many=True).data
-        context["tags"] = TagsSerailizer(Tags.objects.filter(), many=True).data
-        context["stage"] = STAGES
-        context["lead_source"] = SOURCES
 
         return context
 
     @extend_schema(
         tags=["Opportunities"],
-        parameters=swagger_params1.opportunity_list_get_params,
+        parameters=swagger_params1.opportunity_list_get_params + cursor_pagination_params + include_lookups_params + export_params,
     )
     def get(self, request, *args, **kwargs):
+        if export.is_requested(request):
+            return self.export_csv()
         context = self.get_context_data(**kwargs)
         return Response(context)
 
@@ -277,10 +399,27 @@ class OpportunityListView(APIView, LimitOffsetPagination):
         )
 
 
-class OpportunityDetailView(APIView):
+class OpportunityDetailView(ConditionalGetMixin, APIView):
     # authentication_classes = (CustomDualAuthentication,)
     permission_classes = (IsAuthenticated,)
     model = Opportunity
+    conditional_related = (
+        "lead",
+        "lead__contact",
+        "lead__company",
+        "lead__assigned_to",
+        "lead__leads_comments",
+        "lead__lead_attachment",
+        "account",
+        "closed_by",
+        "contacts",
+        "assigned_to",
+        "teams",
+        "tags",
+        "opportunity_comments",
+        "opportunity_attachment",
+    )
+    conditional_dependencies = ("common.Profile", "common.User")
 
     def get_object(self, pk):
         return self.model.objects.filter(id=pk).first()
@@ -445,8 +584,6 @@ class OpportunityDetailView(APIView):
     def get(self, request, pk, format=None):
         self.opportunity = self.get_object(pk=pk)
         print("opportunity", self.opportunity)
-        context = {}
-        context["opportunity_obj"] = OpportunitySerializer(self.opportunity).data
         if self.opportunity.org != request.profile.org:
             return Response(
                 {"error": True, "errors": "User company doesnot match with header...."},
@@ -468,6 +605,13 @@ class OpportunityDetailView(APIView):
                     status=status.HTTP_403_FORBIDDEN,
                 )
 
+        headers = self.get_conditional_headers(request, self.opportunity)
+        if self.is_not_modified(request, headers):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        context = {}
+        context["opportunity_obj"] = OpportunitySerializer(
+            self.opportunity, context={"request": self.request}
+        ).data
         comment_permission = False
 
         if (
@@ -518,7 +662,7 @@ class OpportunityDetailView(APIView):
                 "users_mention": users_mention,
             }
         )
-        return Response(context)
+        return Response(context, headers=headers)
 
     @extend_schema(
         tags=["Opportunities"],
@@ -575,7 +719,9 @@ class OpportunityDetailView(APIView):
         ).order_by("-id")
         context.update(
             {
-                "opportunity_obj": OpportunitySerializer(self.opportunity_obj).data,
+                "opportunity_obj": OpportunitySerializer(
+                    self.opportunity_obj, context={"request": self.request}
+                ).data,
                 "attachments": AttachmentsSerializer(attachments, many=True).data,
                 "comments": CommentSerializer(comments, many=True).data,
             }
@@ -858,6 +1004,76 @@ class OpportunityAttachmentView(APIView):
             )
 
 
+class OpportunityBoardView(APIView):
+    """
+    Kanban board of the pipeline: one column per stage with its count and
+    first cards. ``?column=<stage>&offset=N`` pages a single column.
+    """
+
+    permission_classes = (IsAuthenticated,)
+    max_limit = 50
+
+    @extend_schema(
+        tags=["Opportunities"],
+        parameters=swagger_params1.opportunity_board_get_params,
+    )
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        queryset = (
+            Opportunity.objects.filter(org=request.profile.org)
+            .select_related("lead__company")
+            .prefetch_related("assigned_to")
+        )
+        if (
+            request.profile.role not in ["ADMIN", "MANAGER"]
+            and not request.user.is_superuser
+        ):
+            queryset = queryset.filter(
+                Q(created_by=request.profile.user) | Q(assigned_to=request.profile)
+            )
+        if params.get("name"):
+            queryset = queryset.filter(name__icontains=params.get("name"))
+        if params.get("account"):
+            queryset = queryset.filter(account=params.get("account"))
+
+        try:
+            limit = min(max(int(params.get("limit", 10)), 1), self.max_limit)
+            offset = max(int(params.get("offset", 0)), 0)
+        except ValueError:
+            return Response(
+                {"error": True, "errors": "limit and offset must be integers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        stages = [stage for stage, _ in STAGES]
+        if params.get("column"):
+            if params.get("column") not in stages:
+                return Response(
+                    {"error": True, "errors": "Unknown column"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            stages = [params.get("column")]
+
+        listing = BucketedListing.by_field(queryset, "stage", stages)
+        counts = listing.counts()
+        pages = listing.pages(limit, {stage: offset for stage in stages})
+
+        labels = dict(STAGES)
+        columns = [
+            {
+                "stage": stage,
+                "label": labels[stage],
+                "count": counts[stage],
+                "offset": listing.next_offset(offset, pages[stage], counts[stage]),
+                "opportunities": OpportunityBoardSerializer(
+                    pages[stage], many=True
+                ).data,
+            }
+            for stage in stages
+        ]
+        return Response({"error": False, "per_page": limit, "columns": columns})
+
+
 class OpportunityPipelineView(APIView):
     """View для работы с Opportunity в pipeline"""
 
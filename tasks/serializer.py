@@ -6,12 +6,13 @@ from common.serializer import (
     ProfileSerializer,
     UserSerializer
 )
+from common.sparse_fields import SparseFieldsMixin
 from contacts.serializer import ContactSerializer
 from tasks.models import Task
 from teams.serializer import TeamsSerializer
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     created_by = UserSerializer()
     assigned_to = ProfileSerializer(read_only=True, many=True)
     contacts = ContactSerializer(read_only=True, many=True)
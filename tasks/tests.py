@@ -0,0 +1,62 @@
+from accounts.models import Account
+from common.testing import OrgAPITestCase
+from contacts.models import Contact
+from tasks.models import Task
+
+
+class TaskSparseFieldsTestCase(OrgAPITestCase):
+    org_name = "Sparse Task Org"
+    email = "sparse-tasks@example.com"
+
+    def setUp(self):
+        super().setUp()
+        self.account = Account.objects.create(
+            name="Initech", email="info@initech.com", org=self.org
+        )
+        self.contact = Contact.objects.create(
+            first_name="Bill",
+            last_name="Lumbergh",
+            primary_email="bill@initech.com",
+            org=self.org,
+        )
+        self.task = Task.objects.create(
+            title="Call back",
+            status="New",
+            priority="Low",
+            account=self.account,
+            org=self.org,
+        )
+        self.task.contacts.add(self.contact)
+
+    def test_list_fields(self):
+        response = self.client.get(
+            "/api/tasks/", {"fields": "id,title,account,contacts"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["tasks"],
+            [
+                {
+                    "id": str(self.task.id),
+                    "title": "Call back",
+                    "account": self.account.id,
+                    "contacts": [self.contact.id],
+                }
+            ],
+        )
+
+        response = self.client.get(
+            "/api/tasks/", {"fields": "id,contacts", "expand": "contacts"}
+        )
+        contacts = response.data["tasks"][0]["contacts"]
+        self.assertEqual([contact["first_name"] for contact in contacts], ["Bill"])
+
+    def test_detail_fields(self):
+        response = self.client.get(
+            f"/api/tasks/{self.task.id}/", {"fields": "id,status,contacts"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["task_obj"],
+            {"id": str(self.task.id), "status": "New", "contacts": [self.contact.id]},
+        )
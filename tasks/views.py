@@ -58,10 +58,14 @@ class TaskListView(APIView, LimitOffsetPagination):
             if params.get("priority"):
                 queryset = queryset.filter(priority=params.get("priority"))
         context = {}
+        # ?fields=/?expand= (common.sparse_fields)
+        queryset = TaskSerializer.prune_queryset(queryset, self.request)
         results_tasks = self.paginate_queryset(
             queryset.distinct(), self.request, view=self
         )
-        tasks = TaskSerializer(results_tasks, many=True).data
+        tasks = TaskSerializer(
+            results_tasks, many=True, context={"request": self.request}
+        ).data
         if results_tasks:
             offset = queryset.filter(id__gte=results_tasks[-1].id).count()
             if offset == queryset.count():
@@ -195,7 +199,9 @@ class TaskDetailView(APIView):
         users_excluding_team = Profile.objects.filter(id__in=users_excluding_team_id)
         context.update(
             {
-                "task_obj": TaskSerializer(self.task_obj).data,
+                "task_obj": TaskSerializer(
+                    self.task_obj, context={"request": self.request}
+                ).data,
                 "attachments": AttachmentsSerializer(attachments, many=True).data,
                 "comments": CommentSerializer(comments, many=True).data,
                 "users_mention": users_mention,
@@ -206,7 +212,9 @@ class TaskDetailView(APIView):
         context["users_excluding_team"] = ProfileSerializer(
             users_excluding_team, many=True
         ).data
-        context["teams"] = TeamsSerializer(Teams.objects.all(), many=True).data
+        context["teams"] = TeamsSerializer(
+            TeamsSerializer.prefetch_plan(Teams.objects.all()), many=True
+        ).data
         return context
 
     @extend_schema(
@@ -258,7 +266,9 @@ class TaskDetailView(APIView):
         )
         context.update(
             {
-                "task_obj": TaskSerializer(self.task_obj).data,
+                "task_obj": TaskSerializer(
+                    self.task_obj, context={"request": self.request}
+                ).data,
                 "attachments": AttachmentsSerializer(attachments, many=True).data,
                 "comments": CommentSerializer(comments, many=True).data,
             }
@@ -1,5 +1,7 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
 
+from common.models import Profile
 from common.serializer import ProfileSerializer,UserSerializer
 from teams.models import Teams
 
@@ -20,6 +22,15 @@ class TeamsSerializer(serializers.ModelSerializer):
             "created_on_arrow",
         )
 
+    @classmethod
+    def prefetch_plan(cls, queryset):
+        """``queryset`` loading the creator and users the serializer reads"""
+        return queryset.select_related("created_by").prefetch_related(
+            Prefetch(
+                "users", queryset=Profile.objects.select_related("user", "address")
+            )
+        )
+
 
 class TeamCreateSerializer(serializers.ModelSerializer):
     
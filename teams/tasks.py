@@ -1,147 +1,138 @@
+"""
+Propagation of the members of a team to the rows assigned to the team.
+
+``TEAM_RELATIONS`` lists the models with a ``teams`` field and the many to
+many field the members go to. The members are written directly to the
+through table of that field, a few statements per chunk of
+``TEAM_PROPAGATION_CHUNK_SIZE`` rows (default 1000) of the team instead of
+an ``add``/``remove`` per row and member: a ``bulk_create`` ignoring the
+pairs already there to add members, one ``DELETE`` to remove them.
+
+The rows of each chunk are stamped as updated (``updated_at``, and
+``updated_by`` when the task is given the user who changed the team) with
+one ``BaseModel.audited`` update. The through table writes skip
+``m2m_changed``, so what its receivers maintain (lookup stamps, search
+entries, dashboard rollups) is refreshed once per model afterwards with
+``common.bulk.refresh_written_rows``.
+"""
+import uuid
+from itertools import islice
+
 from celery import Celery
+from django.apps import apps
 from django.conf import settings
+from django.db import transaction
 
+from common.bulk import refresh_written_rows
 from common.models import Profile
 from teams.models import Teams
 
 app = Celery("crm", broker=settings.CELERY_BROKER_URL)
 
+# model -> many to many field of the members and global_search entity. The
+# assignees of invoices are users, not profiles.
+TEAM_RELATIONS = {
+    "accounts.Account": ("assigned_to", None),
+    "contacts.Contact": ("assigned_to", "contact"),
+    "opportunity.Opportunity": ("assigned_to", "opportunity"),
+    "cases.Case": ("assigned_to", "case"),
+    "common.Document": ("shared_to", None),
+    "tasks.Task": ("assigned_to", None),
+    "invoices.Invoice": ("assigned_to", None),
+    "events.Event": ("assigned_to", None),
+}
+
+
+def chunk_size():
+    return getattr(settings, "TEAM_PROPAGATION_CHUNK_SIZE", 1000)
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _columns(field):
+    """Columns of the row and of the member in the through table of ``field``"""
+    through = field.remote_field.through
+    return (
+        through._meta.get_field(field.m2m_field_name()).attname,
+        through._meta.get_field(field.m2m_reverse_field_name()).attname,
+    )
+
+
+def _member_ids(field, profiles):
+    """Ids of ``profiles`` as targets of ``field``"""
+    if field.related_model is Profile:
+        return [profile.id for profile in profiles]
+    return [profile.user_id for profile in profiles]
+
+
+def _propagate(team, profiles, write, user_id=None):
+    """
+    ``write(through, row_column, member_column, row_ids, member_ids)`` for
+    the rows of the team of every model, by chunk.
+    """
+    for label, (name, search_entity) in TEAM_RELATIONS.items():
+        model = apps.get_model(label)
+        field = model._meta.get_field(name)
+        member_ids = _member_ids(field, profiles)
+        row_ids = list(
+            model._default_manager.filter(teams=team).values_list("pk", flat=True)
+        )
+        if not member_ids or not row_ids:
+            continue
+        through = field.remote_field.through
+        row_column, member_column = _columns(field)
+        for chunk in _chunks(row_ids, chunk_size()):
+            with transaction.atomic():
+                write(through, row_column, member_column, chunk, member_ids)
+                model.audited.as_user(user_id).filter(pk__in=chunk).update()
+        if team.org_id:
+            refresh_written_rows(
+                model, team.org_id, row_ids, search_entity, chunk_size()
+            )
+
+
+def _add(through, row_column, member_column, row_ids, member_ids):
+    through._default_manager.bulk_create(
+        [
+            through(**{row_column: row_id, member_column: member_id})
+            for row_id in row_ids
+            for member_id in member_ids
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _remove(through, row_column, member_column, row_ids, member_ids):
+    through._default_manager.filter(
+        **{f"{row_column}__in": row_ids, f"{member_column}__in": member_ids}
+    ).delete()
+
+
+def _is_uuid(value):
+    try:
+        uuid.UUID(str(value))
+    except ValueError:
+        return False
+    return True
+
 
 @app.task
-def remove_users(removed_users_list, team_id):
-    removed_users_list = [i for i in removed_users_list if i.isdigit()]
-    users_list = Profile.objects.filter(id__in=removed_users_list)
-    if users_list.exists():
-        team = Teams.objects.filter(id=team_id).first()
-        if team:
-            accounts = team.account_teams.all()
-            for account in accounts:
-                for user in users_list:
-                    account.assigned_to.remove(user)
-
-            # for contacts
-            contacts = team.contact_teams.all()
-            for contact in contacts:
-                for user in users_list:
-                    contact.assigned_to.remove(user)
-
-            # for leads
-            leads = team.lead_teams.all()
-            for lead in leads:
-                for user in users_list:
-                    lead.assigned_to.remove(user)
-
-            # for opportunities
-            opportunities = team.oppurtunity_teams.all()
-            for opportunity in opportunities:
-                for user in users_list:
-                    opportunity.assigned_to.remove(user)
-
-            # for cases
-            cases = team.cases_teams.all()
-            for case in cases:
-                for user in users_list:
-                    case.assigned_to.remove(user)
-
-            # for documents
-            docs = team.document_teams.all()
-            for doc in docs:
-                for user in users_list:
-                    doc.shared_to.remove(user)
-
-            # for tasks
-            tasks = team.tasks_teams.all()
-            for task in tasks:
-                for user in users_list:
-                    task.assigned_to.remove(user)
-
-            # for invoices
-            invoices = team.invoices_teams.all()
-            for invoice in invoices:
-                for user in users_list:
-                    invoice.assigned_to.remove(user)
-
-            # for events
-            events = team.event_teams.all()
-            for event in events:
-                for user in users_list:
-                    event.assigned_to.remove(user)
+def remove_users(removed_users_list, team_id, user_id=None):
+    """Remove the profiles ``removed_users_list`` from the rows of the team"""
+    removed_users_list = [i for i in removed_users_list if _is_uuid(i)]
+    team = Teams.objects.filter(id=team_id).first()
+    if team and removed_users_list:
+        profiles = list(Profile.objects.filter(id__in=removed_users_list))
+        _propagate(team, profiles, _remove, user_id)
 
 
 @app.task
-def update_team_users(team_id):
+def update_team_users(team_id, user_id=None):
     """this function updates assigned_to field on all models when a team is updated"""
     team = Teams.objects.filter(id=team_id).first()
     if team:
-        teams_members = team.users.all()
-        # for accounts
-        accounts = team.account_teams.all()
-        for account in accounts:
-            account_assigned_to_users = account.assigned_to.all()
-            for team_member in teams_members:
-                if team_member not in account_assigned_to_users:
-                    account.assigned_to.add(team_member)
-
-        # for contacts
-        contacts = team.contact_teams.all()
-        for contact in contacts:
-            contact_assigned_to_users = contact.assigned_to.all()
-            for team_member in teams_members:
-                if team_member not in contact_assigned_to_users:
-                    contact.assigned_to.add(team_member)
-
-        # for leads
-        leads = team.lead_teams.all()
-        for lead in leads:
-            lead_assigned_to_users = lead.assigned_to.all()
-            for team_member in teams_members:
-                if team_member not in lead_assigned_to_users:
-                    lead.assigned_to.add(team_member)
-
-        # for opportunities
-        opportunities = team.oppurtunity_teams.all()
-        for opportunity in opportunities:
-            opportunity_assigned_to_users = opportunity.assigned_to.all()
-            for team_member in teams_members:
-                if team_member not in opportunity_assigned_to_users:
-                    opportunity.assigned_to.add(team_member)
-
-        # for cases
-        cases = team.cases_teams.all()
-        for case in cases:
-            case_assigned_to_users = case.assigned_to.all()
-            for team_member in teams_members:
-                if team_member not in case_assigned_to_users:
-                    case.assigned_to.add(team_member)
-
-        # for documents
-        docs = team.document_teams.all()
-        for doc in docs:
-            doc_assigned_to_users = doc.shared_to.all()
-            for team_member in teams_members:
-                if team_member not in doc_assigned_to_users:
-                    doc.shared_to.add(team_member)
-
-        # for tasks
-        tasks = team.tasks_teams.all()
-        for task in tasks:
-            task_assigned_to_users = task.assigned_to.all()
-            for team_member in teams_members:
-                if team_member not in task_assigned_to_users:
-                    task.assigned_to.add(team_member)
-
-        # for invoices
-        invoices = team.invoices_teams.all()
-        for invoice in invoices:
-            invoice_assigned_to_users = invoice.assigned_to.all()
-            for team_member in teams_members:
-                if team_member not in invoice_assigned_to_users:
-                    invoice.assigned_to.add(team_member)
-
-        # for events
-        events = team.event_teams.all()
-        for event in events:
-            event_assigned_to_users = event.assigned_to.all()
-            for team_member in teams_members:
-                if team_member not in event_assigned_to_users:
-                    event.assigned_to.add(team_member)
+        _propagate(team, list(team.users.all()), _add, user_id)
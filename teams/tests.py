@@ -0,0 +1,133 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import Account
+from common.testing import OrgAPITestCase
+from contacts.models import Contact
+from invoices.models import Invoice
+from teams import tasks
+from teams.models import Teams
+
+
+@override_settings(TEAM_PROPAGATION_CHUNK_SIZE=2)
+class TeamPropagationTestCase(OrgAPITestCase):
+    org_name = "Teams Org"
+    email = "teams@example.com"
+
+    def setUp(self):
+        super().setUp()
+        self.members = [
+            self.create_member(f"member{i}@example.com", f"+1415555011{i}")
+            for i in range(3)
+        ]
+        self.team = Teams.objects.create(name="Sales", description="", org=self.org)
+        self.team.users.add(*self.members)
+        self.accounts, self.contacts, self.invoices = [], [], []
+        self.add_rows(3)
+
+    def add_rows(self, count):
+        start = len(self.accounts)
+        for i in range(start, start + count):
+            account = Account.objects.create(
+                name=f"Account {i}",
+                email=f"account{i}@example.com",
+                status="open",
+                org=self.org,
+            )
+            contact = Contact.objects.create(
+                first_name=f"Contact {i}",
+                last_name="Smith",
+                primary_email=f"contact{i}@example.com",
+                org=self.org,
+            )
+            invoice = Invoice.objects.create(
+                invoice_title=f"Invoice {i}",
+                invoice_number=f"INV-{i}",
+                name="Acme",
+                email="billing@acme.com",
+                org=self.org,
+            )
+            for row in (account, contact, invoice):
+                row.teams.add(self.team)
+            self.accounts.append(account)
+            self.contacts.append(contact)
+            self.invoices.append(invoice)
+
+    def through_statements(self, action, task, *args):
+        """``action`` statements of ``task`` on the member tables"""
+        with CaptureQueriesContext(connection) as queries:
+            task(*args)
+        return [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith(action) and "_assigned_to" in query["sql"]
+        ]
+
+    def test_update_team_users(self):
+        # already assigned, left alone
+        self.accounts[0].assigned_to.add(self.members[0])
+        tasks.update_team_users(str(self.team.id))
+        for account in self.accounts:
+            self.assertEqual(set(account.assigned_to.all()), set(self.members))
+        for contact in self.contacts:
+            self.assertEqual(set(contact.assigned_to.all()), set(self.members))
+        users = {member.user for member in self.members}
+        for invoice in self.invoices:
+            self.assertEqual(set(invoice.assigned_to.all()), users)
+
+    def test_remove_users(self):
+        tasks.update_team_users(str(self.team.id))
+        removed = self.members[0]
+        tasks.remove_users([str(removed.id), "not-an-id"], str(self.team.id))
+        self.assertFalse(removed.account_assigned_users.exists())
+        self.assertFalse(removed.contact_assigned_users.exists())
+        self.assertFalse(removed.user.invoice_assigned_to.exists())
+        self.assertEqual(
+            set(self.accounts[0].assigned_to.all()), set(self.members[1:])
+        )
+
+    def test_statements_dont_grow_with_the_members(self):
+        """
+        Benchmark: 6 rows per model in chunks of 2 take 3 INSERTs (or
+        DELETEs) per model, with 3 or 6 members. One ``add``/``remove`` per
+        row and member took 18 or 36 statements per model.
+        """
+        self.add_rows(3)
+        team_id = str(self.team.id)
+        inserts = self.through_statements("INSERT", tasks.update_team_users, team_id)
+        self.assertEqual(len(inserts), 3 * 3)
+
+        self.team.users.add(
+            *[
+                self.create_member(f"new{i}@example.com", f"+1415555012{i}")
+                for i in range(3)
+            ]
+        )
+        inserts = self.through_statements("INSERT", tasks.update_team_users, team_id)
+        self.assertEqual(len(inserts), 3 * 3)
+        self.assertEqual(self.accounts[5].assigned_to.count(), 6)
+
+        removed = [str(member.id) for member in self.team.users.all()]
+        deletes = self.through_statements(
+            "DELETE", tasks.remove_users, removed, team_id
+        )
+        self.assertEqual(len(deletes), 3 * 3)
+        self.assertFalse(self.accounts[5].assigned_to.exists())
+
+    def test_team_update_removes_the_members_left_out(self):
+        tasks.update_team_users(str(self.team.id))
+        self.run_tasks_eagerly(tasks.update_team_users, tasks.remove_users)
+        kept = [str(member.id) for member in self.members[1:]]
+        response = self.client.put(
+            f"/api/teams/{self.team.id}/",
+            {"name": "Sales", "assign_users": kept},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {str(profile.id) for profile in self.accounts[0].assigned_to.all()},
+            set(kept),
+        )
+        self.accounts[0].refresh_from_db()
+        self.assertEqual(self.accounts[0].updated_by, self.user)
@@ -35,7 +35,7 @@ class TeamsListView(APIView, LimitOffsetPagination):
 
         context = {}
         results_teams = self.paginate_queryset(
-            queryset.distinct(), self.request, view=self
+            TeamsSerializer.prefetch_plan(queryset.distinct()), self.request, view=self
         )
         teams = TeamsSerializer(results_teams, many=True).data
         if results_teams:
@@ -140,8 +140,7 @@ class TeamsDetailView(APIView):
             )
         params = request.data
         self.team = self.get_object(pk)
-        actual_users = self.team.get_users()
-        removed_users = []
+        actual_users = set(self.team.users.values_list("id", flat=True))
         serializer = TeamCreateSerializer(
             data=params, instance=self.team, request_obj=request
         )
@@ -156,12 +155,11 @@ class TeamsDetailView(APIView):
                 )
                 if profiles:
                     team_obj.users.add(*profiles)
-            update_team_users.delay(pk)
-            latest_users = team_obj.get_users()
-            for user in actual_users:
-                if user not in latest_users:
-                    removed_users.append(user)
-            remove_users.delay(removed_users, pk)
+            update_team_users.delay(pk, str(request.user.id))
+            latest_users = set(team_obj.users.values_list("id", flat=True))
+            removed_users = [str(user) for user in actual_users - latest_users]
+            if removed_users:
+                remove_users.delay(removed_users, pk, str(request.user.id))
             return Response(
                 {"error": False, "message": "Team Updated Successfully"},
                 status=status.HTTP_200_OK,